@@ -40,6 +40,33 @@ class WebsiteAnalysis(Base):
     analysis_date = Column(DateTime, default=datetime.utcnow)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class PageFingerprint(Base):
+    """Main-document fingerprint of the last full analysis, for skipping unchanged pages"""
+    __tablename__ = "page_fingerprints"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    analysis_key = Column(String(700), nullable=False, unique=True, index=True)  # URL plus the options that change the report
+    url = Column(String(500), nullable=False)
+    etag = Column(String(300))
+    last_modified = Column(String(100))
+    content_hash = Column(String(64))
+    
+    # Report returned while the page is unchanged
+    report = Column(JSON)
+    
+    analyzed_at = Column(DateTime, default=datetime.utcnow)
+    checked_at = Column(DateTime, default=datetime.utcnow)
+
+class PageSnapshot(Base):
+    """Region hashes of the last analysis, for incremental re-analysis (stage results live in the stage cache)"""
+    __tablename__ = "page_snapshots"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    analysis_key = Column(String(700), nullable=False, unique=True, index=True)
+    url = Column(String(500), nullable=False)
+    regions = Column(JSON)       # region -> short hash
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 async def init_db():
     """Initialize database tables"""
     async with engine.begin() as conn:
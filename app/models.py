@@ -7,6 +7,16 @@ from pydantic import BaseModel, HttpUrl
 class CROAnalysisRequest(BaseModel):
     url: HttpUrl
     client_name: Optional[str] = None
+    categories: Optional[List[str]] = None  # Framework categories the client needs (default: all)
+    force: bool = False  # Re-analyze even if cached or unchanged since the last analysis
+
+class BatchAnalysisRequest(BaseModel):
+    """Bulk analysis (POST /api/analyze/batch): a URL list, a sitemap, or both"""
+    urls: List[HttpUrl] = []
+    sitemap_url: Optional[HttpUrl] = None  # sitemap.xml or sitemap index
+    client_name: Optional[str] = None
+    categories: Optional[List[str]] = None
+    force: bool = False
 
 class ElementPosition(BaseModel):
     x: int
@@ -34,6 +44,7 @@ class CTAButton(BaseModel):
     color: str
     size: str
     position: ElementPosition
+    located: bool = False  # Position was measured in the rendered page (otherwise a placeholder)
     prominent: bool
     persuasiveness: int
 
@@ -120,6 +131,13 @@ class AIInsights(BaseModel):
     # NEW: Framework feedback
     framework_feedback: Optional[List[FrameworkFeedback]] = None
     lighthouse_metrics: Optional[LighthouseMetrics] = None
+    
+    # Set when a model provider was skipped (open circuit) or failed
+    degraded: bool = False
+    degraded_providers: List[str] = []
+    
+    # Whether vision models were called, reused or skipped for this request, and why
+    routing_decision: Optional[Dict[str, Any]] = None
 
 class CROAnalysisResponse(BaseModel):
     id: str
@@ -130,4 +148,20 @@ class CROAnalysisResponse(BaseModel):
     element_analysis: CROData
     recommendations: List[Recommendation]
     models_used: List[str]
-    analysis_date: datetime
\ No newline at end of file
+    analysis_date: datetime
+    analysis_metadata: Dict[str, Any] = {}
+
+class AnalysisJob(BaseModel):
+    """Background analysis job (POST /api/jobs)"""
+    id: str
+    url: str
+    client_name: Optional[str] = None
+    categories: Optional[List[str]] = None
+    force: bool = False
+    status: str = "queued"  # queued | running | completed | failed | cancelled
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    partial_results: List[Dict[str, Any]] = []  # Streamed stage/AI results while running
+    result: Optional[CROAnalysisResponse] = None
+    error: Optional[str] = None
@@ -0,0 +1,232 @@
+"""Bulk analysis of URL lists and sitemaps with global and per-domain concurrency limits"""
+
+import os
+import gzip
+import time
+import asyncio
+import logging
+import aiohttp
+import xml.etree.ElementTree as ET
+from urllib.parse import urlsplit
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.services.url_canonicalizer import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))                        # Across all batches on this node
+BATCH_DOMAIN_CONCURRENCY = int(os.getenv("BATCH_DOMAIN_CONCURRENCY", "2"))          # Per site, to stay polite
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", "1000"))
+SITEMAP_MAX_DEPTH = 3                                                                # Nested sitemap indexes
+SITEMAP_TIMEOUT_SECONDS = 30
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+class BatchError(Exception):
+    """Raised when a batch request cannot be resolved to URLs"""
+
+class BatchService:
+    """Schedules many analyses through the engine and yields results as they finish.
+
+    A URL first takes a slot for its domain and then a global slot, so a batch
+    dominated by one site never holds global slots it cannot use. The limits
+    are shared by every batch on the node. While a batch has URLs left for a
+    domain, the browser services keep one context for that domain, so pages
+    share cookies and the browser HTTP cache for the site's assets.
+    """
+    
+    def __init__(
+        self,
+        analysis_engine,
+        concurrency: int = BATCH_CONCURRENCY,
+        domain_concurrency: int = BATCH_DOMAIN_CONCURRENCY,
+        max_urls: int = BATCH_MAX_URLS
+    ):
+        self.analysis_engine = analysis_engine
+        self.concurrency = concurrency
+        self.domain_concurrency = domain_concurrency
+        self.max_urls = max_urls
+        self.global_slots = asyncio.Semaphore(concurrency)
+        
+        # domain -> {"slots": Semaphore, "users": int}, dropped when no batch uses the domain
+        self.domain_slots: Dict[str, Dict[str, Any]] = {}
+        
+        # Counters for status reporting
+        self.active_batches = 0
+        self.urls_analyzed = 0
+        self.urls_failed = 0
+    
+    async def resolve_urls(self, urls: List[str], sitemap_url: Optional[str] = None) -> List[str]:
+        """Listed URLs plus the pages of a sitemap, deduplicated in order (by canonical URL)"""
+        resolved = list(urls)
+        if sitemap_url:
+            resolved.extend(await self._fetch_sitemap(sitemap_url))
+        
+        first_spelling: Dict[str, str] = {}
+        for url in resolved:
+            first_spelling.setdefault(canonicalize_url(url), url)
+        unique = list(first_spelling.values())
+        if not unique:
+            raise BatchError("No URLs to analyze: provide urls or a sitemap with <loc> entries")
+        if len(unique) > self.max_urls:
+            raise BatchError(f"Batch has {len(unique)} URLs, the limit is {self.max_urls}")
+        return unique
+    
+    async def _fetch_sitemap(self, sitemap_url: str) -> List[str]:
+        """Page URLs from a sitemap, following sitemap indexes"""
+        timeout = aiohttp.ClientTimeout(total=SITEMAP_TIMEOUT_SECONDS)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            return await self._read_sitemap(session, sitemap_url, depth=0)
+    
+    async def _read_sitemap(self, session: aiohttp.ClientSession, sitemap_url: str, depth: int) -> List[str]:
+        try:
+            async with session.get(sitemap_url) as response:
+                response.raise_for_status()
+                body = await response.read()
+        except Exception as e:
+            raise BatchError(f"Could not fetch sitemap {sitemap_url}: {e}")
+        
+        if body[:2] == b"\x1f\x8b":  # sitemap.xml.gz
+            body = gzip.decompress(body)
+        
+        try:
+            root = ET.fromstring(body)
+        except ET.ParseError as e:
+            raise BatchError(f"Invalid sitemap XML at {sitemap_url}: {e}")
+        
+        locations = [loc.text.strip() for loc in root.iter(f"{SITEMAP_NS}loc") if loc.text]
+        if root.tag != f"{SITEMAP_NS}sitemapindex":
+            return locations
+        
+        if depth >= SITEMAP_MAX_DEPTH:
+            logger.warning(f"⚠️  Sitemap index nesting too deep at {sitemap_url}, skipping")
+            return []
+        
+        urls = []
+        for child in locations:
+            urls.extend(await self._read_sitemap(session, child, depth + 1))
+            if len(urls) > self.max_urls:
+                break  # resolve_urls reports the overflow
+        return urls
+    
+    async def run(
+        self,
+        urls: List[str],
+        client_name: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        force: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Analyze every URL, yielding one result per URL in completion order and a final summary"""
+        start_time = time.time()
+        remaining: Dict[str, int] = {}
+        for url in urls:
+            domain = self._domain(url)
+            remaining[domain] = remaining.get(domain, 0) + 1
+        
+        opened = set()
+        for domain in remaining:
+            self._acquire_domain(domain)
+        
+        self.active_batches += 1
+        logger.info(f"📦 Batch started: {len(urls)} URLs across {len(remaining)} domains")
+        
+        async def analyze(url: str) -> Dict[str, Any]:
+            domain = self._domain(url)
+            try:
+                async with self.domain_slots[domain]["slots"], self.global_slots:
+                    if domain not in opened:
+                        opened.add(domain)
+                        try:
+                            await self.analysis_engine.open_domain_session(domain)
+                        except Exception as e:
+                            logger.warning(f"⚠️  Shared browser context for {domain} unavailable: {e}")
+                    return await self._analyze_one(url, client_name, categories, force)
+            finally:
+                remaining[domain] -= 1
+                if remaining[domain] == 0 and domain in opened:
+                    await self.analysis_engine.close_domain_session(domain)
+        
+        tasks = [asyncio.create_task(analyze(url)) for url in urls]
+        counts = {"completed": 0, "failed": 0}
+        try:
+            for finished in asyncio.as_completed(tasks):
+                result = await finished
+                counts[result["status"]] += 1
+                yield result
+            
+            yield {
+                "type": "summary",
+                "total": len(urls),
+                **counts,
+                "elapsed_seconds": round(time.time() - start_time, 2)
+            }
+            logger.info(f"✅ Batch finished: {counts['completed']} completed, {counts['failed']} failed")
+        finally:
+            # Client disconnected or batch finished - stop whatever is still queued or running
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for domain in remaining:
+                self._release_domain(domain)
+            self.active_batches -= 1
+    
+    async def _analyze_one(
+        self,
+        url: str,
+        client_name: Optional[str],
+        categories: Optional[List[str]],
+        force: bool
+    ) -> Dict[str, Any]:
+        """One NDJSON line: the report, or the error for this URL"""
+        start_time = time.time()
+        try:
+            report = await self.analysis_engine.analyze_website(
+                url, client_name=client_name, categories=categories, force=force
+            )
+            self.urls_analyzed += 1
+            return {
+                "type": "result",
+                "url": url,
+                "status": "completed",
+                "elapsed_seconds": round(time.time() - start_time, 2),
+                "result": report.model_dump(mode="json")
+            }
+        except Exception as e:
+            self.urls_failed += 1
+            logger.error(f"❌ Batch analysis failed for {url}: {e}")
+            return {
+                "type": "result",
+                "url": url,
+                "status": "failed",
+                "elapsed_seconds": round(time.time() - start_time, 2),
+                "error": str(e)
+            }
+    
+    def _domain(self, url: str) -> str:
+        return (urlsplit(url).hostname or "").lower()
+    
+    def _acquire_domain(self, domain: str):
+        """Register a batch as using a domain's concurrency slots"""
+        entry = self.domain_slots.get(domain)
+        if not entry:
+            entry = self.domain_slots[domain] = {"slots": asyncio.Semaphore(self.domain_concurrency), "users": 0}
+        entry["users"] += 1
+    
+    def _release_domain(self, domain: str):
+        entry = self.domain_slots.get(domain)
+        if entry:
+            entry["users"] -= 1
+            if entry["users"] <= 0:
+                del self.domain_slots[domain]
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Batch scheduler state for health/status endpoints"""
+        return {
+            "active_batches": self.active_batches,
+            "concurrency": self.concurrency,
+            "domain_concurrency": self.domain_concurrency,
+            "max_urls": self.max_urls,
+            "active_domains": len(self.domain_slots),
+            "urls_analyzed": self.urls_analyzed,
+            "urls_failed": self.urls_failed
+        }
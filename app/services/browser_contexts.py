@@ -0,0 +1,61 @@
+"""Per-domain browser contexts shared by the Playwright services (screenshots, scraping)"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+from app.services.metrics import track_page
+
+logger = logging.getLogger(__name__)
+
+class DomainContextMixin:
+    """Shares one browser context (cookies, HTTP cache) across the pages of a domain
+
+    Expects the service to set self.browser and self.domain_contexts and to
+    provide an initialize() that launches the browser.
+    """
+    
+    async def open_domain_context(self, domain: str):
+        """Share one browser context across pages of a domain until closed"""
+        if not self.browser:
+            await self.initialize()
+        entry = self.domain_contexts.get(domain)
+        if entry:
+            entry["refs"] += 1
+        else:
+            self.domain_contexts[domain] = {"context": asyncio.ensure_future(self.browser.new_context()), "refs": 1}
+    
+    async def close_domain_context(self, domain: str):
+        """Release a domain context; it is closed once nobody uses it"""
+        entry = self.domain_contexts.get(domain)
+        if not entry:
+            return
+        entry["refs"] -= 1
+        if entry["refs"] <= 0:
+            del self.domain_contexts[domain]
+            try:
+                context = await entry["context"]
+                await context.close()
+            except Exception as e:
+                logger.debug(f"Closing browser context for {domain} failed: {e}")
+    
+    @asynccontextmanager
+    async def open_page(self, url: str):
+        """Page in the domain's shared context when one is open, otherwise in a fresh context
+
+        The page is closed on exit, including on errors and cancellation.
+        """
+        entry = self.domain_contexts.get((urlparse(url).hostname or "").lower())
+        if entry:
+            page = track_page(await (await entry["context"]).new_page())
+        else:
+            page = track_page(await self.browser.new_page())
+        
+        try:
+            yield page
+        finally:
+            try:
+                await page.close()
+            except Exception as e:
+                logger.debug(f"Closing page for {url} failed: {e}")
@@ -2,25 +2,72 @@
 
 import os
 import json
+import time
+import uuid
+import asyncio
 import hashlib
 import redis.asyncio as redis
 import logging
-from typing import Optional, Union
+from typing import Any, Dict, Iterable, Optional, Union
 from datetime import timedelta
 from pydantic import HttpUrl
 
 from app.models import CROAnalysisResponse
+from app.services.metrics import CACHE_REQUESTS
+from app.services.memory_cache import MemoryCache
+from app.services.url_canonicalizer import canonicalize_url, same_site
 
 logger = logging.getLogger(__name__)
 
+# Lease release/renewal must only touch a lease we still own
+RELEASE_LEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+RENEW_LEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Held when Redis is unavailable - every node runs its own analyses
+LOCAL_LEASE = "local"
+
+# Stage result namespaces: cheap stages refresh often, expensive ones (Lighthouse, vision models) are kept longer
+STAGE_CACHE_TTLS = {
+    "cro_data": int(os.getenv("STAGE_CACHE_TTL_CRO_DATA", str(60 * 60))),            # Scraped elements
+    "framework": int(os.getenv("STAGE_CACHE_TTL_FRAMEWORK", str(6 * 60 * 60))),      # Per framework category
+    "lighthouse": int(os.getenv("STAGE_CACHE_TTL_LIGHTHOUSE", str(24 * 60 * 60))),
+    "vision": int(os.getenv("STAGE_CACHE_TTL_VISION", str(7 * 24 * 60 * 60)))        # Model insights
+}
+
+MEMORY_CACHE_MAX_BYTES = int(os.getenv("MEMORY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # Serialized reports and stages per process
+
+CANONICAL_TTL_SECONDS = int(os.getenv("CANONICAL_TTL_SECONDS", str(7 * 24 * 60 * 60)))  # Learned rel=canonical targets
+CANONICAL_MEMORY_ENTRIES = 10000
+
 class CacheService:
     def __init__(self):
         self.redis = None
-        self.memory_cache = {}  # Fallback in-memory cache
+        self.memory_cache = MemoryCache(MEMORY_CACHE_MAX_BYTES)  # Fallback in-memory tier (reports and stages)
         self.cache_ttl = 24 * 60 * 60  # 24 hours
+        self.partial_cache_ttl = int(os.getenv("PARTIAL_CACHE_TTL_SECONDS", "300"))  # Reports missing deadline-skipped stages
+        self.stage_ttls = dict(STAGE_CACHE_TTLS)
+        self.canonical_memory: Dict[str, str] = {}  # Fallback rel=canonical map: canonicalized URL -> canonical page
+        
+        # Cross-node single-flight
+        self.lease_ttl_ms = int(os.getenv("ANALYSIS_LEASE_TTL_MS", "120000"))       # Expires if the owner crashes
+        self.ready_wait_seconds = float(os.getenv("ANALYSIS_READY_WAIT_SECONDS", "150"))  # Bounded wait for another node
         
     async def initialize(self):
-        """Initialize Redis connection"""
+        """Initialize Redis connection (reused once connected)"""
+        if self.redis:
+            return
+        
         try:
             redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
             self.redis = redis.from_url(redis_url, decode_responses=True)
@@ -36,46 +83,60 @@ class CacheService:
             return url
         return str(url)
     
-    def _generate_cache_key(self, url: Union[str, HttpUrl]) -> str:
-        """Generate cache key for URL"""
-        url_str = self._url_to_string(url)
+    def _generate_cache_key(self, url: Union[str, HttpUrl], variant: str = "") -> str:
+        """Generate cache key for URL (canonicalized, so spellings of one page share an entry)
+        
+        variant names the request options that change the report (client,
+        categories); the default options keep the bare URL key.
+        """
+        url_str = canonicalize_url(self._url_to_string(url))
+        if variant:
+            url_str = f"{url_str}|{variant}"
         url_hash = hashlib.md5(url_str.encode()).hexdigest()
         return f"cro:analysis:{url_hash}"
     
-    async def get_cached_analysis(self, url: Union[str, HttpUrl]) -> Optional[CROAnalysisResponse]:
+    async def get_cached_analysis(self, url: Union[str, HttpUrl], variant: str = "") -> Optional[CROAnalysisResponse]:
         """Get cached analysis result"""
-        cache_key = self._generate_cache_key(url)
+        cache_key = self._generate_cache_key(url, variant)
         
         try:
             # Try Redis first
             if self.redis:
                 cached_data = await self.redis.get(cache_key)
+                CACHE_REQUESTS.labels(tier="redis", result="hit" if cached_data else "miss").inc()
                 if cached_data:
                     data = json.loads(cached_data)
                     return CROAnalysisResponse(**data)
             
             # Fallback to memory cache
-            if cache_key in self.memory_cache:
-                return self.memory_cache[cache_key]
+            cached_data = self.memory_cache.get(cache_key)
+            CACHE_REQUESTS.labels(tier="memory", result="hit" if cached_data else "miss").inc()
+            if cached_data:
+                return CROAnalysisResponse.model_validate_json(cached_data)
                 
         except Exception as e:
             logger.error(f"Cache get error: {e}")
         
         return None
     
-    async def cache_analysis(self, url: Union[str, HttpUrl], analysis: CROAnalysisResponse):
-        """Cache analysis result"""
-        cache_key = self._generate_cache_key(url)
+    async def cache_analysis(
+        self,
+        url: Union[str, HttpUrl],
+        analysis: CROAnalysisResponse,
+        ttl: Optional[int] = None,
+        variant: str = ""
+    ):
+        """Cache analysis result (ttl defaults to cache_ttl)"""
+        cache_key = self._generate_cache_key(url, variant)
         
         try:
             # Cache in Redis
+            cached_data = analysis.model_dump_json()  # Updated from .json() for Pydantic v2
             if self.redis:
-                cached_data = analysis.model_dump_json()  # Updated from .json() for Pydantic v2
-                await self.redis.setex(cache_key, self.cache_ttl, cached_data)
+                await self.redis.setex(cache_key, ttl or self.cache_ttl, cached_data)
             
-            # Also cache in memory (with size limit)
-            if len(self.memory_cache) < 100:  # Limit memory cache size
-                self.memory_cache[cache_key] = analysis
+            # Also cache in memory, with the same expiry (oversized reports are left to Redis)
+            self.memory_cache.set(cache_key, cached_data.encode("utf-8"), ttl or self.cache_ttl)
             
             url_str = self._url_to_string(url)
             logger.info(f"📦 Cached analysis for {url_str}")
@@ -83,20 +144,205 @@ class CacheService:
         except Exception as e:
             logger.error(f"Cache set error: {e}")
     
-    async def invalidate_cache(self, url: Union[str, HttpUrl]):
+    async def invalidate_cache(self, url: Union[str, HttpUrl], variant: str = ""):
         """Invalidate cached analysis"""
-        cache_key = self._generate_cache_key(url)
+        cache_key = self._generate_cache_key(url, variant)
         
         try:
             if self.redis:
                 await self.redis.delete(cache_key)
             
-            if cache_key in self.memory_cache:
-                del self.memory_cache[cache_key]
+            self.memory_cache.delete(cache_key)
                 
         except Exception as e:
             logger.error(f"Cache invalidation error: {e}")
     
+    async def resolve_url(self, url: Union[str, HttpUrl]) -> str:
+        """Key URL of a page: its canonical spelling, or the rel=canonical target it declared last time"""
+        canonical = canonicalize_url(self._url_to_string(url))
+        try:
+            if self.redis:
+                target = await self.redis.get(f"cro:canonical:{hashlib.md5(canonical.encode()).hexdigest()}")
+            else:
+                target = self.canonical_memory.get(canonical)
+        except Exception as e:
+            logger.error(f"Canonical URL lookup error: {e}")
+            target = None
+        return target or canonical
+    
+    async def remember_canonical(self, url: Union[str, HttpUrl], declared: str):
+        """Map a URL to the rel=canonical target its page declared (same site only, one hop)"""
+        canonical = canonicalize_url(self._url_to_string(url))
+        target = canonicalize_url(declared)
+        if target == canonical or not same_site(canonical, target):
+            return  # Another site's canonical must not stand in for this page's report
+        
+        try:
+            if self.redis:
+                await self.redis.setex(
+                    f"cro:canonical:{hashlib.md5(canonical.encode()).hexdigest()}", CANONICAL_TTL_SECONDS, target
+                )
+            else:
+                if canonical not in self.canonical_memory and len(self.canonical_memory) >= CANONICAL_MEMORY_ENTRIES:
+                    del self.canonical_memory[next(iter(self.canonical_memory))]
+                self.canonical_memory[canonical] = target
+            logger.info(f"🔗 {canonical} declares canonical {target}")
+        except Exception as e:
+            logger.error(f"Canonical URL store error: {e}")
+    
+    def _stage_key(self, namespace: str, scope: str) -> str:
+        return f"cro:stage:{namespace}:{hashlib.md5(scope.encode()).hexdigest()}"
+    
+    async def get_stage(self, namespace: str, scope: str) -> Optional[Dict[str, Any]]:
+        """Cached stage entry {"key", "data", "cached_at"}; callers compare "key" with their current inputs
+        
+        scope names what the stage ran for (URL, plus category or options
+        where they matter); the invalidation key stored with the entry is a
+        hash of the stage's inputs, so a changed page is never served a
+        stale stage.
+        """
+        cache_key = self._stage_key(namespace, scope)
+        try:
+            if self.redis:
+                cached_data = await self.redis.get(cache_key)
+                CACHE_REQUESTS.labels(tier=f"stage:{namespace}", result="hit" if cached_data else "miss").inc()
+                return json.loads(cached_data) if cached_data else None
+            
+            cached_data = self.memory_cache.get(cache_key)
+            CACHE_REQUESTS.labels(tier=f"stage:{namespace}", result="hit" if cached_data else "miss").inc()
+            return json.loads(cached_data) if cached_data else None
+        except Exception as e:
+            logger.error(f"Stage cache get error: {e}")
+            return None
+    
+    async def cache_stage(self, namespace: str, scope: str, invalidation_key: str, data: Any):
+        """Store a stage result (JSON-ready) for the namespace's TTL"""
+        cache_key = self._stage_key(namespace, scope)
+        ttl = self.stage_ttls[namespace]
+        entry = {"key": invalidation_key, "data": data, "cached_at": time.time()}
+        try:
+            cached_data = json.dumps(entry, default=str)
+            if self.redis:
+                await self.redis.setex(cache_key, ttl, cached_data)
+                return
+            self.memory_cache.set(cache_key, cached_data.encode("utf-8"), ttl)
+        except Exception as e:
+            logger.error(f"Stage cache set error: {e}")
+    
+    async def invalidate_stages(self, scopes: Iterable[str], namespaces: Optional[Iterable[str]] = None):
+        """Drop cached stages for the given scopes (all namespaces by default)"""
+        keys = [self._stage_key(namespace, scope) for namespace in (namespaces or self.stage_ttls) for scope in scopes]
+        try:
+            if self.redis and keys:
+                await self.redis.delete(*keys)
+            for key in keys:
+                self.memory_cache.delete(key)
+        except Exception as e:
+            logger.error(f"Stage cache invalidation error: {e}")
+    
+    def _lease_id(self, flight_key: str) -> str:
+        """Hash shared by the lease key and the ready channel"""
+        return hashlib.md5(flight_key.encode()).hexdigest()
+    
+    async def acquire_analysis_lease(self, flight_key: str) -> Optional[str]:
+        """Take the cluster-wide lease for an analysis (SET NX PX)
+        
+        Returns the owner token, LOCAL_LEASE when Redis is unavailable, or
+        None when another node holds the lease.
+        """
+        if not self.redis:
+            return LOCAL_LEASE
+        
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self.redis.set(
+                f"cro:lease:{self._lease_id(flight_key)}", token, nx=True, px=self.lease_ttl_ms
+            )
+            return token if acquired else None
+        except Exception as e:
+            logger.error(f"Lease acquire error: {e}")
+            return LOCAL_LEASE
+    
+    async def renew_analysis_lease(self, flight_key: str, token: str) -> bool:
+        """Extend a lease we still own"""
+        if not self.redis or token == LOCAL_LEASE:
+            return True
+        
+        try:
+            renewed = await self.redis.eval(
+                RENEW_LEASE_SCRIPT, 1, f"cro:lease:{self._lease_id(flight_key)}", token, self.lease_ttl_ms
+            )
+            return bool(renewed)
+        except Exception as e:
+            logger.error(f"Lease renew error: {e}")
+            return False
+    
+    async def keep_analysis_lease(self, flight_key: str, token: str):
+        """Renew the lease until cancelled (run as a task alongside the analysis)"""
+        while True:
+            await asyncio.sleep(self.lease_ttl_ms / 3000)
+            if not await self.renew_analysis_lease(flight_key, token):
+                logger.warning(f"⚠️  Lost analysis lease for {flight_key}")
+                return
+    
+    async def release_analysis_lease(self, flight_key: str, token: str, succeeded: bool):
+        """Release a lease we own and tell waiting nodes the outcome"""
+        if not self.redis or token == LOCAL_LEASE:
+            return
+        
+        lease_id = self._lease_id(flight_key)
+        try:
+            await self.redis.eval(RELEASE_LEASE_SCRIPT, 1, f"cro:lease:{lease_id}", token)
+            await self.redis.publish(f"cro:ready:{lease_id}", "ready" if succeeded else "failed")
+        except Exception as e:
+            logger.error(f"Lease release error: {e}")
+    
+    async def wait_for_analysis(
+        self,
+        url: Union[str, HttpUrl],
+        flight_key: str,
+        variant: str = ""
+    ) -> Optional[CROAnalysisResponse]:
+        """Wait (bounded) for another node's analysis to land in the cache
+        
+        Returns None if the owner failed, the wait timed out or the lease
+        expired without a result; callers then run the analysis themselves.
+        """
+        if not self.redis:
+            return None
+        
+        lease_id = self._lease_id(flight_key)
+        deadline = time.monotonic() + self.ready_wait_seconds
+        pubsub = self.redis.pubsub()
+        
+        try:
+            await pubsub.subscribe(f"cro:ready:{lease_id}")
+            
+            # The owner may have finished between our lease attempt and subscribing
+            cached = await self.get_cached_analysis(url, variant)
+            if cached:
+                return cached
+            
+            while time.monotonic() < deadline:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message:
+                    if message["data"] == "ready":
+                        return await self.get_cached_analysis(url, variant)
+                    return None
+                
+                # Owner crashed: its lease expired without a ready message
+                if not await self.redis.exists(f"cro:lease:{lease_id}"):
+                    return await self.get_cached_analysis(url, variant)
+            
+            logger.warning(f"⏱️  Timed out waiting for another node to analyze {self._url_to_string(url)}")
+            return None
+            
+        except Exception as e:
+            logger.error(f"Wait for analysis error: {e}")
+            return None
+        finally:
+            await pubsub.aclose()
+    
     def is_connected(self) -> bool:
         """Check if Redis is connected"""
         return self.redis is not None
@@ -0,0 +1,150 @@
+"""Per-provider circuit breaker for model calls"""
+
+import time
+import logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose breaker is open"""
+
+class CircuitBreaker:
+    """Trips when a provider's recent calls fail or run slow too often.
+
+    Outcomes of the last window_size calls are tracked. Once at least
+    min_calls have been recorded, the breaker opens if the failure rate or
+    the slow-call rate reaches its threshold. While open, calls are
+    rejected immediately. After open_seconds a limited number of probe calls
+    are let through (half-open): a successful probe closes the breaker, a
+    failed or slow one re-opens it.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 45.0,
+        slow_call_rate_threshold: float = 0.8,
+        window_size: int = 20,
+        min_calls: int = 5,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.time
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.clock = clock
+        
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window_size)  # (failed, slow)
+        
+        # Counters for status reporting
+        self.rejected_calls = 0
+        self.times_opened = 0
+    
+    def allow_request(self) -> bool:
+        """Whether a call may go to the provider right now"""
+        if self.state == OPEN:
+            if self.clock() - self.opened_at < self.open_seconds:
+                self.rejected_calls += 1
+                return False
+            self._transition(HALF_OPEN)
+        
+        if self.state == HALF_OPEN:
+            if self.half_open_calls >= self.half_open_max_calls:
+                self.rejected_calls += 1
+                return False
+            self.half_open_calls += 1
+        
+        return True
+    
+    def record_success(self, latency: float):
+        """Record a completed call (slow calls count toward the slow-call rate)"""
+        slow = latency >= self.slow_call_seconds
+        
+        if self.state == HALF_OPEN:
+            self._transition(OPEN if slow else CLOSED)
+            return
+        
+        self.outcomes.append((False, slow))
+        self._evaluate()
+    
+    def record_failure(self):
+        """Record an error, timeout or unusable result"""
+        if self.state == HALF_OPEN:
+            self._transition(OPEN)
+            return
+        
+        self.outcomes.append((True, False))
+        self._evaluate()
+    
+    def record_cancelled(self):
+        """Release a half-open probe slot for a call that was cancelled before finishing"""
+        if self.state == HALF_OPEN and self.half_open_calls > 0:
+            self.half_open_calls -= 1
+    
+    def _evaluate(self):
+        """Open the breaker when either rate crosses its threshold"""
+        if self.state != CLOSED or len(self.outcomes) < self.min_calls:
+            return
+        
+        failure_rate, slow_rate = self._rates()
+        if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+            logger.warning(
+                f"⚡ Circuit breaker for {self.name} opened "
+                f"(failure rate {failure_rate:.0%}, slow-call rate {slow_rate:.0%})"
+            )
+            self._transition(OPEN)
+    
+    def _rates(self) -> Tuple[float, float]:
+        """Failure and slow-call rates over the window"""
+        if not self.outcomes:
+            return 0.0, 0.0
+        failures = sum(1 for failed, _ in self.outcomes if failed)
+        slow = sum(1 for _, is_slow in self.outcomes if is_slow)
+        return failures / len(self.outcomes), slow / len(self.outcomes)
+    
+    def _transition(self, state: str):
+        """Move to a new state and reset the bookkeeping it depends on"""
+        if state == self.state:
+            return
+        
+        if state == OPEN:
+            self.opened_at = self.clock()
+            self.times_opened += 1
+        elif state == CLOSED:
+            self.outcomes.clear()
+            logger.info(f"✅ Circuit breaker for {self.name} closed")
+        elif state == HALF_OPEN:
+            logger.info(f"🔎 Circuit breaker for {self.name} half-open, probing provider")
+        
+        self.half_open_calls = 0
+        self.state = state
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Breaker state for health/status endpoints"""
+        failure_rate, slow_rate = self._rates()
+        status = {
+            "state": self.state,
+            "failure_rate": round(failure_rate, 3),
+            "slow_call_rate": round(slow_rate, 3),
+            "calls_in_window": len(self.outcomes),
+            "rejected_calls": self.rejected_calls,
+            "times_opened": self.times_opened
+        }
+        if self.state == OPEN:
+            status["retry_in_seconds"] = round(max(0.0, self.open_seconds - (self.clock() - self.opened_at)), 1)
+        return status
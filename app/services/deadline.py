@@ -0,0 +1,86 @@
+"""Per-analysis time budget split across pipeline stages"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, List, Optional
+
+from app.services.progress import publish
+
+logger = logging.getLogger(__name__)
+
+# Extras the report is complete without: a missing mobile capture or Lighthouse run still leaves a full analysis
+OPTIONAL_STAGES = ("mobile_capture", "lighthouse")
+
+class DeadlineExceeded(Exception):
+    """Raised when a call is cut short by the analysis deadline rather than its own timeout"""
+
+class Deadline:
+    """Time budget for one analysis.
+
+    Stages run in the order of the shares mapping, and each must finish by
+    its cumulative share of the total. A stage that finishes early leaves
+    its unused time to the stages after it. Overruns are recorded so the
+    report can say which stages it is missing.
+    """
+    
+    def __init__(self, total_seconds: float, shares: Dict[str, float]):
+        self.total_seconds = total_seconds
+        self.start = time.monotonic()
+        self.skipped: List[Dict[str, str]] = []
+        
+        self.stage_ends: Dict[str, float] = {}
+        elapsed_share = 0.0
+        for stage, share in shares.items():
+            elapsed_share += share
+            self.stage_ends[stage] = min(1.0, elapsed_share) * total_seconds
+    
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start
+    
+    def time_left(self, stage: Optional[str] = None, reserve: float = 0.0) -> float:
+        """Seconds until the stage's budget (or the whole deadline) runs out, minus a reserve"""
+        end = self.stage_ends.get(stage, self.total_seconds) if stage else self.total_seconds
+        return max(0.0, end - self.elapsed() - reserve)
+    
+    def timeout_ms(self, stage: str, cap_ms: int, reserve: float = 0.0) -> int:
+        """Millisecond timeout for Playwright calls (never 0, which Playwright treats as no timeout)"""
+        return max(1, int(min(cap_ms, self.time_left(stage, reserve) * 1000)))
+    
+    def skip(self, stage: str, reason: str):
+        """Record a stage missing from the report"""
+        self.skipped.append({"stage": stage, "reason": reason})
+        publish("stage", stage=stage, state="skipped", reason=reason)
+        logger.warning(f"⏱️  Skipped {stage} at {self.elapsed():.1f}s: {reason}")
+    
+    async def run(self, stage: str, awaitable: Awaitable[Any]) -> Optional[Any]:
+        """Await a stage within its budget; None (and a skip record) when it overruns"""
+        timeout = self.time_left(stage)
+        if timeout <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            self.skip(stage, "no time left in the analysis budget")
+            return None
+        
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            self.skip(stage, f"exceeded its budget ({timeout:.1f}s)")
+            return None
+    
+    def missed(self, stage: str) -> bool:
+        """Whether a stage was skipped"""
+        return any(entry["stage"] == stage for entry in self.skipped)
+    
+    def incomplete(self) -> bool:
+        """Whether a required stage was skipped (optional extras do not count)"""
+        return any(entry["stage"] not in OPTIONAL_STAGES for entry in self.skipped)
+    
+    def summary(self) -> Dict[str, Any]:
+        """Report metadata: the budget, time used and stages that did not finish"""
+        return {
+            "deadline_seconds": self.total_seconds,
+            "elapsed_seconds": round(self.elapsed(), 2),
+            "skipped_stages": list(dict.fromkeys(entry["stage"] for entry in self.skipped)),
+            "skipped_details": list(self.skipped)
+        }
@@ -0,0 +1,169 @@
+"""Cheap change detection for re-analysis: HTTP validators plus a normalized main-document hash"""
+
+import os
+import re
+import hashlib
+import logging
+import aiohttp
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select
+
+from app.database import async_session, PageFingerprint
+from app.models import CROAnalysisResponse
+from app.services.url_canonicalizer import canonical_link
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_TIMEOUT_SECONDS = 5                                                   # Comes out of the analysis deadline
+FINGERPRINT_MAX_BYTES = 5 * 1024 * 1024                                            # Main document only
+FINGERPRINT_MAX_AGE_DAYS = int(os.getenv("FINGERPRINT_MAX_AGE_DAYS", "30"))        # Re-analyze at least this often
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36'
+
+# Markup that changes on every request without changing the page
+VOLATILE_PATTERNS = [
+    re.compile(r"<!--.*?-->", re.S),
+    re.compile(r"<script\b(?![^>]*\bsrc=)[^>]*>.*?</script>", re.S | re.I),   # Inline scripts (tokens, timestamps, state blobs)
+    re.compile(r"\s(?:nonce|data-csrf|data-request-id)=(\"[^\"]*\"|'[^']*')", re.I),
+    re.compile(r"<meta[^>]+name=[\"']?(?:csrf-token|csrf-param)[^>]*>", re.I),
+    re.compile(r"<input[^>]+type=[\"']?hidden[^>]*>", re.I),
+]
+WHITESPACE = re.compile(r"\s+")
+
+class FingerprintService:
+    """Decides whether a page changed since its last full analysis
+
+    One conditional GET of the main document: a 304 means unchanged, and
+    otherwise the body is normalized (comments, inline scripts, CSRF and
+    nonce attributes, whitespace) and hashed. Servers that never send
+    validators, or send new ones on every response, are still caught by
+    the hash. Fingerprints are stored per analysis key, so reports for
+    different client/category options are kept apart.
+    """
+    
+    async def check(self, analysis_key: str, url: str, force: bool = False) -> Dict[str, Any]:
+        """Fetch the current fingerprint; "prior_report" is set when the page is unchanged
+        
+        force still fetches the fingerprint (to record after the analysis) but never reuses a report.
+        """
+        stored = None if force else await self._load(analysis_key)
+        fingerprint = await self._fetch(url, stored)
+        if not fingerprint or not stored or not stored.report:
+            return {"fingerprint": fingerprint, "prior_report": None}
+        
+        if datetime.utcnow() - stored.analyzed_at > timedelta(days=FINGERPRINT_MAX_AGE_DAYS):
+            return {"fingerprint": fingerprint, "prior_report": None, "reason": "max_age"}
+        
+        unchanged = fingerprint["not_modified"] or (
+            fingerprint["content_hash"] is not None and fingerprint["content_hash"] == stored.content_hash
+        )
+        if not unchanged:
+            return {"fingerprint": fingerprint, "prior_report": None, "reason": "changed"}
+        
+        await self._touch(analysis_key, fingerprint)
+        return {
+            "fingerprint": fingerprint,
+            "prior_report": CROAnalysisResponse(**stored.report),
+            "analyzed_at": stored.analyzed_at
+        }
+    
+    async def record(self, analysis_key: str, url: str, fingerprint: Optional[Dict[str, Any]], report: CROAnalysisResponse):
+        """Store the fingerprint and report of a complete analysis"""
+        if not fingerprint:
+            return  # Pre-check failed - nothing to compare against next time
+        
+        try:
+            async with async_session() as session:
+                result = await session.execute(
+                    select(PageFingerprint).where(PageFingerprint.analysis_key == analysis_key)
+                )
+                row = result.scalar_one_or_none()
+                if not row:
+                    row = PageFingerprint(analysis_key=analysis_key)
+                    session.add(row)
+                
+                now = datetime.utcnow()
+                row.url = url
+                row.etag = fingerprint["etag"]
+                row.last_modified = fingerprint["last_modified"]
+                row.content_hash = fingerprint["content_hash"]
+                row.report = report.model_dump(mode="json")
+                row.analyzed_at = now
+                row.checked_at = now
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Failed to store page fingerprint: {e}")
+    
+    async def _load(self, analysis_key: str) -> Optional[PageFingerprint]:
+        try:
+            async with async_session() as session:
+                result = await session.execute(
+                    select(PageFingerprint).where(PageFingerprint.analysis_key == analysis_key)
+                )
+                return result.scalar_one_or_none()
+        except Exception as e:
+            logger.warning(f"Page fingerprint lookup failed: {e}")
+            return None
+    
+    async def _touch(self, analysis_key: str, fingerprint: Dict[str, Any]):
+        """Mark an unchanged page as checked, keeping any new validators for the next conditional request"""
+        try:
+            async with async_session() as session:
+                result = await session.execute(
+                    select(PageFingerprint).where(PageFingerprint.analysis_key == analysis_key)
+                )
+                row = result.scalar_one_or_none()
+                if row:
+                    row.etag = fingerprint["etag"]
+                    row.last_modified = fingerprint["last_modified"]
+                    row.checked_at = datetime.utcnow()
+                    await session.commit()
+        except Exception as e:
+            logger.debug(f"Page fingerprint update failed: {e}")
+    
+    async def _fetch(self, url: str, stored: Optional[PageFingerprint]) -> Optional[Dict[str, Any]]:
+        """Validators and body hash of the main document (None when the pre-check fails)"""
+        headers = {"User-Agent": USER_AGENT}
+        if stored and stored.report:
+            if stored.etag:
+                headers["If-None-Match"] = stored.etag
+            if stored.last_modified:
+                headers["If-Modified-Since"] = stored.last_modified
+        
+        try:
+            timeout = aiohttp.ClientTimeout(total=FINGERPRINT_TIMEOUT_SECONDS)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.get(url, headers=headers, allow_redirects=True) as response:
+                    if response.status == 304:
+                        return {
+                            "not_modified": True,
+                            "etag": stored.etag,
+                            "last_modified": stored.last_modified,
+                            "content_hash": stored.content_hash,
+                            "canonical": None
+                        }
+                    response.raise_for_status()
+                    body = bytearray()
+                    async for chunk in response.content.iter_chunked(64 * 1024):
+                        body.extend(chunk)
+                        if len(body) >= FINGERPRINT_MAX_BYTES:
+                            break
+                    html = bytes(body[:FINGERPRINT_MAX_BYTES]).decode(response.charset or "utf-8", errors="replace")
+                    return {
+                        "not_modified": False,
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                        "content_hash": self.content_hash(html),
+                        "canonical": canonical_link(html, str(response.url))
+                    }
+        except Exception as e:
+            logger.warning(f"⚠️  Fingerprint pre-check failed for {url}, running full analysis: {e}")
+            return None
+    
+    def content_hash(self, html: str) -> str:
+        """SHA-256 of the document with per-request noise removed"""
+        for pattern in VOLATILE_PATTERNS:
+            html = pattern.sub("", html)
+        return hashlib.sha256(WHITESPACE.sub(" ", html).strip().encode("utf-8")).hexdigest()
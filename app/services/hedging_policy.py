@@ -0,0 +1,168 @@
+"""Hedged requests across vision providers - first valid answer wins"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class HedgingPolicy:
+    """Fires a backup request when the primary provider is slower than usual.
+
+    The hedge delay is either configured or the primary's observed latency
+    percentile (p90 by default). Hedges are capped both as a fraction of all
+    requests and by an hourly spend on the secondary provider, so a slow
+    primary cannot double the bill.
+
+    Latency samples are the primary's valid completions plus a censored
+    sample (how long it had run) for every primary cut off after the hedge
+    delay - otherwise the slow tail that triggers hedges would never reach
+    the percentile.
+    """
+    
+    def __init__(
+        self,
+        hedge_delay: Optional[float] = None,
+        default_delay: float = 20.0,
+        percentile: float = 0.9,
+        min_samples: int = 20,
+        history_size: int = 200,
+        max_hedge_fraction: float = 0.15,
+        secondary_cost_per_call: float = 0.0,
+        max_hedge_cost_per_hour: Optional[float] = None
+    ):
+        self.hedge_delay = hedge_delay
+        self.default_delay = default_delay
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_hedge_fraction = max_hedge_fraction
+        self.secondary_cost_per_call = secondary_cost_per_call
+        self.max_hedge_cost_per_hour = max_hedge_cost_per_hour
+        
+        self.latencies: Deque[float] = deque(maxlen=history_size)
+        self.hedge_times: Deque[float] = deque()
+        
+        # Counters for status reporting
+        self.requests = 0
+        self.hedges = 0
+        self.secondary_wins = 0
+        self.skipped_hedges = 0
+        self.censored_samples = 0
+    
+    def current_delay(self) -> float:
+        """Seconds to wait on the primary before hedging"""
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        if len(self.latencies) < self.min_samples:
+            return self.default_delay
+        
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+    
+    def _allow_hedge(self) -> bool:
+        """Check the cost caps before firing a backup request"""
+        # One hedge of headroom so early requests can hedge before the ratio settles
+        if self.hedges >= self.max_hedge_fraction * self.requests + 1:
+            return False
+        
+        if self.max_hedge_cost_per_hour is not None and self.secondary_cost_per_call > 0:
+            cutoff = time.time() - 3600
+            while self.hedge_times and self.hedge_times[0] < cutoff:
+                self.hedge_times.popleft()
+            if (len(self.hedge_times) + 1) * self.secondary_cost_per_call > self.max_hedge_cost_per_hour:
+                return False
+        
+        return True
+    
+    async def run(
+        self,
+        primary: Callable[[], Awaitable[Any]],
+        secondary: Callable[[], Awaitable[Any]],
+        is_valid: Callable[[Any], bool]
+    ) -> Any:
+        """Run primary, hedge with secondary if needed, return the first valid result.
+
+        primary and secondary are zero-argument coroutine factories. The losing
+        request is cancelled. If neither result is valid the primary's result
+        is returned so callers still get its fallback analysis.
+        """
+        self.requests += 1
+        start_time = time.time()
+        delay = self.current_delay()
+        primary_task = asyncio.ensure_future(primary())
+        secondary_task = None
+        primary_result = None
+        
+        try:
+            done, _ = await asyncio.wait({primary_task}, timeout=delay)
+            
+            if done:
+                primary_result = self._task_result(primary_task)
+                if is_valid(primary_result):
+                    self.latencies.append(time.time() - start_time)
+                    return primary_result
+                logger.info("↪️  Primary provider returned no usable result, trying secondary")
+            
+            if not self._allow_hedge():
+                self.skipped_hedges += 1
+                logger.info("💸 Hedge skipped - cost cap reached")
+                return await primary_task if not done else primary_result
+            
+            self.hedges += 1
+            self.hedge_times.append(time.time())
+            if not done:
+                logger.info(f"⏱️  Primary slower than {delay:.1f}s, hedging with secondary provider")
+            secondary_task = asyncio.ensure_future(secondary())
+            
+            pending = {task for task in (primary_task, secondary_task) if not task.done()}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = self._task_result(task)
+                    valid = is_valid(result)
+                    if task is primary_task:
+                        primary_result = result
+                        if valid:
+                            self.latencies.append(time.time() - start_time)
+                    if valid:
+                        if task is secondary_task:
+                            self.secondary_wins += 1
+                        return result
+            
+            return primary_result
+        
+        finally:
+            elapsed = time.time() - start_time
+            if not primary_task.done() and elapsed >= delay:
+                # Censored: the primary would have taken at least this long
+                self.latencies.append(elapsed)
+                self.censored_samples += 1
+            for task in (primary_task, secondary_task):
+                if task and not task.done():
+                    task.cancel()
+    
+    def _task_result(self, task: asyncio.Future) -> Any:
+        """Result of a finished provider call (errors count as no result)"""
+        try:
+            return task.result()
+        except Exception as e:
+            logger.error(f"Hedged provider call failed: {e}")
+            return None
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Policy state for health/status endpoints"""
+        return {
+            "hedge_delay_seconds": round(self.current_delay(), 2),
+            "delay_source": "configured" if self.hedge_delay is not None else (
+                f"p{int(self.percentile * 100)}" if len(self.latencies) >= self.min_samples else "default"
+            ),
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "secondary_wins": self.secondary_wins,
+            "skipped_hedges": self.skipped_hedges,
+            "censored_samples": self.censored_samples,
+            "max_hedge_fraction": self.max_hedge_fraction,
+            "max_hedge_cost_per_hour": self.max_hedge_cost_per_hour
+        }
@@ -0,0 +1,167 @@
+"""Micro-batching scheduler for local vision model inference"""
+
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+class MicroBatchScheduler:
+    """Gathers inference inputs from concurrent requests into batches.
+
+    Inputs submitted by any coroutine are queued. The collector waits up to
+    max_wait_ms after the first pending input (or until max_batch_size inputs
+    are queued), runs batch_fn on the whole batch in a dedicated worker
+    process and scatters the outputs back to the awaiting callers.
+
+    batch_fn and initializer must be module-level functions so the worker
+    process can import them. batch_fn receives a list of inputs and must
+    return a list of outputs in the same order.
+    """
+    
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        initializer: Optional[Callable] = None,
+        initargs: Tuple = (),
+        name: str = "inference"
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.initializer = initializer
+        self.initargs = initargs
+        self.name = name
+        
+        self.executor = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.collector_task = None
+        
+        # Simple counters for status reporting
+        self.batches_run = 0
+        self.items_processed = 0
+    
+    async def start(self):
+        """Start the worker process and the batch collector"""
+        if self.collector_task:
+            return
+        
+        self.executor = self._create_executor()
+        self.queue = asyncio.Queue()
+        self.collector_task = asyncio.create_task(self._collect_batches())
+        logger.info(f"✅ {self.name} micro-batch scheduler started (batch ≤ {self.max_batch_size}, wait ≤ {self.max_wait * 1000:.0f}ms)")
+    
+    def _create_executor(self) -> ProcessPoolExecutor:
+        """Single dedicated worker process"""
+        # spawn avoids forking a process that already runs event loop and browser threads
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=self.initializer,
+            initargs=self.initargs
+        )
+    
+    async def submit(self, item: Any) -> Any:
+        """Queue one input and wait for its output"""
+        if not self.collector_task:
+            await self.start()
+        
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future))
+        return await future
+    
+    async def submit_many(self, items: Sequence[Any]) -> List[Any]:
+        """Queue several inputs (e.g. all tiles of one screenshot) and wait for all outputs"""
+        return list(await asyncio.gather(*[self.submit(item) for item in items]))
+    
+    async def _collect_batches(self):
+        """Gather pending inputs into batches and run them one at a time"""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            
+            # Gather more inputs until the batch is full or the wait window closes
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            
+            # Callers that gave up (cancelled) no longer need a slot in the batch
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                continue
+            
+            await self._run_batch(batch)
+    
+    async def _run_batch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """Run one batch in the worker process and scatter results"""
+        items = [item for item, _ in batch]
+        start_time = time.time()
+        
+        try:
+            outputs = await asyncio.get_running_loop().run_in_executor(self.executor, self.batch_fn, items)
+            if len(outputs) != len(items):
+                raise RuntimeError(f"batch_fn returned {len(outputs)} outputs for {len(items)} inputs")
+        except Exception as e:
+            logger.error(f"❌ {self.name} batch of {len(items)} failed: {e}")
+            if isinstance(e, BrokenProcessPool):
+                # Worker crashed (e.g. OOM); replace it so later batches can run
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = self._create_executor()
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), output in zip(batch, outputs):
+            if not future.done():
+                future.set_result(output)
+        
+        self.batches_run += 1
+        self.items_processed += len(items)
+        logger.debug(f"{self.name} batch of {len(items)} ran in {time.time() - start_time:.3f}s")
+    
+    def get_status(self) -> dict:
+        """Scheduler state for health/status endpoints"""
+        return {
+            "running": self.collector_task is not None,
+            "pending": self.queue.qsize() if self.queue else 0,
+            "batches_run": self.batches_run,
+            "items_processed": self.items_processed,
+            "average_batch_size": round(self.items_processed / self.batches_run, 2) if self.batches_run else 0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000
+        }
+    
+    async def close(self):
+        """Stop the collector and the worker process"""
+        if self.collector_task:
+            self.collector_task.cancel()
+            try:
+                await self.collector_task
+            except asyncio.CancelledError:
+                pass
+            self.collector_task = None
+        
+        # Fail anything still waiting so callers don't hang on shutdown
+        if self.queue:
+            while not self.queue.empty():
+                _, future = self.queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError(f"{self.name} scheduler closed"))
+        
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
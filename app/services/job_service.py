@@ -0,0 +1,167 @@
+"""Background analysis jobs with a bounded in-process worker pool"""
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from app.models import AnalysisJob, CROAnalysisRequest
+from app.services.metrics import JOB_QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))              # Concurrent analyses per API process
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))      # Jobs waiting beyond this are rejected
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+MAX_PARTIAL_RESULTS = 200                                       # Per job, oldest dropped first
+
+FINISHED_STATUSES = {"completed", "failed", "cancelled"}
+
+class JobQueueFullError(Exception):
+    """Raised when the job queue is at capacity"""
+
+class JobService:
+    """Runs analysis_engine.analyze_website for queued jobs on a fixed number of workers"""
+    
+    def __init__(self, analysis_engine, workers: int = JOB_WORKERS, queue_size: int = JOB_QUEUE_SIZE):
+        self.analysis_engine = analysis_engine
+        self.worker_count = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.jobs: Dict[str, AnalysisJob] = {}
+        self.running: Dict[str, asyncio.Task] = {}
+        self.workers: List[asyncio.Task] = []
+    
+    async def start(self):
+        """Start the worker pool"""
+        if self.workers:
+            return
+        self.workers = [asyncio.create_task(self._worker(i)) for i in range(self.worker_count)]
+        logger.info(f"✅ Job service started with {self.worker_count} workers")
+    
+    async def submit(self, request: CROAnalysisRequest) -> AnalysisJob:
+        """Queue an analysis and return its job record immediately"""
+        self._prune_finished()
+        
+        job = AnalysisJob(
+            id=str(uuid.uuid4()),
+            url=str(request.url),
+            client_name=request.client_name,
+            categories=request.categories,
+            force=request.force,
+            created_at=datetime.utcnow()
+        )
+        
+        try:
+            self.queue.put_nowait(job.id)
+        except asyncio.QueueFull:
+            raise JobQueueFullError(f"Job queue is full ({self.queue.maxsize} waiting)")
+        
+        JOB_QUEUE_DEPTH.inc()
+        self.jobs[job.id] = job
+        logger.info(f"📥 Queued job {job.id} for {job.url}")
+        return job
+    
+    async def get_job(self, job_id: str) -> Optional[AnalysisJob]:
+        """Current state of a job"""
+        return self.jobs.get(job_id)
+    
+    async def cancel(self, job_id: str) -> Optional[AnalysisJob]:
+        """Cancel a queued or running job (finished jobs are returned unchanged)"""
+        job = self.jobs.get(job_id)
+        if not job or job.status in FINISHED_STATUSES:
+            return job
+        
+        task = self.running.get(job_id)
+        if task:
+            # A shared in-flight run keeps going for other callers; the engine stops it once nobody waits
+            task.cancel()
+        
+        job.status = "cancelled"
+        job.finished_at = datetime.utcnow()
+        logger.info(f"🛑 Cancelled job {job_id}")
+        return job
+    
+    async def _worker(self, worker_id: int):
+        """Take job ids off the queue and run them one at a time"""
+        while True:
+            job_id = await self.queue.get()
+            JOB_QUEUE_DEPTH.dec()
+            try:
+                job = self.jobs.get(job_id)
+                if job and job.status == "queued":
+                    await self._run_job(job)
+            except Exception as e:
+                logger.error(f"Job worker {worker_id} error: {e}")
+            finally:
+                self.queue.task_done()
+    
+    async def _run_job(self, job: AnalysisJob):
+        """Run the analysis pipeline for one job and record the outcome"""
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        
+        async def record_partial(event: Dict[str, Any]):
+            job.partial_results.append({**event, "timestamp": time.time()})
+            if len(job.partial_results) > MAX_PARTIAL_RESULTS:
+                del job.partial_results[0]
+        
+        task = asyncio.create_task(self.analysis_engine.analyze_website(
+            job.url,
+            client_name=job.client_name,
+            on_partial=record_partial,
+            categories=job.categories,
+            force=job.force
+        ))
+        self.running[job.id] = task
+        
+        try:
+            job.result = await task
+            job.status = "completed"
+            logger.info(f"✅ Job {job.id} completed")
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise  # The worker itself is shutting down
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"❌ Job {job.id} failed: {e}")
+        finally:
+            self.running.pop(job.id, None)
+            job.finished_at = job.finished_at or datetime.utcnow()
+    
+    def _prune_finished(self):
+        """Forget finished jobs past the retention window"""
+        cutoff = datetime.utcnow() - timedelta(seconds=JOB_RETENTION_SECONDS)
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.status in FINISHED_STATUSES and job.finished_at and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+    
+    async def get_status(self) -> Dict[str, Any]:
+        """Queue and worker state for health/status endpoints"""
+        counts: Dict[str, int] = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "backend": "local",
+            "workers": self.worker_count,
+            "queued": self.queue.qsize(),
+            "running": len(self.running),
+            "queue_capacity": self.queue.maxsize,
+            "jobs": counts
+        }
+    
+    async def close(self):
+        """Stop workers and cancel running jobs"""
+        for task in list(self.running.values()):
+            task.cancel()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
@@ -0,0 +1,116 @@
+"""In-process cache tier: serialized entries under a total byte budget, evicted LRU-first and expired per entry"""
+
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.services.metrics import CACHE_EVICTIONS, CACHE_MEMORY_BYTES
+
+logger = logging.getLogger(__name__)
+
+ENTRY_OVERHEAD_BYTES = 64  # Key, expiry and bookkeeping per entry, so tiny entries are not free
+
+class MemoryCache:
+    """LRU of serialized values with a byte budget and a TTL per entry
+
+    Values are stored as the bytes that would go to Redis, so their size is
+    known exactly and callers never share a mutable object. Reads move an
+    entry to the most-recent end; writes evict from the least-recent end
+    until the new entry fits. Expired entries are dropped when they are
+    read or reach the eviction end.
+    """
+    
+    def __init__(
+        self,
+        max_bytes: int,
+        max_entry_bytes: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes or max_bytes // 4  # One report must not flush the whole tier
+        self.clock = clock
+        self.entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()  # key -> (value, expires_at)
+        self.size_bytes = 0
+        
+        # Counters for status reporting
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+    
+    def get(self, key: str) -> Optional[bytes]:
+        """Stored value, or None when missing or expired"""
+        entry = self.entries.get(key)
+        if entry and entry[1] <= self.clock():
+            self._drop(key)
+            self.expirations += 1
+            CACHE_EVICTIONS.labels(reason="expired").inc()
+            entry = None
+        
+        if not entry:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+    
+    def set(self, key: str, value: bytes, ttl: float) -> bool:
+        """Store a value for ttl seconds; False when it is larger than one entry may be"""
+        size = self._size(key, value)
+        if size > self.max_entry_bytes or ttl <= 0:
+            self.rejected += 1
+            self.delete(key)  # Never leave an older value behind a failed write
+            return False
+        
+        self.delete(key)
+        while self.entries and self.size_bytes + size > self.max_bytes:
+            oldest, (_, expires_at) = next(iter(self.entries.items()))
+            self._drop(oldest)
+            reason = "expired" if expires_at <= self.clock() else "capacity"
+            if reason == "expired":
+                self.expirations += 1
+            else:
+                self.evictions += 1
+            CACHE_EVICTIONS.labels(reason=reason).inc()
+        
+        self.entries[key] = (value, self.clock() + ttl)
+        self.size_bytes += size
+        CACHE_MEMORY_BYTES.inc(size)
+        return True
+    
+    def delete(self, key: str):
+        if key in self.entries:
+            self._drop(key)
+    
+    def __contains__(self, key: str) -> bool:
+        entry = self.entries.get(key)
+        return entry is not None and entry[1] > self.clock()
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def _drop(self, key: str):
+        value, _ = self.entries.pop(key)
+        size = self._size(key, value)
+        self.size_bytes -= size
+        CACHE_MEMORY_BYTES.dec(size)
+    
+    def _size(self, key: str, value: bytes) -> int:
+        return len(key) + len(value) + ENTRY_OVERHEAD_BYTES
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Tier state for health/status endpoints"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "rejected": self.rejected
+        }
@@ -0,0 +1,121 @@
+"""Prometheus metrics for the analysis pipeline (multi-process safe)
+
+Set PROMETHEUS_MULTIPROC_DIR to an empty, writable directory before the
+app starts when running several uvicorn/gunicorn workers; every process
+then writes its samples there and /metrics aggregates them.
+"""
+
+import os
+import logging
+from typing import Tuple
+
+try:
+    from prometheus_client import (
+        CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+    )
+    from prometheus_client import multiprocess
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    logging.warning("prometheus_client not installed - /metrics disabled. Run: pip install prometheus-client")
+
+from app.services.tracing import Span, add_span_listener
+
+logger = logging.getLogger(__name__)
+
+MULTIPROCESS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Pipeline stages run from milliseconds (parsing) to minutes (Lighthouse, vision)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120)
+
+class _NoopMetric:
+    """Stands in for every metric when prometheus_client is not installed"""
+    
+    def labels(self, *args, **kwargs):
+        return self
+    
+    def inc(self, amount: float = 1):
+        pass
+    
+    def dec(self, amount: float = 1):
+        pass
+    
+    def set(self, value: float):
+        pass
+    
+    def observe(self, value: float):
+        pass
+
+if PROMETHEUS_AVAILABLE:
+    STAGE_SECONDS = Histogram(
+        "cro_stage_duration_seconds", "Duration of pipeline stages (span paths)", ["stage"], buckets=STAGE_BUCKETS
+    )
+    ANALYSES_IN_FLIGHT = Gauge(
+        "cro_analyses_in_flight", "Pipeline runs in progress", multiprocess_mode="livesum"
+    )
+    ANALYSES_TOTAL = Counter(
+        "cro_analyses_total", "Finished pipeline runs", ["outcome"]  # completed | partial | unchanged | failed
+    )
+    JOB_QUEUE_DEPTH = Gauge(
+        "cro_job_queue_depth", "Jobs waiting in in-process job queues", multiprocess_mode="livesum"
+    )
+    JOB_STREAM_DEPTH = Gauge(
+        "cro_job_stream_depth", "Jobs waiting on the Redis job stream", multiprocess_mode="livemax"
+    )
+    CACHE_REQUESTS = Counter(
+        "cro_cache_requests_total", "Analysis cache lookups", ["tier", "result"]  # tier: redis | memory
+    )
+    CACHE_EVICTIONS = Counter(
+        "cro_cache_evictions_total", "Entries dropped from the in-process memory cache", ["reason"]  # capacity | expired
+    )
+    CACHE_MEMORY_BYTES = Gauge(
+        "cro_cache_memory_bytes", "Serialized bytes held by the in-process memory cache", multiprocess_mode="livesum"
+    )
+    BROWSERS_OPEN = Gauge(
+        "cro_browsers_open", "Running Playwright browsers", multiprocess_mode="livesum"
+    )
+    PAGES_OPEN = Gauge(
+        "cro_pages_open", "Open Playwright pages", multiprocess_mode="livesum"
+    )
+    MODEL_CALLS = Counter(
+        "cro_model_calls_total", "Vision model calls by outcome", ["provider", "outcome"]
+    )
+    LIGHTHOUSE_QUEUE_WAIT = Histogram(
+        "cro_lighthouse_queue_wait_seconds", "Time a Lighthouse run waited for a worker thread",
+        buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60)
+    )
+else:
+    STAGE_SECONDS = ANALYSES_IN_FLIGHT = ANALYSES_TOTAL = JOB_QUEUE_DEPTH = JOB_STREAM_DEPTH = _NoopMetric()
+    CACHE_REQUESTS = BROWSERS_OPEN = PAGES_OPEN = MODEL_CALLS = LIGHTHOUSE_QUEUE_WAIT = _NoopMetric()
+    CACHE_EVICTIONS = CACHE_MEMORY_BYTES = _NoopMetric()
+
+def _observe_span(span: Span):
+    """Every finished pipeline span feeds the stage latency histogram"""
+    STAGE_SECONDS.labels(stage=span.path).observe(span.duration)
+
+add_span_listener(_observe_span)
+
+def track_page(page):
+    """Count a Playwright page as open until it closes (however it is closed)"""
+    PAGES_OPEN.inc()
+    page.once("close", lambda _: PAGES_OPEN.dec())
+    return page
+
+def track_browser(browser):
+    """Count a Playwright browser as running until it disconnects"""
+    BROWSERS_OPEN.inc()
+    browser.once("disconnected", lambda _: BROWSERS_OPEN.dec())
+    return browser
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Exposition payload and content type, aggregated across worker processes when configured"""
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+def mark_process_dead():
+    """Drop this process's live gauges from the shared directory on shutdown"""
+    if PROMETHEUS_AVAILABLE and MULTIPROCESS_DIR:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,172 @@
+"""Routing policy deciding whether a request needs paid vision model calls"""
+
+import time
+import json
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from app.models import AIInsights, CROData
+
+logger = logging.getLogger(__name__)
+
+FRAMEWORK_CATEGORIES = ["navigation", "display", "information", "technical", "psychological"]
+
+# Categories a vision model adds findings to (technical comes from Lighthouse/Playwright)
+VISION_CATEGORIES = {"navigation", "display", "information", "psychological", "mobile"}
+
+class ModelRouter:
+    """Decides per request whether to call the vision models, reuse their last result or skip them.
+
+    Inputs, in order of precedence:
+    - requested categories: skip when none of them benefit from vision
+    - page change: reuse the previous model result when the page is unchanged
+    - framework completeness: skip when the framework covered every category
+      and its score is decisive
+    - per-client budget: skip when the client's daily model-call budget is spent
+    """
+    
+    def __init__(
+        self,
+        decisive_score: int = 85,
+        reuse_ttl_seconds: int = 7 * 24 * 60 * 60,
+        max_remembered_pages: int = 500,
+        default_daily_budget: Optional[int] = None,
+        client_budgets: Optional[Dict[str, int]] = None
+    ):
+        self.decisive_score = decisive_score
+        self.reuse_ttl_seconds = reuse_ttl_seconds
+        self.max_remembered_pages = max_remembered_pages
+        self.default_daily_budget = default_daily_budget
+        self.client_budgets = client_budgets or {}
+        
+        # url -> {"page_hash", "insights", "timestamp"} for the last model run
+        self.last_runs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        
+        # client -> model calls made today
+        self.client_usage: Dict[str, int] = {}
+        self.usage_day = date.today()
+        
+        # Counters for status reporting
+        self.decisions: Dict[str, int] = {"call": 0, "reuse": 0, "skip": 0}
+    
+    def page_hash(self, html_data: CROData, framework_insights: Optional[AIInsights]) -> str:
+        """Fingerprint of what the models would see: extracted elements and framework findings"""
+        payload = {
+            "elements": html_data.model_dump(mode="json"),
+            "framework": framework_insights.category_scores if framework_insights else {}
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    
+    def decide(
+        self,
+        url: Optional[str],
+        client_name: Optional[str],
+        categories: Optional[List[str]],
+        framework_insights: Optional[AIInsights],
+        page_hash: str
+    ) -> Dict[str, Any]:
+        """Routing decision: action is 'call', 'reuse' or 'skip', with the reason"""
+        decision = self._decide(url, client_name, categories, framework_insights, page_hash)
+        self.decisions[decision["action"]] += 1
+        if decision["action"] == "call":
+            self._charge(client_name)
+        
+        decision.update({"client": client_name or "anonymous", "page_hash": page_hash[:16]})
+        logger.info(f"🧭 Model routing: {decision['action']} ({decision['reason']})")
+        return decision
+    
+    def _decide(
+        self,
+        url: Optional[str],
+        client_name: Optional[str],
+        categories: Optional[List[str]],
+        framework_insights: Optional[AIInsights],
+        page_hash: str
+    ) -> Dict[str, Any]:
+        if categories and not VISION_CATEGORIES.intersection(categories):
+            return {"action": "skip", "reason": f"requested categories {sorted(categories)} do not use vision models"}
+        
+        previous = self.last_runs.get(url) if url else None
+        if previous and previous["page_hash"] == page_hash:
+            age = time.time() - previous["timestamp"]
+            if age < self.reuse_ttl_seconds:
+                return {"action": "reuse", "reason": f"page unchanged since last model run {age / 3600:.1f}h ago"}
+        
+        completeness = self._framework_completeness(framework_insights)
+        if completeness == 1.0 and framework_insights.overall_score >= self.decisive_score:
+            wanted = set(categories or FRAMEWORK_CATEGORIES) & set(FRAMEWORK_CATEGORIES)
+            if all(framework_insights.category_scores.get(c, 0) >= self.decisive_score for c in wanted):
+                return {"action": "skip", "reason": f"framework result decisive (score {framework_insights.overall_score})"}
+        
+        remaining = self._remaining_budget(client_name)
+        if remaining is not None and remaining <= 0:
+            # Only until the budget resets - reports built on this decision must not be cached for long
+            return {
+                "action": "skip",
+                "reason": f"daily model budget exhausted for {client_name or 'anonymous'}",
+                "cacheable": False
+            }
+        
+        if completeness < 1.0:
+            return {"action": "call", "reason": f"framework covered {completeness:.0%} of categories"}
+        return {"action": "call", "reason": f"framework score {framework_insights.overall_score} not decisive"}
+    
+    def _framework_completeness(self, framework_insights: Optional[AIInsights]) -> float:
+        """Share of framework categories the scrape produced"""
+        if not framework_insights:
+            return 0.0
+        covered = sum(1 for category in FRAMEWORK_CATEGORIES if category in framework_insights.category_scores)
+        return covered / len(FRAMEWORK_CATEGORIES)
+    
+    def _remaining_budget(self, client_name: Optional[str]) -> Optional[int]:
+        """Model calls left today for a client (None = unlimited)"""
+        key = client_name or "anonymous"
+        budget = self.client_budgets.get(key, self.default_daily_budget)
+        if budget is None:
+            return None
+        self._roll_day()
+        return budget - self.client_usage.get(key, 0)
+    
+    def _charge(self, client_name: Optional[str]):
+        """Count one model call against the client's budget"""
+        self._roll_day()
+        key = client_name or "anonymous"
+        self.client_usage[key] = self.client_usage.get(key, 0) + 1
+    
+    def _roll_day(self):
+        """Budgets reset daily"""
+        if self.usage_day != date.today():
+            self.usage_day = date.today()
+            self.client_usage = {}
+    
+    def remember(self, url: Optional[str], page_hash: str, insights: List[AIInsights]):
+        """Store model results so an unchanged page can reuse them"""
+        if not url or not insights:
+            return
+        self.last_runs[url] = {
+            "page_hash": page_hash,
+            "insights": [result.model_dump() for result in insights],
+            "timestamp": time.time()
+        }
+        self.last_runs.move_to_end(url)
+        while len(self.last_runs) > self.max_remembered_pages:
+            self.last_runs.popitem(last=False)
+    
+    def previous_insights(self, url: str) -> List[AIInsights]:
+        """Copies of the last model results for a page"""
+        previous = self.last_runs.get(url)
+        return [AIInsights(**data) for data in previous["insights"]] if previous else []
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Router state for health/status endpoints"""
+        return {
+            "decisions": dict(self.decisions),
+            "decisive_score": self.decisive_score,
+            "remembered_pages": len(self.last_runs),
+            "default_daily_budget": self.default_daily_budget,
+            "client_budgets": dict(self.client_budgets),
+            "usage_today": dict(self.client_usage)
+        }
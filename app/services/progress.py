@@ -0,0 +1,179 @@
+"""Live progress events for one analysis: stage transitions and partial results as they land"""
+
+import io
+import time
+import base64
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Percent complete at the start and end of each pipeline stage
+STAGE_PROGRESS = {
+    "fingerprint": (0, 2),
+    "initialize": (2, 5),
+    "collection": (5, 60),
+    "visual_layout": (60, 65),
+    "vision": (65, 92),
+    "report": (92, 96),
+    "store": (96, 100)
+}
+
+PREVIEW_WIDTH = 480          # Screenshot previews sent to clients
+PREVIEW_MAX_HEIGHT = 1600    # Top of the page only
+PREVIEW_JPEG_QUALITY = 60
+
+SUBSCRIBER_QUEUE_SIZE = 200   # Events held for one slow listener before its oldest are dropped
+CLOSE_TIMEOUT_SECONDS = 2.0   # Delivery time left to listeners after the report is ready
+
+# Channel of the analysis running in the current task (tasks inherit it from the pipeline)
+_current_channel: ContextVar[Optional["ProgressChannel"]] = ContextVar("cro_progress_channel", default=None)
+
+class _Subscriber:
+    """One listener's bounded queue and the pump that feeds it"""
+
+    def __init__(self, deliver: Callable[[Dict[str, Any]], Awaitable[None]], maxsize: int):
+        self.deliver = deliver
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.pump = asyncio.create_task(self._pump())
+    
+    def offer(self, event: Optional[Dict[str, Any]]):
+        """Queue an event; when the listener is behind, its oldest queued event makes room"""
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except asyncio.QueueFull:
+                self.queue.get_nowait()
+                self.dropped += 1
+    
+    async def _pump(self):
+        while True:
+            event = await self.queue.get()
+            if event is None:
+                return
+            if self.dropped:
+                # The listener learns it missed events (the final report is never among them)
+                event = {**event, "dropped_events": self.dropped}
+                self.dropped = 0
+            try:
+                await self.deliver(event)
+            except Exception as e:
+                logger.debug(f"Progress event delivery failed: {e}")
+    
+class ProgressChannel:
+    """Ordered, non-blocking delivery of one analysis's events to its listeners
+
+    Publishing only queues the event. Every listener has its own bounded
+    queue and pump, so a slow client drops its own oldest events instead
+    of holding up the pipeline or the other listeners, and closing the
+    channel waits at most CLOSE_TIMEOUT_SECONDS for delivery.
+    """
+    
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.start = time.monotonic()
+        self.subscribers: Dict[Callable[[Dict[str, Any]], Awaitable[None]], _Subscriber] = {}
+    
+    def subscribe(self, deliver: Callable[[Dict[str, Any]], Awaitable[None]]):
+        """Add a listener for events published from now on"""
+        if deliver not in self.subscribers:
+            self.subscribers[deliver] = _Subscriber(deliver, self.queue_size)
+    
+    def unsubscribe(self, deliver: Callable[[Dict[str, Any]], Awaitable[None]]):
+        """Remove a listener, abandoning whatever it has not received yet"""
+        subscriber = self.subscribers.pop(deliver, None)
+        if subscriber:
+            subscriber.pump.cancel()
+    
+    def is_active(self) -> bool:
+        return bool(self.subscribers)
+    
+    def publish(self, event: Dict[str, Any]):
+        """Queue an event for every listener, stamped with the time since the analysis started"""
+        event = {**event, "elapsed_ms": round((time.monotonic() - self.start) * 1000)}
+        for subscriber in self.subscribers.values():
+            subscriber.offer(event)
+    
+    async def send(self, event: Dict[str, Any]):
+        """publish() as an on_partial callback, for producers that take one (e.g. streaming models)"""
+        self.publish(event)
+    
+    async def close(self, timeout: float = CLOSE_TIMEOUT_SECONDS):
+        """Give listeners a short time to receive what is queued, then stop every pump"""
+        pumps = [subscriber.pump for subscriber in self.subscribers.values()]
+        for subscriber in self.subscribers.values():
+            subscriber.offer(None)
+        if pumps:
+            await asyncio.wait(pumps, timeout=timeout)
+        for pump in pumps:
+            pump.cancel()
+
+@contextmanager
+def open_channel(channel: ProgressChannel) -> Iterator[ProgressChannel]:
+    """Make a channel current for the pipeline code run inside the block"""
+    token = _current_channel.set(channel)
+    try:
+        yield channel
+    finally:
+        _current_channel.reset(token)
+
+def listening() -> bool:
+    """Whether anyone receives events, so producers can skip building expensive payloads"""
+    channel = _current_channel.get()
+    return channel is not None and channel.is_active()
+
+def publish(kind: str, **data: Any):
+    """Send an event to the current analysis's channel, if it has one"""
+    channel = _current_channel.get()
+    if channel:
+        channel.publish({"kind": kind, **data})
+
+@contextmanager
+def stage(name: str, budget_seconds: Optional[float] = None) -> Iterator[None]:
+    """Publish started/completed/failed events around a pipeline stage
+
+    The started event carries the stage's time budget so clients can flag
+    a stage that is stuck.
+    """
+    start_progress, end_progress = STAGE_PROGRESS.get(name, (None, None))
+    started = time.monotonic()
+    publish("stage", stage=name, state="started", progress=start_progress,
+            budget_seconds=round(budget_seconds, 1) if budget_seconds is not None else None)
+    try:
+        yield
+    except BaseException as e:
+        publish("stage", stage=name, state="failed", error=type(e).__name__,
+                duration_ms=round((time.monotonic() - started) * 1000))
+        raise
+    publish("stage", stage=name, state="completed", progress=end_progress,
+            duration_ms=round((time.monotonic() - started) * 1000))
+
+def screenshot_preview(screenshot: bytes) -> Optional[Dict[str, str]]:
+    """Small JPEG of the top of a full-page capture, base64 encoded for JSON events"""
+    if not PIL_AVAILABLE:
+        return None
+    try:
+        image = Image.open(io.BytesIO(screenshot)).convert("RGB")
+        if image.width > PREVIEW_WIDTH:
+            ratio = PREVIEW_WIDTH / image.width
+            image = image.resize((PREVIEW_WIDTH, max(1, int(image.height * ratio))), Image.BILINEAR, reducing_gap=2.0)
+        if image.height > PREVIEW_MAX_HEIGHT:
+            image = image.crop((0, 0, image.width, PREVIEW_MAX_HEIGHT))
+        
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=PREVIEW_JPEG_QUALITY)
+        return {"mime_type": "image/jpeg", "data": base64.b64encode(buffer.getvalue()).decode('utf-8')}
+    except Exception as e:
+        logger.debug(f"Screenshot preview failed: {e}")
+        return None
@@ -0,0 +1,282 @@
+"""Distributed analysis jobs on a Redis stream, consumed by standalone workers (enhanced_worker.py)"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import redis.asyncio as redis
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.models import AnalysisJob, CROAnalysisRequest
+from app.services.job_service import (
+    JOB_QUEUE_SIZE, JOB_RETENTION_SECONDS, MAX_PARTIAL_RESULTS,
+    FINISHED_STATUSES, JobQueueFullError
+)
+
+logger = logging.getLogger(__name__)
+
+JOB_STREAM = "cro:jobs"
+JOB_GROUP = "cro-workers"
+
+# A job not acked or heartbeated within this window is reclaimed by another worker
+JOB_VISIBILITY_TIMEOUT_SECONDS = int(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "120"))
+JOB_MAX_DELIVERIES = int(os.getenv("JOB_MAX_DELIVERIES", "3"))  # Then the job is marked failed
+JOB_READ_BLOCK_MS = 5000
+CANCEL_POLL_SECONDS = 1.0
+
+class RedisJobQueue:
+    """Same interface as JobService, backed by a Redis stream and consumer group.
+
+    API nodes only enqueue and read job state. Worker processes call consume()
+    to take entries with XREADGROUP, heartbeat them while the analysis runs and
+    XACK once the outcome is stored. Entries left pending by a crashed worker
+    become idle and are taken over with XAUTOCLAIM after the visibility timeout.
+    """
+    
+    def __init__(self, queue_size: int = JOB_QUEUE_SIZE, visibility_timeout: int = JOB_VISIBILITY_TIMEOUT_SECONDS):
+        self.redis = None
+        self.queue_size = queue_size
+        self.visibility_timeout_ms = visibility_timeout * 1000
+        self.stopping = False
+        self.consumers: List[asyncio.Task] = []
+        self.running: Dict[str, asyncio.Task] = {}
+    
+    async def initialize(self):
+        """Connect to Redis and make sure the stream and consumer group exist (raises if unavailable)"""
+        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+        self.redis = redis.from_url(redis_url, decode_responses=True)
+        await self.redis.ping()
+        
+        try:
+            await self.redis.xgroup_create(JOB_STREAM, JOB_GROUP, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        logger.info("✅ Redis job queue connected")
+    
+    async def start(self):
+        """Nothing to start on API nodes - jobs run in enhanced_worker.py"""
+    
+    def _job_key(self, job_id: str) -> str:
+        return f"cro:job:{job_id}"
+    
+    def _partials_key(self, job_id: str) -> str:
+        return f"cro:job:{job_id}:partials"
+    
+    def _cancel_key(self, job_id: str) -> str:
+        return f"cro:job:{job_id}:cancel"
+    
+    async def submit(self, request: CROAnalysisRequest) -> AnalysisJob:
+        """Store the job record and append it to the stream"""
+        if await self.redis.xlen(JOB_STREAM) >= self.queue_size:
+            raise JobQueueFullError(f"Job queue is full ({self.queue_size} waiting)")
+        
+        job = AnalysisJob(
+            id=str(uuid.uuid4()),
+            url=str(request.url),
+            client_name=request.client_name,
+            categories=request.categories,
+            force=request.force,
+            created_at=datetime.utcnow()
+        )
+        
+        await self._save_job(job)
+        await self.redis.xadd(JOB_STREAM, {"job_id": job.id})
+        logger.info(f"📥 Queued job {job.id} for {job.url}")
+        return job
+    
+    async def get_job(self, job_id: str) -> Optional[AnalysisJob]:
+        """Current state of a job, with the partial results recorded so far"""
+        data = await self.redis.get(self._job_key(job_id))
+        if not data:
+            return None
+        
+        job = AnalysisJob(**json.loads(data))
+        partials = await self.redis.lrange(self._partials_key(job_id), 0, -1)
+        job.partial_results = [json.loads(event) for event in partials]
+        return job
+    
+    async def cancel(self, job_id: str) -> Optional[AnalysisJob]:
+        """Flag a job as cancelled; the worker running it stops within a second"""
+        job = await self.get_job(job_id)
+        if not job or job.status in FINISHED_STATUSES:
+            return job
+        
+        await self.redis.set(self._cancel_key(job_id), "1", ex=JOB_RETENTION_SECONDS)
+        job.status = "cancelled"
+        job.finished_at = datetime.utcnow()
+        await self._save_job(job)
+        logger.info(f"🛑 Cancelled job {job_id}")
+        return job
+    
+    async def _save_job(self, job: AnalysisJob):
+        """Write the job record (partial results are kept in their own list)"""
+        await self.redis.set(
+            self._job_key(job.id),
+            job.model_dump_json(exclude={"partial_results"}),
+            ex=JOB_RETENTION_SECONDS
+        )
+    
+    async def _is_cancelled(self, job_id: str) -> bool:
+        return bool(await self.redis.exists(self._cancel_key(job_id)))
+    
+    # Worker side
+    
+    async def consume(self, consumer: str, analysis_engine):
+        """Worker loop: reclaim stale entries first, otherwise block for new ones"""
+        logger.info(f"👷 Job consumer {consumer} started")
+        while not self.stopping:
+            try:
+                entries = await self._claim_stale(consumer)
+                if not entries:
+                    response = await self.redis.xreadgroup(
+                        JOB_GROUP, consumer, {JOB_STREAM: ">"}, count=1, block=JOB_READ_BLOCK_MS
+                    )
+                    entries = response[0][1] if response else []
+                
+                for entry_id, fields in entries:
+                    await self._process(consumer, entry_id, fields.get("job_id"), analysis_engine)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job consumer {consumer} error: {e}")
+                await asyncio.sleep(1)
+        logger.info(f"👋 Job consumer {consumer} stopped")
+    
+    async def _claim_stale(self, consumer: str) -> List[Any]:
+        """Take over one entry whose worker stopped heartbeating"""
+        _, entries, *_ = await self.redis.xautoclaim(
+            JOB_STREAM, JOB_GROUP, consumer, min_idle_time=self.visibility_timeout_ms, start_id="0-0", count=1
+        )
+        for entry_id, _ in entries:
+            logger.warning(f"♻️  Consumer {consumer} reclaimed stale job entry {entry_id}")
+        return entries
+    
+    async def _deliveries(self, entry_id: str) -> int:
+        """How many times an entry has been handed to a consumer"""
+        pending = await self.redis.xpending_range(JOB_STREAM, JOB_GROUP, min=entry_id, max=entry_id, count=1)
+        return pending[0]["times_delivered"] if pending else 1
+    
+    async def _ack(self, entry_id: str):
+        """Acknowledge and drop a finished entry so the stream length is the backlog"""
+        await self.redis.xack(JOB_STREAM, JOB_GROUP, entry_id)
+        await self.redis.xdel(JOB_STREAM, entry_id)
+    
+    async def _heartbeat(self, consumer: str, entry_id: str):
+        """Reset the entry's idle time so it is not reclaimed while the analysis is still running"""
+        while True:
+            await asyncio.sleep(self.visibility_timeout_ms / 3000)
+            try:
+                await self.redis.xclaim(
+                    JOB_STREAM, JOB_GROUP, consumer, min_idle_time=0, message_ids=[entry_id], justid=True
+                )
+            except Exception as e:
+                logger.warning(f"Job heartbeat failed for {entry_id}: {e}")
+    
+    async def _process(self, consumer: str, entry_id: str, job_id: Optional[str], analysis_engine):
+        """Run one job and ack its entry once the outcome is stored"""
+        job = await self.get_job(job_id) if job_id else None
+        if not job or job.status in FINISHED_STATUSES or await self._is_cancelled(job.id):
+            await self._ack(entry_id)
+            return
+        
+        if await self._deliveries(entry_id) > JOB_MAX_DELIVERIES:
+            job.status = "failed"
+            job.error = f"Abandoned after {JOB_MAX_DELIVERIES} delivery attempts"
+            job.finished_at = datetime.utcnow()
+            await self._save_job(job)
+            await self._ack(entry_id)
+            logger.error(f"❌ Job {job.id} failed: {job.error}")
+            return
+        
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        job.error = None
+        await self._save_job(job)
+        
+        async def record_partial(event: Dict[str, Any]):
+            key = self._partials_key(job.id)
+            await self.redis.rpush(key, json.dumps({**event, "timestamp": time.time()}, default=str))
+            await self.redis.ltrim(key, -MAX_PARTIAL_RESULTS, -1)
+            await self.redis.expire(key, JOB_RETENTION_SECONDS)
+        
+        heartbeat = asyncio.create_task(self._heartbeat(consumer, entry_id))
+        task = asyncio.create_task(analysis_engine.analyze_website(
+            job.url,
+            client_name=job.client_name,
+            on_partial=record_partial,
+            categories=job.categories,
+            force=job.force
+        ))
+        self.running[job.id] = task
+        
+        try:
+            while not task.done():
+                await asyncio.wait({task}, timeout=CANCEL_POLL_SECONDS)
+                if not task.done() and await self._is_cancelled(job.id):
+                    task.cancel()
+            
+            job.result = task.result()
+            if await self._is_cancelled(job.id):
+                # Cancelled after the last poll - the caller's cancel wins over the finished report
+                job.result = None
+                job.status = "cancelled"
+            else:
+                job.status = "completed"
+                logger.info(f"✅ Job {job.id} completed by {consumer}")
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                # Worker shutting down - hand the job to another worker right away
+                await asyncio.shield(self._requeue(job, entry_id))
+                raise
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"❌ Job {job.id} failed: {e}")
+        finally:
+            heartbeat.cancel()
+            self.running.pop(job.id, None)
+            if not task.done():
+                task.cancel()
+        
+        job.finished_at = job.finished_at or datetime.utcnow()
+        await self._save_job(job)
+        await self._ack(entry_id)
+    
+    async def _requeue(self, job: AnalysisJob, entry_id: str):
+        """Put an interrupted job back on the stream instead of waiting for the visibility timeout"""
+        job.status = "queued"
+        job.started_at = None
+        await self._save_job(job)
+        await self.redis.xadd(JOB_STREAM, {"job_id": job.id})
+        await self._ack(entry_id)
+        logger.info(f"↩️  Requeued job {job.id}")
+    
+    async def get_status(self) -> Dict[str, Any]:
+        """Stream backlog and consumer group state for health/status endpoints"""
+        backlog = await self.redis.xlen(JOB_STREAM)
+        pending = await self.redis.xpending(JOB_STREAM, JOB_GROUP)
+        consumers = await self.redis.xinfo_consumers(JOB_STREAM, JOB_GROUP)
+        return {
+            "backend": "redis",
+            "queued": backlog - pending["pending"],
+            "running": pending["pending"],
+            "queue_capacity": self.queue_size,
+            "consumers": len(consumers),
+            "visibility_timeout_seconds": self.visibility_timeout_ms // 1000
+        }
+    
+    async def close(self):
+        """Stop consuming; running jobs are requeued for other workers"""
+        self.stopping = True
+        for task in self.consumers:
+            task.cancel()
+        await asyncio.gather(*self.consumers, return_exceptions=True)
+        self.consumers = []
+        if self.redis:
+            await self.redis.aclose()
+            self.redis = None
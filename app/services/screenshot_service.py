@@ -6,21 +6,35 @@ import os
 from datetime import datetime
 from urllib.parse import urlparse
 from playwright.async_api import async_playwright
-from typing import Tuple
+from typing import Optional, Tuple
+
+from app.services.deadline import Deadline
+from app.services.tracing import span
+from app.services import progress
+from app.services.metrics import track_browser
+from app.services.browser_contexts import DomainContextMixin
 
 logger = logging.getLogger(__name__)
 
-class ScreenshotService:
+NAVIGATION_TIMEOUT_MS = 60000
+SETTLE_TIMEOUT_MS = 3000       # Extra wait for dynamic content after DOMContentLoaded
+CAPTURE_RESERVE_SECONDS = 3.0  # Left in the stage budget for the screenshot itself
+
+class ScreenshotService(DomainContextMixin):
     def __init__(self):
         self.playwright = None
         self.browser = None
+        self.domain_contexts = {}  # domain -> {"context": Future[BrowserContext], "refs": int}
         self.save_screenshots = True  # Set to True to save screenshots for debugging
-        
+    
     async def initialize(self):
-        """Initialize Playwright browser"""
+        """Initialize Playwright browser (once - later calls reuse the running browser)"""
+        if self.browser and self.browser.is_connected():
+            return
+        
         try:
             self.playwright = await async_playwright().start()
-            self.browser = await self.playwright.chromium.launch(
+            self.browser = track_browser(await self.playwright.chromium.launch(
                 headless=True,
                 args=[
                     '--no-sandbox', 
@@ -28,7 +42,7 @@ class ScreenshotService:
                     '--disable-blink-features=AutomationControlled',  # Avoid bot detection
                     '--disable-features=VizDisplayCompositor'
                 ]
-            )
+            ))
             logger.info("✅ Screenshot service initialized")
         except Exception as e:
             logger.error(f"❌ Failed to initialize screenshot service: {e}")
@@ -41,8 +55,12 @@ class ScreenshotService:
         timestamp = datetime.now().strftime('%H%M%S')
         return f"{domain}_{timestamp}"
     
-    async def capture_website(self, url: str) -> Tuple[bytes, bytes]:
-        """Capture desktop and mobile screenshots"""
+    async def capture_website(self, url: str, deadline: Optional[Deadline] = None) -> Tuple[bytes, bytes]:
+        """Capture desktop and mobile screenshots
+        
+        With a deadline, navigation waits are cut to the collection budget and
+        the mobile capture is skipped rather than losing the desktop one.
+        """
         if not self.browser:
             await self.initialize()
         
@@ -56,52 +74,64 @@ class ScreenshotService:
         
         try:
             # Desktop screenshot
-            page = await self.browser.new_page()
-            
-            # Set a real user agent to avoid bot detection
-            await page.set_extra_http_headers({
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36'
-            })
-            
-            await page.set_viewport_size({"width": 1920, "height": 1080})
-            
-            # More lenient navigation - use domcontentloaded instead of networkidle
-            await page.goto(url, wait_until="domcontentloaded", timeout=60000)  # Increased timeout
-            await page.wait_for_timeout(3000)  # Wait a bit more for dynamic content
-            
-            desktop_screenshot = await page.screenshot(full_page=True)
-            
-            # Save desktop screenshot for debugging
-            if self.save_screenshots:
-                desktop_path = f'screenshots/{safe_filename}_desktop.png'
-                with open(desktop_path, 'wb') as f:
-                    f.write(desktop_screenshot)
-                logger.info(f"💾 Desktop screenshot saved: {desktop_path}")
-            
-            await page.close()
+            async with self.open_page(url) as page:
+                # Set a real user agent to avoid bot detection
+                await page.set_extra_http_headers({
+                    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36'
+                })
+                
+                await page.set_viewport_size({"width": 1920, "height": 1080})
+                
+                # More lenient navigation - use domcontentloaded instead of networkidle
+                with span("desktop.goto"):
+                    await page.goto(url, wait_until="domcontentloaded", timeout=self._timeout_ms(deadline, NAVIGATION_TIMEOUT_MS))
+                with span("desktop.settle"):
+                    await page.wait_for_timeout(self._timeout_ms(deadline, SETTLE_TIMEOUT_MS))  # Wait a bit more for dynamic content
+                
+                with span("desktop.screenshot"):
+                    desktop_screenshot = await page.screenshot(full_page=True)
+                await self._publish_capture("desktop", desktop_screenshot)
+                
+                # Save desktop screenshot for debugging
+                if self.save_screenshots:
+                    desktop_path = f'screenshots/{safe_filename}_desktop.png'
+                    with open(desktop_path, 'wb') as f:
+                        f.write(desktop_screenshot)
+                    logger.info(f"💾 Desktop screenshot saved: {desktop_path}")
             
             # Mobile screenshot
-            page = await self.browser.new_page()
-            
-            # Set mobile user agent
-            await page.set_extra_http_headers({
-                'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0 Mobile/15E148 Safari/604.1'
-            })
+            if deadline and deadline.time_left("collection", CAPTURE_RESERVE_SECONDS) <= 0:
+                deadline.skip("mobile_capture", "no time left after the desktop capture")
+                return desktop_screenshot, None
             
-            await page.set_viewport_size({"width": 375, "height": 667})  # iPhone 8
-            await page.goto(url, wait_until="domcontentloaded", timeout=60000)  # Increased timeout
-            await page.wait_for_timeout(3000)
-            
-            mobile_screenshot = await page.screenshot(full_page=True)
-            
-            # Save mobile screenshot for debugging
-            if self.save_screenshots:
-                mobile_path = f'screenshots/{safe_filename}_mobile.png'
-                with open(mobile_path, 'wb') as f:
-                    f.write(mobile_screenshot)
-                logger.info(f"💾 Mobile screenshot saved: {mobile_path}")
-            
-            await page.close()
+            async with self.open_page(url) as page:
+                # Set mobile user agent
+                await page.set_extra_http_headers({
+                    'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0 Mobile/15E148 Safari/604.1'
+                })
+                
+                await page.set_viewport_size({"width": 375, "height": 667})  # iPhone 8
+                try:
+                    with span("mobile.goto"):
+                        await page.goto(url, wait_until="domcontentloaded", timeout=self._timeout_ms(deadline, NAVIGATION_TIMEOUT_MS))
+                    with span("mobile.settle"):
+                        await page.wait_for_timeout(self._timeout_ms(deadline, SETTLE_TIMEOUT_MS))
+                except Exception as e:
+                    if not deadline:
+                        raise
+                    deadline.skip("mobile_capture", f"navigation did not finish in time: {e}")
+                    return desktop_screenshot, None
+                
+                with span("mobile.screenshot"):
+                    mobile_screenshot = await page.screenshot(full_page=True)
+                await self._publish_capture("mobile", mobile_screenshot)
+                
+                # Save mobile screenshot for debugging
+                if self.save_screenshots:
+                    mobile_path = f'screenshots/{safe_filename}_mobile.png'
+                    with open(mobile_path, 'wb') as f:
+                        f.write(mobile_screenshot)
+                    logger.info(f"💾 Mobile screenshot saved: {mobile_path}")
             
             logger.info(f"📸 Screenshots captured for {url}")
             
@@ -109,13 +139,26 @@ class ScreenshotService:
                 logger.info(f"🔍 Check screenshots folder for visual analysis:")
                 logger.info(f"   Desktop: screenshots/{safe_filename}_desktop.png")
                 logger.info(f"   Mobile:  screenshots/{safe_filename}_mobile.png")
-            
+        
         except Exception as e:
             logger.error(f"Screenshot capture failed for {url}: {e}")
             raise
         
         return desktop_screenshot, mobile_screenshot
     
+    async def _publish_capture(self, viewport: str, screenshot: bytes):
+        """Send a preview of a fresh capture to live progress listeners"""
+        if not progress.listening():
+            return
+        preview = await asyncio.to_thread(progress.screenshot_preview, screenshot)
+        progress.publish("screenshot", viewport=viewport, size_bytes=len(screenshot), preview=preview)
+    
+    def _timeout_ms(self, deadline: Optional[Deadline], cap_ms: int) -> int:
+        """Playwright timeout within the collection budget"""
+        if not deadline:
+            return cap_ms
+        return deadline.timeout_ms("collection", cap_ms, reserve=CAPTURE_RESERVE_SECONDS)
+    
     async def close(self):
         """Close browser and playwright"""
         if self.browser:
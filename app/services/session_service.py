@@ -0,0 +1,303 @@
+"""Multiplexed analysis sessions: many analyses and job subscriptions over one websocket
+
+Client messages (JSON text frames, or binary frames with encoding=msgpack / compress=zlib):
+
+    {"type": "submit", "request_id": "r1", "url": "...", "client_name": null, "categories": null, "force": false}
+    {"type": "subscribe", "request_id": "r2", "job_id": "..."}
+    {"type": "cancel", "request_id": "r1"}
+
+Every server message carries the request_id it belongs to and one of the types
+accepted, event, result, error or cancelled.
+"""
+
+import os
+import json
+import zlib
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+SESSION_CONCURRENCY = int(os.getenv("SESSION_CONCURRENCY", "4"))       # Analyses running at once per connection
+SESSION_MAX_REQUESTS = int(os.getenv("SESSION_MAX_REQUESTS", "200"))   # Queued + running + subscribed per connection
+SESSION_OUTBOX_SIZE = 1000                                              # Frames waiting for a slow client
+JOB_POLL_SECONDS = 1.0                                                  # Job subscriptions read the job store
+
+TERMINAL_JOB_STATUSES = ("completed", "failed", "cancelled")
+
+class SessionProtocolError(Exception):
+    """Raised for a client message the session cannot act on"""
+
+class AnalysisSession:
+    """State of one multiplexed connection
+
+    Submitted analyses wait in a FIFO and at most `concurrency` run at once,
+    so a client that submits hundreds of URLs shares the engine with other
+    clients instead of flooding it, and its own requests start in the order
+    they were sent. Outgoing frames go through one writer task, which keeps
+    frames whole when many analyses report at the same time.
+    
+    A cancelled analysis (cancel message or disconnect) keeps its slot until
+    the engine has stopped the pipeline behind it, so cancelling and
+    resubmitting, or reconnecting, never leaves more than `concurrency`
+    of this client's pipelines running.
+    """
+    
+    def __init__(self, websocket: WebSocket, service: "SessionService", encoding: str, compress: bool):
+        self.websocket = websocket
+        self.service = service
+        self.encoding = encoding
+        self.compress = compress
+        self.requests: Dict[str, asyncio.Task] = {}
+        self.waiting: Deque[str] = deque()
+        self.running = 0
+        self.slot_freed = asyncio.Condition()
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=SESSION_OUTBOX_SIZE)
+    
+    async def run(self):
+        """Read client messages until the connection closes, then stop this session's work"""
+        writer = asyncio.create_task(self._write_frames())
+        try:
+            while True:
+                message = await self._receive()
+                if message is None:
+                    break
+                try:
+                    self._handle(message)
+                except SessionProtocolError as e:
+                    await self.send({"type": "error", "request_id": message.get("request_id"), "error": str(e)})
+        finally:
+            for task in list(self.requests.values()):
+                task.cancel()
+            await asyncio.gather(*self.requests.values(), return_exceptions=True)
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
+    
+    def _handle(self, message: Dict[str, Any]):
+        kind = message.get("type")
+        request_id = message.get("request_id")
+        if not isinstance(request_id, str) or not request_id:
+            raise SessionProtocolError("request_id (string) is required")
+        
+        if kind == "cancel":
+            task = self.requests.get(request_id)
+            if not task:
+                raise SessionProtocolError(f"Unknown request_id {request_id}")
+            task.cancel()
+            return
+        
+        if request_id in self.requests:
+            raise SessionProtocolError(f"request_id {request_id} is already in use")
+        if len(self.requests) >= SESSION_MAX_REQUESTS:
+            raise SessionProtocolError(f"Too many open requests on this session (limit {SESSION_MAX_REQUESTS})")
+        
+        if kind == "submit":
+            if not message.get("url"):
+                raise SessionProtocolError("url is required")
+            task = asyncio.create_task(self._analyze(request_id, message))
+        elif kind == "subscribe":
+            if not message.get("job_id"):
+                raise SessionProtocolError("job_id is required")
+            task = asyncio.create_task(self._follow_job(request_id, message["job_id"]))
+        else:
+            raise SessionProtocolError(f"Unknown message type {kind!r}")
+        
+        self.requests[request_id] = task
+        task.add_done_callback(lambda _: self.requests.pop(request_id, None))
+    
+    async def _analyze(self, request_id: str, message: Dict[str, Any]):
+        """Wait for a session slot, run the analysis and report its events and result"""
+        self.waiting.append(request_id)
+        await self.send({"type": "accepted", "request_id": request_id, "position": len(self.waiting)})
+        acquired = False
+        try:
+            async with self.slot_freed:
+                await self.slot_freed.wait_for(
+                    lambda: self.running < self.service.concurrency and self.waiting[0] == request_id
+                )
+                self.waiting.popleft()
+                self.running += 1
+                acquired = True
+                self.slot_freed.notify_all()
+            
+            async def forward_event(event: Dict[str, Any]):
+                await self.send({"type": "event", "request_id": request_id, **event})
+            
+            start_time = time.time()
+            report = await self.service.analysis_engine.analyze_website(
+                message["url"],
+                client_name=message.get("client_name"),
+                on_partial=forward_event,
+                categories=message.get("categories"),
+                force=bool(message.get("force"))
+            )
+            self.service.analyses_completed += 1
+            await self.send({
+                "type": "result",
+                "request_id": request_id,
+                "elapsed_seconds": round(time.time() - start_time, 2),
+                "report": report.model_dump(mode="json")
+            })
+        except asyncio.CancelledError:
+            # analyze_website only re-raises once the run it was the last waiter of has stopped
+            self.service.analyses_cancelled += 1
+            self._send_nowait({"type": "cancelled", "request_id": request_id})
+            raise
+        except Exception as e:
+            self.service.analyses_failed += 1
+            logger.error(f"❌ Session analysis failed for {message['url']}: {e}")
+            await self.send({"type": "error", "request_id": request_id, "error": str(e)})
+        finally:
+            if request_id in self.waiting:
+                self.waiting.remove(request_id)
+            async with self.slot_freed:
+                if acquired:
+                    self.running -= 1
+                self.slot_freed.notify_all()
+    
+    async def _follow_job(self, request_id: str, job_id: str):
+        """Relay a background job's new partial results, then its outcome"""
+        job_service = self.service.job_service
+        if not job_service:
+            await self.send({"type": "error", "request_id": request_id, "error": "Jobs are not available"})
+            return
+        
+        last_seen = 0.0
+        try:
+            while True:
+                job = await job_service.get_job(job_id)
+                if not job:
+                    await self.send({"type": "error", "request_id": request_id, "error": "Job not found"})
+                    return
+                
+                for event in job.partial_results:
+                    if event.get("timestamp", 0) > last_seen:
+                        last_seen = event["timestamp"]
+                        await self.send({"type": "event", "request_id": request_id, **event})
+                
+                if job.status in TERMINAL_JOB_STATUSES:
+                    await self.send({
+                        "type": "result",
+                        "request_id": request_id,
+                        "job": job.model_dump(mode="json", exclude={"partial_results"})
+                    })
+                    return
+                await asyncio.sleep(JOB_POLL_SECONDS)
+        except asyncio.CancelledError:
+            # Only stops following; the job itself keeps running (POST /api/jobs/{id}/cancel stops it)
+            self._send_nowait({"type": "cancelled", "request_id": request_id})
+            raise
+    
+    async def send(self, message: Dict[str, Any]):
+        """Queue a frame for the writer (waits while a slow client's outbox is full)"""
+        await self.outbox.put(message)
+    
+    def _send_nowait(self, message: Dict[str, Any]):
+        """Queue a frame without waiting (best effort, used while a request is being cancelled)"""
+        try:
+            self.outbox.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+    
+    async def _write_frames(self):
+        while True:
+            message = await self.outbox.get()
+            try:
+                await self._send_frame(message)
+            except Exception as e:
+                logger.debug(f"Session frame delivery failed: {e}")
+                return
+    
+    async def _send_frame(self, message: Dict[str, Any]):
+        if self.encoding == "msgpack":
+            payload = msgpack.packb(message, default=str)
+        else:
+            payload = json.dumps(message, default=str).encode("utf-8")
+        
+        if self.compress:
+            await self.websocket.send_bytes(zlib.compress(payload))
+        elif self.encoding == "msgpack":
+            await self.websocket.send_bytes(payload)
+        else:
+            await self.websocket.send_text(payload.decode("utf-8"))
+    
+    async def _receive(self) -> Optional[Dict[str, Any]]:
+        """Next client message, or None once the connection is closed"""
+        while True:
+            frame = await self.websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                return None
+            
+            try:
+                if frame.get("bytes") is not None:
+                    payload = frame["bytes"]
+                    if self.compress:
+                        payload = zlib.decompress(payload)
+                    message = msgpack.unpackb(payload) if self.encoding == "msgpack" else json.loads(payload)
+                else:
+                    message = json.loads(frame.get("text") or "")
+            except Exception as e:
+                await self.send({"type": "error", "request_id": None, "error": f"Unreadable message: {e}"})
+                continue
+            
+            if isinstance(message, dict):
+                return message
+            await self.send({"type": "error", "request_id": None, "error": "Messages must be objects"})
+
+class SessionService:
+    """Accepts multiplexed analysis sessions (/api/session/ws) and tracks their totals"""
+    
+    def __init__(self, analysis_engine, job_service=None, concurrency: int = SESSION_CONCURRENCY):
+        self.analysis_engine = analysis_engine
+        self.job_service = job_service
+        self.concurrency = concurrency
+        
+        # Counters for status reporting
+        self.active_sessions = 0
+        self.analyses_completed = 0
+        self.analyses_failed = 0
+        self.analyses_cancelled = 0
+    
+    async def serve(self, websocket: WebSocket):
+        """Run one session; encoding=json|msgpack and compress=zlib come from the query string"""
+        encoding = websocket.query_params.get("encoding", "json").lower()
+        compress = websocket.query_params.get("compress", "").lower() == "zlib"
+        
+        await websocket.accept()
+        if encoding not in ("json", "msgpack") or (encoding == "msgpack" and not MSGPACK_AVAILABLE):
+            await websocket.send_json({"type": "error", "request_id": None, "error": f"Unsupported encoding {encoding!r}"})
+            await websocket.close(code=1003)
+            return
+        
+        self.active_sessions += 1
+        logger.info(f"🔌 Analysis session opened (encoding={encoding}, compress={compress})")
+        try:
+            await AnalysisSession(websocket, self, encoding, compress).run()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self.active_sessions -= 1
+            logger.info("🔌 Analysis session closed")
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Session state for health/status endpoints"""
+        return {
+            "active_sessions": self.active_sessions,
+            "concurrency_per_session": self.concurrency,
+            "max_requests_per_session": SESSION_MAX_REQUESTS,
+            "msgpack": MSGPACK_AVAILABLE,
+            "analyses_completed": self.analyses_completed,
+            "analyses_failed": self.analyses_failed,
+            "analyses_cancelled": self.analyses_cancelled
+        }
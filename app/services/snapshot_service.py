@@ -0,0 +1,177 @@
+"""Structural page snapshots for incremental re-analysis: re-run only the stages whose page regions changed"""
+
+import os
+import re
+import copy
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+from pydantic import BaseModel
+from sqlalchemy import select
+
+from app.database import async_session, PageSnapshot as PageSnapshotRecord
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAX_AGE_DAYS = int(os.getenv("SNAPSHOT_MAX_AGE_DAYS", "7"))  # Older baselines are not compared against
+
+# Page regions, each hashed on its own (selectors follow what the framework analyzers read)
+REGION_SELECTORS = {
+    "navigation": "header, nav, .menu, .navigation, .breadcrumb, .breadcrumbs, [class*=\"breadcrumb\"], .navigation-path",
+    "content": "h1, .product-title, .product-name, [class*=\"title\"], [class*=\"description\"], [class*=\"product\"] img, "
+               "img, [class*=\"offer\"], [class*=\"discount\"], [class*=\"sale\"], [class*=\"price\"]",
+    "trust": ".trust, .security, .badge, .verified, .guarantee, [class*=\"trust\"], [class*=\"security\"], "
+             "[class*=\"verified\"], .faq, [class*=\"faq\"]",
+}
+
+# Regions each framework analyzer depends on
+CATEGORY_REGIONS = {
+    "navigation": ["navigation"],
+    "display": ["styles", "layout"],
+    "information": ["content"],
+    "technical": ["resources"],       # Lighthouse - reused while the page loads the same scripts, styles and images
+    "psychological": ["trust", "text"]
+}
+
+WHITESPACE = re.compile(r"\s+")
+
+def stage_scopes(url: str) -> Dict[str, Tuple[str, str]]:
+    """Stage cache entries a page's collection can reuse: name -> (namespace, scope)"""
+    scopes = {"cro_data": ("cro_data", url), "lighthouse": ("lighthouse", url)}
+    scopes.update({f"framework:{category}": ("framework", f"{url}|{category}") for category in CATEGORY_REGIONS})
+    return scopes
+
+def region_hashes(soup: BeautifulSoup) -> Dict[str, str]:
+    """Short hash per page region"""
+    parts: Dict[str, List[str]] = {region: [str(el) for el in soup.select(selector)] for region, selector in REGION_SELECTORS.items()}
+    
+    parts["styles"] = [style.string or "" for style in soup.find_all("style")]
+    parts["styles"] += [el.get("style", "") for el in soup.find_all(style=True)]
+    parts["layout"] = [
+        f"{el.name}:{int(bool(el.get_text(strip=True)))}" for el in soup.find_all(["div", "section", "article"])
+    ]
+    parts["resources"] = [
+        el.get("src") or el.get("href") or "" for el in soup.find_all(["script", "link", "img", "iframe"])
+        if el.get("src") or el.get("href")
+    ]
+    parts["text"] = [soup.get_text(" ", strip=True)]
+    
+    return {
+        region: hashlib.sha256(WHITESPACE.sub(" ", "\n".join(values)).encode("utf-8")).hexdigest()[:16]
+        for region, values in parts.items()
+    }
+
+class PageSnapshot:
+    """Region hashes of one analysis plus the stage results it can reuse or has computed
+
+    Threaded through collection like the deadline: the engine loads the
+    cached stage entries (see stage_scopes), the scraper captures the
+    regions, and the scraper and framework take every stage whose
+    invalidation key - the hashes of the regions it reads - still matches.
+    Stages that had to run are recorded in `fresh` for the engine to cache.
+    """
+    
+    def __init__(self, previous: Optional[Dict[str, Any]] = None, cached: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.previous = previous
+        self.cached = cached or {}                          # stage name -> stage cache entry {"key", "data", ...}
+        self.regions: Dict[str, str] = {}
+        self.fresh: Dict[str, Tuple[str, Any]] = {}         # stage name -> (invalidation key, JSON-ready result)
+        self.categories: List[str] = []
+        self.reused: List[str] = []
+    
+    def capture(self, soup: BeautifulSoup):
+        self.regions = region_hashes(soup)
+    
+    def changed_regions(self) -> List[str]:
+        if not self.previous:
+            return list(self.regions)
+        old = self.previous.get("regions", {})
+        return [region for region, digest in self.regions.items() if old.get(region) != digest]
+    
+    def region_key(self, regions: Optional[List[str]] = None) -> str:
+        """Invalidation key of a stage reading the given regions (all regions by default)"""
+        names = regions if regions is not None else sorted(self.regions)
+        return hashlib.sha256("|".join(f"{name}={self.regions.get(name, '')}" for name in names).encode()).hexdigest()[:16]
+    
+    def cached_stage(self, name: str, key: str) -> Optional[Any]:
+        """Cached result of a stage whose invalidation key still matches (a copy), else None"""
+        entry = self.cached.get(name)
+        if not self.regions or not entry or entry.get("key") != key:
+            return None
+        self.reused.append(name)
+        return copy.deepcopy(entry["data"])
+    
+    def store(self, name: str, key: str, data: Any):
+        """Keep a freshly computed stage result for the stage cache"""
+        self.fresh[name] = (key, data)
+    
+    def reusable(self, category: str) -> Optional[Dict[str, Any]]:
+        """Cached result for a framework category whose regions are unchanged, else None"""
+        return self.cached_stage(f"framework:{category}", self.region_key(CATEGORY_REGIONS.get(category, ["text"])))
+        
+    def record(self, category: str, analysis: Dict[str, Any], cacheable: bool = True):
+        """Note a finished category; fresh, complete results (JSON-ready) go to the stage cache"""
+        self.categories.append(category)
+        name = f"framework:{category}"
+        if cacheable and self.regions and name not in self.reused:
+            self.store(name, self.region_key(CATEGORY_REGIONS.get(category, ["text"])), {
+                key: value.model_dump() if isinstance(value, BaseModel) else value for key, value in analysis.items()
+            })
+    
+    def summary(self) -> Dict[str, Any]:
+        """Report metadata: what changed and which stages came from the stage cache"""
+        return {
+            "baseline": self.previous is not None,
+            "changed_regions": self.changed_regions(),
+            "reused_categories": [name.split(":", 1)[1] for name in self.reused if name.startswith("framework:")],
+            "reused_stages": list(self.reused)
+        }
+
+class SnapshotService:
+    """Stores the region hashes of the last analysis per analysis key (URL plus the options that change the report)
+
+    Stage results themselves live in the stage cache (CacheService.get_stage),
+    each namespace with its own TTL; the stored regions only tell the report
+    what changed since the last analysis.
+    """
+    
+    async def load(self, analysis_key: str) -> Optional[Dict[str, Any]]:
+        """Previous snapshot, if recent enough to compare against"""
+        try:
+            async with async_session() as session:
+                result = await session.execute(
+                    select(PageSnapshotRecord).where(PageSnapshotRecord.analysis_key == analysis_key)
+                )
+                row = result.scalar_one_or_none()
+        except Exception as e:
+            logger.warning(f"Page snapshot lookup failed: {e}")
+            return None
+        
+        if not row or datetime.utcnow() - row.created_at > timedelta(days=SNAPSHOT_MAX_AGE_DAYS):
+            return None
+        return {"regions": row.regions or {}}
+    
+    async def save(self, analysis_key: str, url: str, snapshot: PageSnapshot):
+        """Replace the stored snapshot with this analysis's (only when the regions were captured)"""
+        if not snapshot.regions:
+            return
+        
+        try:
+            async with async_session() as session:
+                result = await session.execute(
+                    select(PageSnapshotRecord).where(PageSnapshotRecord.analysis_key == analysis_key)
+                )
+                row = result.scalar_one_or_none()
+                if not row:
+                    row = PageSnapshotRecord(analysis_key=analysis_key)
+                    session.add(row)
+                
+                row.url = url
+                row.regions = snapshot.regions
+                row.created_at = datetime.utcnow()
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Failed to store page snapshot: {e}")
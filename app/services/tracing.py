@@ -0,0 +1,110 @@
+"""Nested timing spans for the analysis pipeline, mirrored to OpenTelemetry when it is installed"""
+
+import time
+import logging
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    from opentelemetry import trace
+    OTEL_AVAILABLE = True
+except ImportError:
+    OTEL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# With only opentelemetry-api installed the tracer is a no-op; spans are exported once an
+# SDK and exporter are configured (e.g. running under opentelemetry-instrument)
+_tracer = trace.get_tracer("cro-analyzer") if OTEL_AVAILABLE else None
+
+# Innermost open span of the current task (tasks inherit their creator's span)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("cro_current_span", default=None)
+
+# Called with every finished span (e.g. to feed latency histograms)
+_span_listeners: List[Callable[["Span"], None]] = []
+
+class Span:
+    """One timed operation and the spans opened inside it"""
+    
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.parent = parent
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.children: List["Span"] = []
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+        self.otel_span = None
+    
+    @property
+    def path(self) -> str:
+        """Span names from the root joined by "/", e.g. analysis/collection/scraping"""
+        return f"{self.parent.path}/{self.name}" if self.parent else self.name
+    
+    @property
+    def duration(self) -> float:
+        """Seconds spent so far (final once the span has ended)"""
+        return (self.end or time.perf_counter()) - self.start
+    
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+        if self.otel_span is not None:
+            self.otel_span.set_attribute(key, _otel_value(value))
+    
+    def breakdown(self) -> Dict[str, float]:
+        """Compact timings in ms: "total" plus one entry per nested span path, e.g. "collection/scraping/goto".
+
+        Spans with the same path (retries, repeated calls) are summed.
+        """
+        timings = {"total": round(self.duration * 1000, 1)}
+        self._collect(timings, "")
+        return timings
+    
+    def _collect(self, timings: Dict[str, float], prefix: str):
+        for child in self.children:
+            path = f"{prefix}{child.name}"
+            timings[path] = round(timings.get(path, 0.0) + child.duration * 1000, 1)
+            child._collect(timings, f"{path}/")
+
+def _otel_value(value: Any) -> Any:
+    """OpenTelemetry attributes only take primitives"""
+    return value if isinstance(value, (str, bool, int, float)) else str(value)
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Time a block as a child of the current span"""
+    parent = _current_span.get()
+    current = Span(name, parent, attributes)
+    if parent:
+        parent.children.append(current)
+    
+    token = _current_span.set(current)
+    otel_context = _tracer.start_as_current_span(
+        name, attributes={key: _otel_value(value) for key, value in attributes.items()}
+    ) if _tracer else nullcontext()
+    
+    with otel_context as otel_span:
+        current.otel_span = otel_span
+        try:
+            yield current
+        except BaseException as e:
+            # Includes cancellation by a deadline or a disconnected client
+            current.error = type(e).__name__
+            raise
+        finally:
+            current.end = time.perf_counter()
+            _current_span.reset(token)
+            for listener in _span_listeners:
+                try:
+                    listener(current)
+                except Exception as e:
+                    logger.debug(f"Span listener failed: {e}")
+
+def add_span_listener(listener: Callable[[Span], None]):
+    """Register a callback for finished spans"""
+    _span_listeners.append(listener)
+
+def current_span() -> Optional[Span]:
+    """Innermost open span, if any"""
+    return _current_span.get()
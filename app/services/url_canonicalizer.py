@@ -0,0 +1,84 @@
+"""URL canonicalization for cache, single-flight and database keys"""
+
+import os
+import re
+from typing import List, Optional
+from urllib.parse import urlsplit, urlunsplit, quote_plus, unquote_plus, urljoin
+
+# Query parameters that only track the visit ("prefix*" matches a family), comma-separated to override
+TRACKING_PARAMS: List[str] = [
+    param.strip().lower() for param in os.getenv(
+        "URL_TRACKING_PARAMS",
+        "utm_*,gclid,dclid,gbraid,wbraid,fbclid,msclkid,yclid,twclid,igshid,mc_cid,mc_eid,_ga,_gl,_hsenc,_hsmi,srsltid,ref_src"
+    ).split(",") if param.strip()
+]
+
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+LINK_TAG = re.compile(r"<link\b[^>]*>", re.I)
+REL_CANONICAL = re.compile(r"\brel\s*=\s*[\"']?[^\"'>]*\bcanonical\b", re.I)
+HREF = re.compile(r"\bhref\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s>]+))", re.I)
+
+def is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return any(name.startswith(param[:-1]) if param.endswith("*") else name == param for param in TRACKING_PARAMS)
+
+def canonicalize_url(url: str) -> str:
+    """One spelling per page: lowercase scheme and host, no default port, fragment or tracking
+    parameters, sorted query and no trailing slash (except the root path)
+    """
+    parts = urlsplit(str(url).strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    if ":" in host:
+        host = f"[{host}]"  # IPv6 literal
+    netloc = host
+    if parts.port and str(parts.port) != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+    if parts.username:
+        netloc = f"{parts.username}{':' + parts.password if parts.password else ''}@{netloc}"
+    
+    return urlunsplit((
+        scheme,
+        netloc,
+        parts.path.rstrip("/") or "/",
+        canonical_query(parts.query),
+        ""  # Fragments never reach the server
+    ))
+
+def canonical_query(query: str) -> str:
+    """Query without tracking parameters, sorted and consistently encoded
+    
+    A parameter keeps its own spelling: "?flag" and "?flag=" can mean
+    different things to the server, so only the latter gets an "=".
+    """
+    params = []
+    for field in query.split("&"):
+        if not field:
+            continue
+        name, separator, value = field.partition("=")
+        name, value = unquote_plus(name), unquote_plus(value)
+        if not is_tracking_param(name):
+            params.append((name, separator, value))
+    
+    return "&".join(
+        f"{quote_plus(name)}{separator}{quote_plus(value)}" for name, separator, value in sorted(params)
+    )
+
+def same_site(url: str, other: str) -> bool:
+    """Whether two URLs are on the same host (ignoring www. and http/https)"""
+    def site(value: str) -> str:
+        host = (urlsplit(value).hostname or "").rstrip(".")
+        return host[4:] if host.startswith("www.") else host
+    return bool(site(url)) and site(url) == site(other)
+
+def canonical_link(html: str, base_url: str) -> Optional[str]:
+    """Absolute target of the document's <link rel="canonical">, if it declares one"""
+    for tag in LINK_TAG.findall(html):
+        if not REL_CANONICAL.search(tag):
+            continue
+        match = HREF.search(tag)
+        href = next((group for group in match.groups() if group), "") if match else ""
+        if href.strip():
+            return urljoin(base_url, href.strip())
+    return None
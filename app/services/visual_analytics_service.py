@@ -0,0 +1,261 @@
+"""Pixel-level visual analytics on captured screenshots (NumPy, no model calls)"""
+
+import io
+import time
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import numpy as np
+    from PIL import Image
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logging.warning("numpy/Pillow not installed - visual analytics disabled. Run: pip install numpy Pillow")
+
+logger = logging.getLogger(__name__)
+
+# Fold heights match the ScreenshotService viewports
+DESKTOP_FOLD = 1080
+MOBILE_FOLD = 667
+
+ANALYSIS_WIDTH = 480          # Screenshots are downscaled to this width before analysis
+MAX_PAGE_FOLDS = 6            # Only the first few screens are analyzed
+GRID_COLUMNS = 8              # Content density grid (above the fold)
+GRID_ROWS = 6
+CONTENT_THRESHOLD = 12        # Luminance distance from background counted as content
+EDGE_THRESHOLD = 24           # Luminance step counted as an edge
+
+PALETTE_CLUSTERS = 8          # k for k-means palette extraction
+PALETTE_SAMPLE = 10000        # Pixels sampled for clustering
+PALETTE_ITERATIONS = 10
+PALETTE_MIN_SHARE = 0.01      # Clusters below this share are not counted as palette colors
+MAX_CTAS = 20                 # CTA boxes measured per page
+CTA_RING = 12                 # Surrounding ring width (px) used as CTA background
+
+class VisualAnalyticsService:
+    """Computes layout signals (density, whitespace, clutter, visual weight) from screenshots"""
+    
+    def analyze_layout(
+        self,
+        desktop_screenshot: Optional[bytes],
+        mobile_screenshot: Optional[bytes],
+        cta_boxes: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Analyze desktop and mobile captures (blocking, run via asyncio.to_thread)
+        
+        cta_boxes are document-coordinate boxes ({x, y, width, height}) on the
+        desktop capture; when given, each CTA's contrast against its
+        surroundings is measured alongside the desktop palette.
+        """
+        if not NUMPY_AVAILABLE:
+            return {}
+        
+        start_time = time.time()
+        results = {}
+        
+        for viewport, screenshot, fold in (
+            ("desktop", desktop_screenshot, DESKTOP_FOLD),
+            ("mobile", mobile_screenshot, MOBILE_FOLD)
+        ):
+            if not screenshot:
+                continue
+            try:
+                image = self._load_image(screenshot, fold)
+                small, scale = self._downscale(image)
+                luminance = np.asarray(small.convert("L"), dtype=np.float32)
+                results[viewport] = self._layout_metrics(luminance, scale, fold)
+                
+                if viewport == "desktop":
+                    results["colors"] = self._color_metrics(image, small, cta_boxes or [], fold)
+            except Exception as e:
+                logger.warning(f"Visual layout analysis failed for {viewport}: {e}")
+        
+        if results:
+            logger.info(f"🧮 Visual layout analytics computed in {(time.time() - start_time) * 1000:.0f}ms")
+        
+        return results
+    
+    def _load_image(self, screenshot: bytes, fold: int) -> "Image.Image":
+        """Decode and crop to the analyzed folds (RGB, full resolution)"""
+        image = Image.open(io.BytesIO(screenshot))
+        
+        # Crop before converting/resizing so very long pages stay cheap
+        return image.crop((0, 0, image.width, min(image.height, fold * MAX_PAGE_FOLDS))).convert("RGB")
+    
+    def _downscale(self, image: "Image.Image") -> Tuple["Image.Image", float]:
+        """Downscale to ANALYSIS_WIDTH"""
+        scale = min(1.0, ANALYSIS_WIDTH / image.width)
+        if scale < 1.0:
+            # reducing_gap box-reduces first, which is much cheaper than a full bilinear pass
+            image = image.resize((ANALYSIS_WIDTH, max(1, int(image.height * scale))), Image.BILINEAR, reducing_gap=2.0)
+        return image, scale
+    
+    def _layout_metrics(self, luminance: "np.ndarray", scale: float, fold: int) -> Dict[str, Any]:
+        """Vectorized layout metrics for one viewport"""
+        fold_rows = max(1, min(luminance.shape[0], int(fold * scale)))
+        
+        # Background is the dominant luminance level (pages are mostly one background color)
+        histogram = np.bincount(luminance.astype(np.uint8).ravel(), minlength=256)
+        background = float(histogram.argmax())
+        contrast = np.abs(luminance - background)
+        content = contrast > CONTENT_THRESHOLD
+        
+        # Edge map from horizontal and vertical luminance steps
+        edges = np.zeros_like(content)
+        edges[:, 1:] |= np.abs(np.diff(luminance, axis=1)) > EDGE_THRESHOLD
+        edges[1:, :] |= np.abs(np.diff(luminance, axis=0)) > EDGE_THRESHOLD
+        
+        above, below = slice(0, fold_rows), slice(fold_rows, None)
+        has_below = luminance.shape[0] > fold_rows
+        
+        # Visual weight: distance from background, boosted where edges (text, borders) are
+        weight = contrast / 255.0 + edges
+        total_weight = float(weight.sum()) or 1.0
+        
+        return {
+            "whitespace_above_fold": round(1.0 - float(content[above].mean()), 3),
+            "whitespace_below_fold": round(1.0 - float(content[below].mean()), 3) if has_below else None,
+            "clutter_above_fold": round(float(edges[above].mean()) * 100, 1),
+            "clutter_below_fold": round(float(edges[below].mean()) * 100, 1) if has_below else None,
+            "density_grid": self._density_grid(content[above]),
+            "visual_weight": self._weight_distribution(weight[above], float(weight[above].sum()) / total_weight),
+            "background_luminance": int(background),
+            "analyzed_height": int(luminance.shape[0] / scale)
+        }
+    
+    def _density_grid(self, content: "np.ndarray") -> list:
+        """Content fraction per cell of a GRID_ROWS x GRID_COLUMNS grid"""
+        rows = np.array_split(np.arange(content.shape[0]), GRID_ROWS)
+        cols = np.array_split(np.arange(content.shape[1]), GRID_COLUMNS)
+        return [
+            [round(float(content[r[0]:r[-1] + 1, c[0]:c[-1] + 1].mean()), 2) if len(r) and len(c) else 0.0 for c in cols]
+            for r in rows
+        ]
+    
+    def _weight_distribution(self, weight: "np.ndarray", share_above_fold: float) -> Dict[str, Any]:
+        """Where the visual weight sits above the fold"""
+        total = float(weight.sum())
+        if total == 0:
+            return {"share_above_fold": 0.0, "center_x": 0.5, "center_y": 0.5, "quadrants": {}}
+        
+        height, width = weight.shape
+        ys, xs = np.arange(height), np.arange(width)
+        center_y = float((weight.sum(axis=1) * ys).sum() / total / max(1, height - 1))
+        center_x = float((weight.sum(axis=0) * xs).sum() / total / max(1, width - 1))
+        
+        mid_y, mid_x = height // 2, width // 2
+        quadrants = {
+            "top_left": weight[:mid_y, :mid_x].sum(),
+            "top_right": weight[:mid_y, mid_x:].sum(),
+            "bottom_left": weight[mid_y:, :mid_x].sum(),
+            "bottom_right": weight[mid_y:, mid_x:].sum()
+        }
+        
+        return {
+            "share_above_fold": round(share_above_fold, 3),
+            "center_x": round(center_x, 3),
+            "center_y": round(center_y, 3),
+            "quadrants": {name: round(float(value) / total, 3) for name, value in quadrants.items()}
+        }
+    
+    def _color_metrics(self, image: "Image.Image", small: "Image.Image", cta_boxes: List[Dict[str, Any]], fold: int) -> Dict[str, Any]:
+        """Screenshot palette plus WCAG contrast of each CTA against its surroundings"""
+        palette = self._extract_palette(np.asarray(small, dtype=np.float32).reshape(-1, 3))
+        
+        pixels = np.asarray(image) if cta_boxes else None
+        cta_contrast = []
+        for index, box in enumerate(cta_boxes[:MAX_CTAS]):
+            measured = self._cta_contrast(pixels, box)
+            if measured:
+                measured.update({
+                    "index": box.get("index", index),
+                    "text": box.get("text", ""),
+                    "above_fold": box["y"] < fold
+                })
+                cta_contrast.append(measured)
+        
+        return {
+            "palette": palette,
+            "palette_size": sum(1 for color in palette if color["share"] >= PALETTE_MIN_SHARE),
+            "cta_contrast": cta_contrast,
+            "low_contrast_ctas": sum(1 for cta in cta_contrast if cta["contrast_ratio"] < 3.0)
+        }
+    
+    def _extract_palette(self, pixels: "np.ndarray") -> List[Dict[str, Any]]:
+        """Vectorized k-means over a pixel sample, largest clusters first"""
+        if len(pixels) > PALETTE_SAMPLE:
+            step = len(pixels) // PALETTE_SAMPLE
+            pixels = pixels[::step][:PALETTE_SAMPLE]
+        
+        # Deterministic init: the most common coarse (4-bit per channel) colors
+        coarse = (pixels // 16).astype(np.int32)
+        codes = coarse[:, 0] * 256 + coarse[:, 1] * 16 + coarse[:, 2]
+        counts = np.bincount(codes, minlength=4096)
+        top_codes = np.argsort(counts)[::-1][:PALETTE_CLUSTERS]
+        top_codes = top_codes[counts[top_codes] > 0]
+        centers = np.stack([top_codes // 256, (top_codes // 16) % 16, top_codes % 16], axis=1).astype(np.float32) * 16 + 8
+        
+        for _ in range(PALETTE_ITERATIONS):
+            distances = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+            labels = distances.argmin(axis=1)
+            sums = np.zeros_like(centers)
+            np.add.at(sums, labels, pixels)
+            sizes = np.bincount(labels, minlength=len(centers)).astype(np.float32)
+            occupied = sizes > 0
+            centers[occupied] = sums[occupied] / sizes[occupied, None]
+        
+        shares = sizes / sizes.sum()
+        order = np.argsort(shares)[::-1]
+        return [
+            {"hex": self._to_hex(centers[i]), "share": round(float(shares[i]), 3)}
+            for i in order if shares[i] > 0
+        ]
+    
+    def _cta_contrast(self, pixels: "np.ndarray", box: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Contrast between a CTA's fill and the ring of pixels around it"""
+        height, width = pixels.shape[:2]
+        x0, y0 = max(0, int(box["x"])), max(0, int(box["y"]))
+        x1, y1 = min(width, int(box["x"] + box["width"])), min(height, int(box["y"] + box["height"]))
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            return None
+        
+        # Fill is the most common color inside the box (text is the minority)
+        button_color = self._dominant_color(pixels[y0:y1, x0:x1].reshape(-1, 3))
+        
+        rx0, ry0 = max(0, x0 - CTA_RING), max(0, y0 - CTA_RING)
+        rx1, ry1 = min(width, x1 + CTA_RING), min(height, y1 + CTA_RING)
+        ring = pixels[ry0:ry1, rx0:rx1]
+        mask = np.ones(ring.shape[:2], dtype=bool)
+        mask[y0 - ry0:y1 - ry0, x0 - rx0:x1 - rx0] = False
+        if not mask.any():
+            return None
+        background_color = self._dominant_color(ring[mask])
+        
+        return {
+            "button_color": self._to_hex(button_color),
+            "background_color": self._to_hex(background_color),
+            "contrast_ratio": round(self._contrast_ratio(button_color, background_color), 2)
+        }
+    
+    def _dominant_color(self, pixels: "np.ndarray") -> "np.ndarray":
+        """Mean color of the most common coarse color bucket"""
+        coarse = (pixels // 16).astype(np.int32)
+        codes = coarse[:, 0] * 256 + coarse[:, 1] * 16 + coarse[:, 2]
+        return pixels[codes == np.bincount(codes).argmax()].mean(axis=0)
+    
+    def _contrast_ratio(self, first: "np.ndarray", second: "np.ndarray") -> float:
+        """WCAG 2.x contrast ratio between two sRGB colors"""
+        lighter, darker = sorted((self._relative_luminance(first), self._relative_luminance(second)), reverse=True)
+        return (lighter + 0.05) / (darker + 0.05)
+    
+    def _relative_luminance(self, color: "np.ndarray") -> float:
+        """WCAG relative luminance"""
+        channels = np.asarray(color, dtype=np.float64) / 255.0
+        linear = np.where(channels <= 0.03928, channels / 12.92, ((channels + 0.055) / 1.055) ** 2.4)
+        return float(linear @ np.array([0.2126, 0.7152, 0.0722]))
+    
+    def _to_hex(self, color: "np.ndarray") -> str:
+        """#rrggbb"""
+        r, g, b = (int(round(float(c))) for c in color[:3])
+        return f"#{r:02x}{g:02x}{b:02x}"
@@ -0,0 +1,222 @@
+"""Claude Vision Model for CRO Analysis - secondary provider for hedged requests"""
+
+import os
+import time
+import json
+import logging
+from typing import Dict, List, Any
+
+try:
+    import anthropic
+    ANTHROPIC_AVAILABLE = True
+except ImportError:
+    ANTHROPIC_AVAILABLE = False
+    logging.warning("anthropic not installed - Claude vision disabled. Run: pip install anthropic")
+
+from app.models import AIInsights, CROData, Recommendation
+from gemini_vision_model import DESKTOP_IMAGE_LIMITS, MOBILE_IMAGE_LIMITS, prepare_screenshot
+
+logger = logging.getLogger(__name__)
+
+CLAUDE_MODEL = os.getenv("CLAUDE_MODEL", "claude-3-5-sonnet-20241022")
+CLAUDE_MAX_TOKENS = 2000
+
+class ClaudeVisionModel:
+    """Claude Vision API integration with the same contract as GeminiVisionModel"""
+    
+    def __init__(self):
+        self.api_key = os.getenv("CLAUDE_API_KEY")
+        self.client = None
+        self.enabled = False
+    
+    async def initialize(self):
+        """Initialize Claude API client"""
+        if not ANTHROPIC_AVAILABLE:
+            logger.warning("⚠️  Claude SDK not available. Install with: pip install anthropic")
+            self.enabled = False
+            return
+        
+        if not self.api_key:
+            logger.warning("⚠️  Claude API key not provided. Set CLAUDE_API_KEY environment variable")
+            self.enabled = False
+            return
+        
+        try:
+            self.client = anthropic.AsyncAnthropic(api_key=self.api_key)
+            self.enabled = True
+            logger.info("✅ Claude API client initialized")
+        except Exception as e:
+            logger.error(f"❌ Failed to initialize Claude client: {e}")
+            self.enabled = False
+    
+    async def analyze_screenshot(self, screenshot: bytes, html_data: CROData) -> AIInsights:
+        """Analyze a desktop screenshot using Claude Vision"""
+        if not self.enabled:
+            return self._get_mock_analysis()
+        
+        content = [
+            self._prepare_image(screenshot, DESKTOP_IMAGE_LIMITS),
+            {"type": "text", "text": self._generate_prompt(html_data)}
+        ]
+        return await self._run_analysis(content)
+    
+    async def analyze_multi_viewport(
+        self,
+        desktop_screenshot: bytes,
+        mobile_screenshot: bytes,
+        html_data: CROData
+    ) -> AIInsights:
+        """Analyze desktop and mobile screenshots together in a single Claude request"""
+        if not self.enabled:
+            return self._get_mock_analysis()
+        
+        content = [
+            {"type": "text", "text": "Image 1: desktop viewport (1920px wide)."},
+            self._prepare_image(desktop_screenshot, DESKTOP_IMAGE_LIMITS),
+            {"type": "text", "text": "Image 2: mobile viewport (375px wide)."},
+            self._prepare_image(mobile_screenshot, MOBILE_IMAGE_LIMITS),
+            {"type": "text", "text": self._generate_prompt(html_data, multi_viewport=True)}
+        ]
+        return await self._run_analysis(content)
+    
+    async def _run_analysis(self, content: List[Dict[str, Any]]) -> AIInsights:
+        """Send the request and parse the JSON answer"""
+        start_time = time.time()
+        
+        try:
+            response = await self.client.messages.create(
+                model=CLAUDE_MODEL,
+                max_tokens=CLAUDE_MAX_TOKENS,
+                messages=[{"role": "user", "content": content}]
+            )
+            
+            insights = self._parse_response(response.content[0].text)
+            logger.info(f"✅ Claude analysis completed in {time.time() - start_time:.2f}s")
+            return insights
+        
+        except Exception as e:
+            logger.error(f"Claude analysis failed: {e}")
+            return self._get_mock_analysis()
+    
+    def _prepare_image(self, screenshot: bytes, limits: tuple) -> Dict[str, Any]:
+        """Base64 image block for a screenshot downscaled to the given limits"""
+        media_type, data = prepare_screenshot(screenshot, limits)
+        return {
+            "type": "image",
+            "source": {
+                "type": "base64",
+                "media_type": media_type,
+                "data": data
+            }
+        }
+    
+    def _generate_prompt(self, html_data: CROData, multi_viewport: bool = False) -> str:
+        """Generate analysis prompt (same categories and JSON shape as the Gemini prompt)"""
+        viewport_note = (
+            "The first image is the desktop page and the second the mobile page. "
+            "Put mobile-specific problems in mobile_issues."
+            if multi_viewport else
+            "Analyze this desktop website screenshot."
+        )
+        
+        return f"""You are a CRO (conversion rate optimization) expert. {viewport_note}
+
+HTML Elements Found:
+- CTA Buttons: {len(html_data.cta_buttons)}
+- Trust Signals: {len(html_data.trust_signals)}
+- Forms: {len(html_data.forms)}
+- Product Images: {len(html_data.product_images)}
+- Coupon Fields: {len(html_data.coupon_fields)}
+- Delivery Info: {len(html_data.delivery_info)}
+
+Respond with ONLY a JSON object with this structure:
+{{
+  "overall_score": 78,
+  "category_scores": {{
+    "navigation": 80,
+    "display": 75,
+    "information": 70,
+    "technical": 85,
+    "psychological": 72
+  }},
+  "recommendations": [
+    {{
+      "category": "psychological",
+      "priority": "high",
+      "issue": "Security badges not visible above the fold",
+      "solution": "Move payment and SSL badges next to the primary CTA",
+      "impact": "Could increase conversions by 8-12%"
+    }}
+  ],
+  "visual_issues": ["Primary CTA blends with the hero background"],
+  "mobile_issues": ["Touch targets smaller than 44px"]
+}}
+
+Categories: navigation (menus, search, wayfinding), display (visual hierarchy, layout, color),
+information (product details, clarity of the offer), technical (speed, rendering, responsiveness),
+psychological (trust, urgency, social proof). Priorities are high, medium or low."""
+
+    def _parse_response(self, response_text: str) -> AIInsights:
+        """Parse Claude's JSON response"""
+        try:
+            json_start = response_text.find('{')
+            json_end = response_text.rfind('}') + 1
+            if json_start == -1:
+                raise ValueError("No JSON found in response")
+            
+            data = json.loads(response_text[json_start:json_end])
+            
+            recommendations = []
+            for rec_data in data.get('recommendations', []):
+                recommendations.append(Recommendation(
+                    category=rec_data.get('category', 'display'),
+                    priority=rec_data.get('priority', 'medium'),
+                    issue=rec_data.get('issue', ''),
+                    solution=rec_data.get('solution', ''),
+                    impact=rec_data.get('impact', ''),
+                    source="claude"
+                ))
+            
+            return AIInsights(
+                overall_score=data.get('overall_score', 0),
+                category_scores=data.get('category_scores', {}),
+                recommendations=recommendations,
+                visual_issues=data.get('visual_issues', []),
+                mobile_issues=data.get('mobile_issues', [])
+            )
+        
+        except Exception as e:
+            logger.error(f"Failed to parse Claude response: {e}")
+            return self._get_mock_analysis()
+    
+    def _get_mock_analysis(self) -> AIInsights:
+        """Mock analysis when Claude is not available"""
+        return AIInsights(
+            overall_score=75,
+            category_scores={},
+            recommendations=[
+                Recommendation(
+                    category="system",
+                    priority="medium",
+                    issue="Claude Vision not available",
+                    solution="Configure CLAUDE_API_KEY to enable the secondary vision provider",
+                    impact="Would cut tail latency by hedging slow Gemini requests",
+                    source="claude"
+                )
+            ],
+            visual_issues=["Claude analysis unavailable"]
+        )
+    
+    def is_enabled(self) -> bool:
+        """Check if Claude model is enabled"""
+        return self.enabled
+    
+    def get_model_name(self) -> str:
+        """Get model name"""
+        return "Claude Vision"
+    
+    async def close(self):
+        """Close the HTTP client"""
+        if self.client:
+            await self.client.close()
+            self.client = None
@@ -4,17 +4,28 @@ import uuid
 import asyncio
 import logging
 from datetime import datetime
-from typing import Tuple
+from typing import Tuple, Optional, Callable, Awaitable, Dict, Any, List
 
 from app.models import CROAnalysisResponse, CategoryScores, AIInsights, CROData
 from app.services.cache_service import CacheService
 from app.services.screenshot_service import ScreenshotService
+from app.services.visual_analytics_service import VisualAnalyticsService
+from app.services.deadline import Deadline
+from app.services.fingerprint_service import FingerprintService
+from app.services.snapshot_service import PageSnapshot, SnapshotService, stage_scopes
+from app.services.tracing import span
+from app.services.progress import ProgressChannel, open_channel, publish, stage
+from app.services.metrics import ANALYSES_IN_FLIGHT, ANALYSES_TOTAL
+from app.services.screenshot_service import CAPTURE_RESERVE_SECONDS
+from framework_config import get_framework_config
 from enhanced_scraping_service import EnhancedScrapingService
 from enhanced_vision_manager import EnhancedVisionManager
 from app.database import async_session, WebsiteAnalysis
 
 logger = logging.getLogger(__name__)
 
+FLIGHT_CANCEL_WAIT_SECONDS = 10.0  # How long the last cancelled caller waits for the abandoned run to stop
+
 class EnhancedCROAnalysisEngine:
     """Enhanced CRO Analysis Engine with Framework Integration"""
     
@@ -23,42 +34,224 @@ class EnhancedCROAnalysisEngine:
         self.vision_manager = vision_manager
         self.screenshot_service = ScreenshotService()
         self.scraping_service = EnhancedScrapingService()
-        
-    async def analyze_website(self, url: str, client_name: str = None) -> CROAnalysisResponse:
-        """Run enhanced CRO analysis with framework integration"""
+        self.visual_analytics = VisualAnalyticsService()
+        self.fingerprint_service = FingerprintService()
+        self.snapshot_service = SnapshotService()
+        
+        # Single-flight: key -> {"task", "waiters", "channel"} for analyses currently running
+        self.in_flight: Dict[str, Dict[str, Any]] = {}
+        
+    async def analyze_website(
+        self,
+        url: str,
+        client_name: str = None,
+        on_partial: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        categories: Optional[List[str]] = None,
+        force: bool = False
+    ) -> CROAnalysisResponse:
+        """Run enhanced CRO analysis with framework integration
+        
+        on_partial, when given, receives live progress events before the final
+        report is returned: stage transitions ({"kind": "stage", ...}) and
+        partial results such as screenshots, framework category scores,
+        Lighthouse metrics and AI recommendations as the model streams them.
+        categories (framework category names) lets the model router skip
+        vision calls the client does not need. Unless force is set, a cached
+        report is returned, and a page whose main document has not changed
+        since its last full analysis gets that report back without running
+        the browser. Cache, single-flight and database keys use the page's
+        canonical URL, so tracking parameters and other spellings of the same
+        page share one analysis.
+        """
         logger.info(f"🔍 Starting enhanced CRO analysis for: {url}")
+        page_url = await self.cache_service.resolve_url(url)
         
         # Check cache first
-        cached_result = await self.cache_service.get_cached_analysis(url)
-        if cached_result:
-            logger.info(f"📦 Returning cached analysis for: {url}")
-            return cached_result
-        
-        # Initialize services
-        await self._initialize_services()
-        
-        # Run enhanced data collection
-        screenshot_data, html_and_framework_data = await self._run_enhanced_collection(url)
-        
-        # Unpack the enhanced data
-        html_data, framework_insights = html_and_framework_data
-        
-        # Run AI analysis with framework integration
-        if screenshot_data and screenshot_data[0]:  # Desktop screenshot
-            combined_insights = await self.vision_manager.analyze_with_all_models_and_framework(
-                screenshot_data[0], html_data, framework_insights
+        if not force:
+            cached_result = await self.cache_service.get_cached_analysis(
+                page_url, self._report_variant(client_name, categories)
             )
+            if cached_result:
+                logger.info(f"📦 Returning cached analysis for: {url}")
+                return cached_result
+        
+        # Concurrent callers for the same page and options share one pipeline run
+        analysis_key = self._single_flight_key(page_url, client_name, categories)
+        key = f"{analysis_key}|force" if force else analysis_key
+        flight = self.in_flight.get(key)
+        if flight:
+            logger.info(f"🔗 Joining in-flight analysis for: {url} ({flight['waiters'] + 1} waiting)")
         else:
-            combined_insights = await self.vision_manager.analyze_with_all_models_and_framework(
-                b'', html_data, framework_insights
+            flight = {"waiters": 0, "channel": ProgressChannel()}
+            flight["task"] = asyncio.create_task(
+                self._run_analysis(key, url, page_url, client_name, categories, flight["channel"], analysis_key, force)
             )
+            flight["task"].add_done_callback(lambda task: self._finish_flight(key, flight))
+            self.in_flight[key] = flight
         
-        # Generate enhanced report
-        report = await self._generate_enhanced_report(url, combined_insights, html_data)
+        if on_partial:
+            flight["channel"].subscribe(on_partial)
+        
+        flight["waiters"] += 1
+        try:
+            # shield: a caller that disconnects must not cancel the run for everyone else
+            return await asyncio.shield(flight["task"])
+        finally:
+            flight["waiters"] -= 1
+            if on_partial:
+                flight["channel"].unsubscribe(on_partial)
+            if flight["waiters"] == 0 and not flight["task"].done():
+                # The last caller was cancelled - stop the run rather than finish it for nobody
+                await self._cancel_flight(key, flight)
+    
+    def _report_variant(self, client_name: Optional[str], categories: Optional[List[str]]) -> str:
+        """Report cache variant: client and categories change routing, so their reports are kept apart"""
+        if not client_name and not categories:
+            return ""
+        return f"{client_name or ''}|{','.join(sorted(categories or []))}"
+    
+    def _single_flight_key(self, page_url: str, client_name: Optional[str], categories: Optional[List[str]]) -> str:
+        """Canonical URL plus the options that change the result"""
+        return "|".join([page_url, client_name or "", ",".join(sorted(categories or []))])
+    
+    async def _cancel_flight(self, key: str, flight: Dict[str, Any]):
+        """Cancel an abandoned run and wait (bounded) until it has released its browser pages, processes and lease"""
+        if self.in_flight.get(key) is flight:
+            del self.in_flight[key]  # New callers start a fresh run
+        logger.info(f"🛑 Cancelling analysis nobody is waiting for: {key}")
+        flight["task"].cancel()
+        await asyncio.wait({flight["task"]}, timeout=FLIGHT_CANCEL_WAIT_SECONDS)
+    
+    def _finish_flight(self, key: str, flight: Dict[str, Any]):
+        """Drop a completed flight so later callers start fresh (or hit the cache)"""
+        if self.in_flight.get(key) is flight:
+            del self.in_flight[key]
+        # Mark the exception as retrieved in case every caller has gone away
+        if not flight["task"].cancelled():
+            flight["task"].exception()
+    
+    async def _run_analysis(
+        self,
+        key: str,
+        url: str,
+        page_url: str,
+        client_name: Optional[str],
+        categories: Optional[List[str]],
+        channel: ProgressChannel,
+        analysis_key: str,
+        force: bool
+    ) -> CROAnalysisResponse:
+        """Run the pipeline once across all API nodes
+        
+        The node holding the Redis lease runs the analysis; other nodes wait
+        for its "ready" message and read the cached report. If the wait fails
+        or times out, this node runs the analysis itself.
+        """
+        token = await self.cache_service.acquire_analysis_lease(key)
+        if token is None:
+            logger.info(f"🌐 Another node is analyzing {url}, waiting for its result")
+            result = await self.cache_service.wait_for_analysis(
+                page_url, key, self._report_variant(client_name, categories)
+            )
+            if result:
+                return result
+            token = await self.cache_service.acquire_analysis_lease(key)
         
-        # Cache and store results
-        await self.cache_service.cache_analysis(url, report)
-        await self._store_enhanced_analysis(report, framework_insights)
+        keepalive = asyncio.create_task(self.cache_service.keep_analysis_lease(key, token)) if token else None
+        succeeded = False
+        ANALYSES_IN_FLIGHT.inc()
+        try:
+            report = await self._run_pipeline(url, page_url, client_name, categories, channel, analysis_key, force)
+            succeeded = True
+            ANALYSES_TOTAL.labels(outcome=self._outcome(report)).inc()
+            return report
+        finally:
+            ANALYSES_IN_FLIGHT.dec()
+            if not succeeded:
+                ANALYSES_TOTAL.labels(outcome="failed").inc()
+            if keepalive:
+                keepalive.cancel()
+                await self.cache_service.release_analysis_lease(key, token, succeeded)
+    
+    async def _run_pipeline(
+        self,
+        url: str,
+        page_url: str,
+        client_name: Optional[str],
+        categories: Optional[List[str]],
+        channel: ProgressChannel,
+        analysis_key: str,
+        force: bool = False
+    ) -> CROAnalysisResponse:
+        """Full pipeline for one page; the result populates the cache for every waiting caller
+        
+        Stages share the FrameworkConfig.MAX_ANALYSIS_TIME deadline. A stage
+        that overruns its budget is dropped and the report lists it under
+        analysis_metadata["skipped_stages"]; only reports missing a required
+        stage (not Lighthouse or the mobile capture) are treated as partial.
+        
+        A conditional fetch of the main document runs first; when the page
+        has not changed since its last full analysis, the stored report is
+        returned with a refreshed analysis_date (skipped with force). When
+        it has changed, stages are taken from the stage cache where their
+        inputs are unchanged (each namespace keeps its own TTL): extracted
+        elements, framework categories, Lighthouse and vision insights.
+        force recomputes every stage and refreshes the cache.
+        
+        The browser loads url as requested; caches and stored records use
+        page_url, its canonical form. A rel=canonical link found by the
+        fingerprint fetch maps url to that page for later requests.
+        
+        The channel receives stage events and partial results (screenshots,
+        framework category scores, Lighthouse, AI findings) in the order the
+        pipeline produces them.
+        """
+        config = get_framework_config()
+        deadline = Deadline(config.MAX_ANALYSIS_TIME, config.STAGE_BUDGET_SHARES)
+        
+        with open_channel(channel), span("analysis", url=url) as trace:
+            try:
+                with span("fingerprint"), stage("fingerprint"):
+                    check = await self.fingerprint_service.check(analysis_key, url, force)
+                if check["fingerprint"] and check["fingerprint"]["canonical"]:
+                    await self.cache_service.remember_canonical(url, check["fingerprint"]["canonical"])
+                if check["prior_report"]:
+                    report = self._reuse_unchanged(check["prior_report"], check["analyzed_at"])
+                    await self.cache_service.cache_analysis(
+                        page_url, report, variant=self._report_variant(client_name, categories)
+                    )
+                    logger.info(f"♻️  {url} unchanged since {check['analyzed_at']:%Y-%m-%d %H:%M}, reusing its report")
+                    return report
+                
+                if force:
+                    snapshot = PageSnapshot()
+                else:
+                    previous, cached = await asyncio.gather(
+                        self.snapshot_service.load(analysis_key), self._load_stage_cache(page_url)
+                    )
+                    snapshot = PageSnapshot(previous, cached)
+                report, framework_insights = await self._run_stages(
+                    url, client_name, categories, deadline, snapshot, channel.send, analysis_key, force
+                )
+                report.analysis_metadata["incremental"] = snapshot.summary()
+                report.analysis_metadata["timings_ms"] = trace.breakdown()
+                
+                # Cache and store results (partial reports only briefly, so the page is soon analyzed in full)
+                with span("store"), stage("store"):
+                    await self.cache_service.cache_analysis(
+                        page_url, report,
+                        ttl=self._report_ttl(report, deadline),
+                        variant=self._report_variant(client_name, categories)
+                    )
+                    await self._store_enhanced_analysis(report, framework_insights, page_url)
+                    await self._cache_stages(page_url, snapshot)
+                    if not deadline.incomplete():  # A skipped Lighthouse run or mobile capture still counts as complete
+                        # Served for as long as the page stays unchanged, so only a report with real model results
+                        if self._cacheable_vision(report.visual_analysis, deadline):
+                            await self.fingerprint_service.record(analysis_key, page_url, check["fingerprint"], report)
+                        await self.snapshot_service.save(analysis_key, page_url, snapshot)
+            finally:
+                await channel.close()
         
         logger.info(f"✅ Enhanced analysis completed for {url}")
         logger.info(f"📊 Overall Score: {report.overall_score}")
@@ -67,38 +260,201 @@ class EnhancedCROAnalysisEngine:
         
         return report
     
-    async def _run_enhanced_collection(self, url: str) -> Tuple[Tuple, Tuple[CROData, AIInsights]]:
-        """Run enhanced data collection with framework analysis"""
+    def _reuse_unchanged(self, prior: CROAnalysisResponse, analyzed_at: datetime) -> CROAnalysisResponse:
+        """The last full report for an unchanged page, dated now"""
+        report = prior.model_copy(deep=True)
+        report.analysis_date = datetime.utcnow()
+        report.analysis_metadata["unchanged_since"] = analyzed_at.isoformat()
+        publish("unchanged", analyzed_at=analyzed_at.isoformat(), overall_score=report.overall_score)
+        return report
+    
+    async def _load_stage_cache(self, url: str) -> Dict[str, Dict[str, Any]]:
+        """Cached stage entries for the page, by stage name (see stage_scopes)"""
+        scopes = stage_scopes(url)
+        entries = await asyncio.gather(*(
+            self.cache_service.get_stage(namespace, scope) for namespace, scope in scopes.values()
+        ))
+        return {name: entry for name, entry in zip(scopes, entries) if entry}
+    
+    async def _cache_stages(self, url: str, snapshot: PageSnapshot):
+        """Write the stages this run computed to their namespaces (reused stages keep their original expiry)"""
+        scopes = stage_scopes(url)
+        await asyncio.gather(*(
+            self.cache_service.cache_stage(*scopes[name], key, data) for name, (key, data) in snapshot.fresh.items()
+        ))
+        if snapshot.fresh:
+            logger.info(f"🗂️  Cached stages for {url}: {', '.join(snapshot.fresh)}")
+    
+    def _outcome(self, report: CROAnalysisResponse) -> str:
+        """Metrics label for a finished run"""
+        if report.analysis_metadata.get("unchanged_since"):
+            return "unchanged"
+        return "partial" if report.analysis_metadata.get("skipped_stages") else "completed"
+    
+    async def _run_stages(
+        self,
+        url: str,
+        client_name: Optional[str],
+        categories: Optional[List[str]],
+        deadline: Deadline,
+        snapshot: PageSnapshot,
+        on_partial: Optional[Callable[[Dict[str, Any]], Awaitable[None]]],
+        analysis_key: Optional[str] = None,
+        force: bool = False
+    ) -> Tuple[CROAnalysisResponse, AIInsights]:
+        """Collection, layout, vision and report stages; returns the report and the framework insights"""
         
-        # Run screenshot capture and enhanced scraping in parallel
-        screenshot_task = asyncio.create_task(self._capture_screenshots(url))
-        scraping_task = asyncio.create_task(self._extract_enhanced_elements(url))
+        # Initialize services
+        with span("initialize"), stage("initialize"):
+            await self._initialize_services()
+        
+        # Run enhanced data collection
+        with span("collection"), stage("collection", deadline.time_left("collection")):
+            screenshot_data, html_and_framework_data = await self._run_enhanced_collection(url, deadline, snapshot)
+        
+        # Unpack the enhanced data
+        html_data, framework_insights = html_and_framework_data
+        
+        # Pixel-level layout, palette and CTA contrast metrics feed the display category
+        if screenshot_data and screenshot_data[0]:
+            with span("visual_layout"), stage("visual_layout", deadline.time_left("visual_layout")):
+                visual_layout = await deadline.run("visual_layout", asyncio.to_thread(
+                    self.visual_analytics.analyze_layout, screenshot_data[0], screenshot_data[1],
+                    self._measurable_cta_boxes(html_data)
+                ))
+            if visual_layout:
+                self._apply_cta_prominence(html_data, visual_layout)
+                framework_insights = self.scraping_service.framework.apply_visual_layout(framework_insights, visual_layout)
+        
+        # Vision insights are cached per analysis key while the models would see the same page
+        vision_scope = analysis_key or url
+        vision_key = self.vision_manager.router.page_hash(html_data, framework_insights)
+        cached_vision = None if force else await self.cache_service.get_stage("vision", vision_scope)
+        
+        # Run AI analysis with framework integration
+        with span("vision"), stage("vision", deadline.time_left("vision")):
+            if cached_vision and cached_vision["key"] == vision_key:
+                combined_insights = AIInsights(**cached_vision["data"])
+                snapshot.reused.append("vision")
+                publish("vision_reused", cached_at=cached_vision.get("cached_at"))
+            elif screenshot_data and screenshot_data[0]:  # Desktop screenshot (+ mobile when captured)
+                combined_insights = await self.vision_manager.analyze_with_all_models_and_framework(
+                    screenshot_data[0], html_data, framework_insights,
+                    mobile_screenshot=screenshot_data[1],
+                    on_partial=on_partial,
+                    url=url, client_name=client_name, categories=categories,
+                    deadline=deadline
+                )
+            else:
+                combined_insights = await self.vision_manager.analyze_with_all_models_and_framework(
+                    b'', html_data, framework_insights, on_partial=on_partial,
+                    url=url, client_name=client_name, categories=categories,
+                    deadline=deadline
+                )
+        if "vision" not in snapshot.reused and self._cacheable_vision(combined_insights, deadline):
+            await self.cache_service.cache_stage("vision", vision_scope, vision_key, combined_insights.model_dump(mode="json"))
+        
+        # Generate enhanced report
+        with span("report"), stage("report"):
+            report = await self._generate_enhanced_report(url, combined_insights, html_data, deadline)
+        publish("scores", overall_score=report.overall_score, category_scores=report.category_scores.model_dump())
         
-        # Wait for both tasks
-        screenshot_data, html_and_framework_data = await asyncio.gather(
-            screenshot_task, scraping_task, return_exceptions=True
+        return report, framework_insights
+    
+    def _report_ttl(self, report: CROAnalysisResponse, deadline: Deadline) -> Optional[int]:
+        """Report cache TTL: the default for complete reports, briefly for partial or temporarily routed-away ones"""
+        routing = report.visual_analysis.routing_decision or {}
+        if deadline.incomplete() or routing.get("cacheable") is False:
+            return self.cache_service.partial_cache_ttl
+        return None
+    
+    def _cacheable_vision(self, insights: AIInsights, deadline: Deadline) -> bool:
+        """Only complete model results are kept - a degraded, cut-off or routed-away run would hide the models for the whole TTL"""
+        routing = insights.routing_decision
+        return (
+            not insights.degraded
+            and not deadline.missed("vision")
+            and (routing is None or routing.get("action") == "call")
         )
+    
+    def _measurable_cta_boxes(self, html_data: CROData) -> List[Dict[str, Any]]:
+        """CTA boxes located in the rendered page"""
+        boxes = []
+        for index, cta in enumerate(html_data.cta_buttons):
+            if not cta.located:
+                continue
+            position = cta.position
+            boxes.append({
+                "index": index,
+                "text": cta.text,
+                "x": position.x,
+                "y": position.y,
+                "width": position.width,
+                "height": position.height
+            })
+        return boxes
+    
+    def _apply_cta_prominence(self, html_data: CROData, visual_layout: Dict[str, Any]):
+        """Measured contrast replaces the class-name prominence guess"""
+        for measured in visual_layout.get("colors", {}).get("cta_contrast", []):
+            html_data.cta_buttons[measured["index"]].prominent = measured["contrast_ratio"] >= 3.0
+    
+    async def _run_enhanced_collection(
+        self,
+        url: str,
+        deadline: Deadline,
+        snapshot: Optional[PageSnapshot] = None
+    ) -> Tuple[Tuple, Tuple[CROData, AIInsights]]:
+        """Run enhanced data collection with framework analysis"""
         
-        # Handle errors gracefully
-        if isinstance(screenshot_data, Exception):
-            logger.error(f"Screenshot capture failed: {screenshot_data}")
-            screenshot_data = (None, None)
+        # Run screenshot capture and enhanced scraping in parallel
+        screenshot_task = asyncio.create_task(self._capture_screenshots(url, deadline))
+        scraping_task = asyncio.create_task(self._extract_enhanced_elements(url, deadline, snapshot))
+        
+        # Wait for both tasks until the collection budget runs out
+        await asyncio.wait({screenshot_task, scraping_task}, timeout=deadline.time_left("collection"))
+        for stage, task in (("capture", screenshot_task), ("scraping", scraping_task)):
+            if not task.done():
+                task.cancel()
+                deadline.skip(stage, "did not finish within the collection budget")
+        await asyncio.gather(screenshot_task, scraping_task, return_exceptions=True)
         
-        if isinstance(html_and_framework_data, Exception):
-            logger.error(f"Enhanced extraction failed: {html_and_framework_data}")
-            html_and_framework_data = (CROData(), AIInsights())
+        screenshot_data = self._collected(screenshot_task, (None, None), "Screenshot capture")
+        html_and_framework_data = self._collected(scraping_task, (CROData(), AIInsights()), "Enhanced extraction")
         
         return screenshot_data, html_and_framework_data
     
-    async def _extract_enhanced_elements(self, url: str) -> Tuple[CROData, AIInsights]:
+    def _collected(self, task: asyncio.Task, default: Tuple, label: str) -> Tuple:
+        """Result of a collection task, or the empty default when it failed or was cut off"""
+        if task.cancelled():
+            return default
+        # Handle errors gracefully
+        if task.exception():
+            logger.error(f"{label} failed: {task.exception()}")
+            return default
+        return task.result()
+    
+    async def _extract_enhanced_elements(
+        self,
+        url: str,
+        deadline: Optional[Deadline] = None,
+        snapshot: Optional[PageSnapshot] = None
+    ) -> Tuple[CROData, AIInsights]:
         """Extract elements with framework analysis"""
         try:
-            return await self.scraping_service.extract_cro_elements_with_framework(url)
+            with span("scraping"):
+                return await self.scraping_service.extract_cro_elements_with_framework(url, deadline, snapshot)
         except Exception as e:
             logger.error(f"Enhanced HTML extraction failed for {url}: {e}")
             return CROData(), AIInsights()
     
-    async def _generate_enhanced_report(self, url: str, insights: AIInsights, html_data: CROData) -> CROAnalysisResponse:
+    async def _generate_enhanced_report(
+        self,
+        url: str,
+        insights: AIInsights,
+        html_data: CROData,
+        deadline: Optional[Deadline] = None
+    ) -> CROAnalysisResponse:
         """Generate enhanced CRO analysis report"""
         
         # Map framework categories to legacy categories for compatibility
@@ -109,6 +465,8 @@ class EnhancedCROAnalysisEngine:
         
         # Generate analysis metadata
         analysis_metadata = self._generate_analysis_metadata(insights)
+        if deadline:
+            analysis_metadata.update(deadline.summary())
         
         report = CROAnalysisResponse(
             id=str(uuid.uuid4()),
@@ -119,7 +477,8 @@ class EnhancedCROAnalysisEngine:
             element_analysis=html_data,
             recommendations=prioritized_recommendations,
             models_used=self.vision_manager.get_enabled_models(),
-            analysis_date=datetime.utcnow()
+            analysis_date=datetime.utcnow(),
+            analysis_metadata=analysis_metadata
         )
         
         return report
@@ -184,7 +543,10 @@ class EnhancedCROAnalysisEngine:
             "ai_models_used": [],
             "total_issues_found": len(insights.visual_issues) + len(insights.mobile_issues),
             "high_priority_recommendations": len([r for r in insights.recommendations if r.priority == "high"]),
-            "coverage_score": 0
+            "coverage_score": 0,
+            "degraded": insights.degraded,
+            "degraded_providers": insights.degraded_providers,
+            "model_routing": insights.routing_decision
         }
         
         # Identify framework categories
@@ -204,13 +566,18 @@ class EnhancedCROAnalysisEngine:
         
         return metadata
     
-    async def _store_enhanced_analysis(self, report: CROAnalysisResponse, framework_insights: AIInsights):
-        """Store enhanced analysis in database"""
+    async def _store_enhanced_analysis(
+        self,
+        report: CROAnalysisResponse,
+        framework_insights: AIInsights,
+        page_url: Optional[str] = None
+    ):
+        """Store enhanced analysis in database (under the canonical URL, so history groups spellings of a page)"""
         try:
             async with async_session() as session:
                 # Create enhanced analysis record
                 analysis = WebsiteAnalysis(
-                    url=report.url,
+                    url=page_url or report.url,
                     overall_score=report.overall_score,
                     product_page_score=report.category_scores.product_page,
                     cart_page_score=report.category_scores.cart_page,
@@ -243,12 +610,26 @@ class EnhancedCROAnalysisEngine:
         except Exception as e:
             logger.error(f"Service initialization failed: {e}")
     
-    async def _capture_screenshots(self, url: str):
+    async def open_domain_session(self, domain: str):
+        """Keep shared browser contexts for a domain while a batch works through its pages"""
+        await self._initialize_services()
+        await self.screenshot_service.open_domain_context(domain)
+        await self.scraping_service.open_domain_context(domain)
+    
+    async def close_domain_session(self, domain: str):
+        """Release the domain's browser contexts"""
+        await self.screenshot_service.close_domain_context(domain)
+        await self.scraping_service.close_domain_context(domain)
+    
+    async def _capture_screenshots(self, url: str, deadline: Optional[Deadline] = None):
         """Capture website screenshots"""
         try:
-            return await self.screenshot_service.capture_website(url)
+            with span("capture"):
+                return await self.screenshot_service.capture_website(url, deadline)
         except Exception as e:
             logger.error(f"Screenshot capture failed for {url}: {e}")
+            if deadline and deadline.time_left("collection", CAPTURE_RESERVE_SECONDS) <= 0:
+                deadline.skip("capture", f"navigation did not finish in time: {e}")
             return None, None
     
     async def close(self):
@@ -1,11 +1,13 @@
 """Enhanced CRO Framework with Lighthouse Integration and Detailed Feedback"""
 
 import re
+import time
 import asyncio
 import logging
 import json
 import subprocess
 import tempfile
+import threading
 from typing import List, Dict, Any, Optional, Tuple
 from bs4 import BeautifulSoup
 from playwright.async_api import Page
@@ -15,9 +17,23 @@ from app.models import (
     CROData, CROElement, TrustSignal, CTAButton, ElementPosition, 
     AIInsights, Recommendation, FrameworkFeedback, LighthouseMetrics
 )
+from app.services.deadline import Deadline
+from app.services.tracing import span
+from app.services.progress import publish
+from app.services.snapshot_service import PageSnapshot
+from app.services.metrics import LIGHTHOUSE_QUEUE_WAIT
+from app.services.visual_analytics_service import PALETTE_CLUSTERS
 
 logger = logging.getLogger(__name__)
 
+LIGHTHOUSE_TIMEOUT_SECONDS = 60
+LIGHTHOUSE_MIN_SECONDS = 10      # Not worth starting Lighthouse with less budget than this
+LIGHTHOUSE_RESERVE_SECONDS = 2.0  # Collection budget kept for the checks after Lighthouse
+
+# Palette limits as (cohesive at or below, penalized above) per way of counting colors
+INLINE_PALETTE_LIMITS = (6, 8)      # Distinct color values in inline <style> blocks
+SCREENSHOT_PALETTE_LIMITS = (PALETTE_CLUSTERS // 2, PALETTE_CLUSTERS - 2)  # Screenshot clusters with >= 1% of the pixels
+
 class EnhancedCROFramework:
     """Implementation of the 5-point CRO framework with Lighthouse"""
     
@@ -43,31 +59,63 @@ class EnhancedCROFramework:
         logger.info("ℹ️  Lighthouse CLI not available - using basic metrics")
         return False
     
-    async def analyze_page_framework(self, page: Page, soup: BeautifulSoup, url: str) -> Dict[str, Any]:
-        """Run complete framework analysis with feedback"""
+    async def analyze_page_framework(
+        self,
+        page: Page,
+        soup: BeautifulSoup,
+        url: str,
+        deadline: Optional[Deadline] = None,
+        snapshot: Optional[PageSnapshot] = None
+    ) -> Dict[str, Any]:
+        """Run complete framework analysis with feedback (Lighthouse only when the deadline leaves room)
+        
+        With a snapshot, categories whose page regions are unchanged take
+        their cached result instead of running, and a cached Lighthouse run
+        is reused while the page loads the same resources.
+        """
         
         # Run all 5 framework analyses
-        navigation_analysis = await self._analyze_navigation(soup, url)
-        display_analysis = await self._analyze_display(soup)
-        information_analysis = await self._analyze_information(soup)
-        technical_analysis = await self._analyze_technical(page, url)
-        psychological_analysis = await self._analyze_psychological(soup)
+        analyzers = [
+            ("navigation", lambda: self._analyze_navigation(soup, url)),
+            ("display", lambda: self._analyze_display(soup)),
+            ("information", lambda: self._analyze_information(soup)),
+            ("technical", lambda: self._analyze_technical(page, url, deadline, snapshot)),
+            ("psychological", lambda: self._analyze_psychological(soup))
+        ]
+        
+        framework_results = {}
+        for category, analyze in analyzers:
+            analysis = snapshot.reusable(category) if snapshot else None
+            reused = analysis is not None
+            if not reused:
+                with span(category):
+                    analysis = await analyze()
+            if snapshot:
+                # A technical result without its Lighthouse run (cut by the deadline) is not worth caching
+                lighthouse_cut = category == "technical" and deadline is not None and deadline.missed("lighthouse")
+                snapshot.record(category, analysis, cacheable=not lighthouse_cut)
+            framework_results[category] = analysis
+            self._publish_category(category, analysis, reused)
         
         # Combine results
-        framework_results = {
-            "navigation": navigation_analysis,
-            "display": display_analysis,
-            "information": information_analysis,
-            "technical": technical_analysis,
-            "psychological": psychological_analysis,
-            "overall_framework_score": self._calculate_framework_score([
-                navigation_analysis, display_analysis, information_analysis,
-                technical_analysis, psychological_analysis
-            ])
-        }
+        framework_results["overall_framework_score"] = self._calculate_framework_score(
+            [framework_results[category] for category, _ in analyzers]
+        )
         
         return framework_results
     
+    def _publish_category(self, category: str, analysis: Dict[str, Any], reused: bool = False):
+        """Live progress event for one finished framework category"""
+        publish(
+            "framework_category",
+            category=category,
+            reused=reused,
+            score=analysis["score"],
+            issues=analysis["issues"],
+            strengths=analysis["strengths"],
+            improvements=analysis["improvements"]
+        )
+    
     async def _analyze_navigation(self, soup: BeautifulSoup, url: str) -> Dict[str, Any]:
         """1. NAVIGATIONAL: Check navigation complexity and breadcrumbs"""
         
@@ -230,19 +278,150 @@ class EnhancedCROFramework:
                 color_matches = re.findall(r'color:\s*(#[0-9a-fA-F]{6}|#[0-9a-fA-F]{3}|rgb\([^)]+\))', style.string)
                 color_usage.extend(color_matches)
         
-        unique_colors = len(set(color_usage))
-        analysis["metrics"]["unique_colors"] = unique_colors
+        return self._score_palette(analysis, len(set(color_usage)), "inline_css")
+        
+    def _palette_verdict(self, palette_size: int, source: str) -> Tuple[int, Optional[str], Optional[str]]:
+        """Penalty, strength and improvement for a palette size counted from the given source"""
+        cohesive, busy = SCREENSHOT_PALETTE_LIMITS if source == "screenshot" else INLINE_PALETTE_LIMITS
+        if palette_size <= cohesive:
+            return 0, f"Color palette is cohesive with {palette_size} main colors", None
+        if palette_size > busy:
+            return 10, None, f"Simplify color palette from {palette_size} to 4-6 main colors"
+        return 0, None, None  # Acceptable range
+        
+    def _score_palette(self, analysis: Dict[str, Any], palette_size: int, source: str) -> Dict[str, Any]:
+        """Apply the palette verdict, replacing the one from an earlier source if there was one"""
+        metrics = analysis["metrics"]
+        previous = metrics.get("palette_source", "inline_css" if "unique_colors" in metrics else None)
+        if previous:
+            penalty, strength, improvement = self._palette_verdict(metrics["unique_colors"], previous)
+            analysis["score"] += penalty
+            if strength in analysis["strengths"]:
+                analysis["strengths"].remove(strength)
+            if improvement in analysis["improvements"]:
+                analysis["improvements"].remove(improvement)
+        
+        penalty, strength, improvement = self._palette_verdict(palette_size, source)
+        analysis["score"] -= penalty
+        if strength:
+            analysis["strengths"].append(strength)
+        if improvement:
+            analysis["improvements"].append(improvement)
+        metrics["unique_colors"] = palette_size
+        metrics["palette_source"] = source
+        return analysis
+    
+    def _analyze_visual_layout(self, analysis: Dict[str, Any], visual_layout: Dict[str, Any]) -> Dict[str, Any]:
+        """2b. DISPLAY: Score whitespace, clutter and visual weight measured on the screenshots"""
         
-        if unique_colors <= 6:
-            analysis["strengths"].append(f"Color palette is cohesive with {unique_colors} main colors")
-        elif unique_colors <= 8:
-            pass  # Acceptable range
-        else:
-            analysis["score"] -= 10
-            analysis["improvements"].append(f"Simplify color palette from {unique_colors} to 4-6 main colors")
+        analysis["metrics"]["visual_layout"] = visual_layout
         
+        desktop = visual_layout.get("desktop")
+        if desktop:
+            whitespace = desktop["whitespace_above_fold"]
+            if whitespace < 0.25:
+                analysis["score"] -= 10
+                analysis["issues"].append(f"Above-the-fold area is crowded ({whitespace:.0%} whitespace)")
+                analysis["improvements"].append("Increase spacing above the fold so the main offer and CTA stand out")
+            elif whitespace > 0.85:
+                analysis["score"] -= 5
+                analysis["improvements"].append(f"Above-the-fold area is mostly empty ({whitespace:.0%} whitespace) - bring key content higher")
+            else:
+                analysis["strengths"].insert(0, f"Balanced whitespace above the fold ({whitespace:.0%})")
+            
+            clutter = desktop["clutter_above_fold"]
+            if clutter > 25:
+                analysis["score"] -= 10
+                analysis["issues"].append(f"Visually cluttered first screen (edge density {clutter:.0f}%)")
+                analysis["improvements"].append("Reduce competing elements in the first screen to sharpen visual hierarchy")
+            
+            weight = desktop["visual_weight"]
+            if weight.get("center_y", 0.5) > 0.65:
+                analysis["improvements"].append("Visual weight sits low in the first screen - move the headline and CTA up")
+        
+        mobile = visual_layout.get("mobile")
+        if mobile:
+            whitespace = mobile["whitespace_above_fold"]
+            if whitespace < 0.2:
+                analysis["score"] -= 10
+                analysis["issues"].append(f"Mobile first screen is crowded ({whitespace:.0%} whitespace)")
+                analysis["improvements"].append("Simplify the mobile first screen - fewer elements and larger spacing")
+            elif mobile["clutter_above_fold"] <= 25:
+                analysis["strengths"].insert(0, "Mobile first screen is clean and uncluttered")
+        
+        colors = visual_layout.get("colors")
+        if colors:
+            analysis = self._analyze_screenshot_colors(analysis, colors)
+        
+        analysis["score"] = max(0, analysis["score"])
         return analysis
     
+    def _analyze_screenshot_colors(self, analysis: Dict[str, Any], colors: Dict[str, Any]) -> Dict[str, Any]:
+        """2c. DISPLAY: Palette and CTA contrast measured on the desktop screenshot"""
+        
+        # The measured palette replaces the inline <style> color count
+        analysis = self._score_palette(analysis, colors["palette_size"], "screenshot")
+        analysis["metrics"]["palette"] = colors["palette"]
+        
+        # WCAG 1.4.11: UI components need 3:1 against adjacent colors
+        cta_contrast = colors["cta_contrast"]
+        analysis["metrics"]["cta_contrast"] = cta_contrast
+        if not cta_contrast:
+            return analysis
+        
+        above_fold = [cta for cta in cta_contrast if cta["above_fold"]] or cta_contrast
+        best = max(above_fold, key=lambda cta: cta["contrast_ratio"])
+        low_contrast = [cta for cta in above_fold if cta["contrast_ratio"] < 3.0]
+        
+        if best["contrast_ratio"] >= 4.5:
+            analysis["strengths"].insert(0, f"Primary CTA \"{best['text'][:30]}\" stands out ({best['contrast_ratio']}:1 contrast)")
+        elif best["contrast_ratio"] < 3.0:
+            analysis["score"] -= 15
+            analysis["issues"].append(f"No CTA stands out from its background (best contrast {best['contrast_ratio']}:1)")
+            analysis["improvements"].insert(0, "Give the primary CTA a color with at least 3:1 contrast against its background")
+        
+        if low_contrast and best["contrast_ratio"] >= 3.0:
+            analysis["score"] -= 5
+            analysis["improvements"].append(f"{len(low_contrast)} above-the-fold CTA(s) fall below 3:1 contrast with their background")
+        
+        return analysis
+    
+    def apply_visual_layout(self, framework_insights: AIInsights, visual_layout: Dict[str, Any]) -> AIInsights:
+        """Fold screenshot layout metrics into the display category of finished framework insights
+        
+        Screenshots are captured in parallel with scraping, so this runs after
+        both finish rather than inside analyze_page_framework.
+        """
+        if not visual_layout or not framework_insights.framework_feedback:
+            return framework_insights
+        
+        for feedback in framework_insights.framework_feedback:
+            if feedback.category != "display":
+                continue
+            
+            analysis = {
+                "score": feedback.score,
+                "issues": [],
+                "recommendations": [],
+                "metrics": feedback.metrics,
+                "strengths": list(feedback.strengths),
+                "improvements": list(feedback.improvements)
+            }
+            analysis = self._analyze_visual_layout(analysis, visual_layout)
+            
+            feedback.score = analysis["score"]
+            feedback.strengths = analysis["strengths"][:4]
+            feedback.improvements = analysis["improvements"][:4]
+            feedback.metrics = analysis["metrics"]
+            framework_insights.visual_issues.extend(analysis["issues"])
+            
+            framework_insights.category_scores["display"] = analysis["score"]
+            framework_insights.overall_score = self._calculate_framework_score([
+                {"score": f.score} for f in framework_insights.framework_feedback
+            ])
+        
+        return framework_insights
+    
     async def _analyze_information(self, soup: BeautifulSoup) -> Dict[str, Any]:
         """3. INFORMATIONAL: Check product information completeness"""
         
@@ -350,8 +529,14 @@ class EnhancedCROFramework:
         
         return analysis
     
-    async def _analyze_technical(self, page: Page, url: str) -> Dict[str, Any]:
-        """4. TECHNICAL: Lighthouse performance analysis"""
+    async def _analyze_technical(
+        self,
+        page: Page,
+        url: str,
+        deadline: Optional[Deadline] = None,
+        snapshot: Optional[PageSnapshot] = None
+    ) -> Dict[str, Any]:
+        """4. TECHNICAL: Lighthouse performance analysis (cached per URL while the page's resources are unchanged)"""
         
         analysis = {
             "score": 100,
@@ -363,11 +548,30 @@ class EnhancedCROFramework:
             "lighthouse_metrics": None
         }
         
-        # Try Lighthouse first if available
-        if self.lighthouse_available:
+        # A cached run for the same scripts, styles and images saves the slowest check
+        lighthouse_key = snapshot.region_key(["resources"]) if snapshot else None
+        cached_metrics = snapshot.cached_stage("lighthouse", lighthouse_key) if snapshot else None
+        if cached_metrics:
+            lighthouse_results = LighthouseMetrics(**cached_metrics)
+            publish("lighthouse", data=lighthouse_results.model_dump(), reused=True)
+            analysis["lighthouse_metrics"] = lighthouse_results
+            return self._analyze_lighthouse_results(analysis, lighthouse_results)
+        
+        # Try Lighthouse first if available and the analysis deadline leaves room for it
+        lighthouse_timeout = LIGHTHOUSE_TIMEOUT_SECONDS
+        if self.lighthouse_available and deadline:
+            lighthouse_timeout = min(lighthouse_timeout, deadline.time_left("collection", LIGHTHOUSE_RESERVE_SECONDS))
+            if lighthouse_timeout < LIGHTHOUSE_MIN_SECONDS:
+                deadline.skip("lighthouse", f"only {lighthouse_timeout:.1f}s left in the collection budget")
+        
+        if self.lighthouse_available and lighthouse_timeout >= LIGHTHOUSE_MIN_SECONDS:
             try:
-                lighthouse_results = await self._run_lighthouse(url)
+                with span("lighthouse"):
+                    lighthouse_results = await self._run_lighthouse(url, lighthouse_timeout, deadline)
                 if lighthouse_results:
+                    publish("lighthouse", data=lighthouse_results.model_dump())
+                    if snapshot:
+                        snapshot.store("lighthouse", lighthouse_key, lighthouse_results.model_dump())
                     analysis["lighthouse_metrics"] = lighthouse_results
                     analysis = self._analyze_lighthouse_results(analysis, lighthouse_results)
                     return analysis
@@ -464,7 +668,12 @@ class EnhancedCROFramework:
         
         return analysis
     
-    async def _run_lighthouse(self, url: str) -> Optional[LighthouseMetrics]:
+    async def _run_lighthouse(
+        self,
+        url: str,
+        timeout: float = LIGHTHOUSE_TIMEOUT_SECONDS,
+        deadline: Optional[Deadline] = None
+    ) -> Optional[LighthouseMetrics]:
         """Run Lighthouse CLI and parse results"""
         try:
             # Create temp file for results
@@ -482,13 +691,37 @@ class EnhancedCROFramework:
                 '--quiet'
             ]
             
-            result = await asyncio.to_thread(
-                subprocess.run,
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
+            queued_at = time.monotonic()
+            process: Dict[str, Any] = {"popen": None, "cancelled": False}
+            lock = threading.Lock()
+            
+            def run_cli():
+                # Time spent waiting for a free thread in the default executor
+                LIGHTHOUSE_QUEUE_WAIT.observe(time.monotonic() - queued_at)
+                with lock:
+                    if process["cancelled"]:
+                        return None
+                    process["popen"] = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                popen = process["popen"]
+                try:
+                    stdout, stderr = popen.communicate(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    popen.kill()
+                    popen.communicate()
+                    raise
+                return subprocess.CompletedProcess(cmd, popen.returncode, stdout, stderr)
+            
+            try:
+                result = await asyncio.to_thread(run_cli)
+            except asyncio.CancelledError:
+                # The thread cannot be cancelled, but the browser it drives can
+                with lock:
+                    process["cancelled"] = True
+                    if process["popen"] and process["popen"].poll() is None:
+                        process["popen"].kill()
+                raise
+            if result is None:
+                return None
             
             if result.returncode != 0:
                 logger.warning(f"Lighthouse failed: {result.stderr}")
@@ -516,6 +749,11 @@ class EnhancedCROFramework:
             logger.info(f"✅ Lighthouse analysis completed - Performance: {metrics.performance_score}")
             return metrics
             
+        except subprocess.TimeoutExpired:
+            logger.warning(f"Lighthouse timed out after {timeout:.0f}s")
+            if deadline:
+                deadline.skip("lighthouse", f"did not finish within {timeout:.1f}s")
+            return None
         except Exception as e:
             logger.warning(f"Lighthouse execution failed: {e}")
             return None
@@ -5,16 +5,23 @@ AI-Powered (Gemini) + Framework-Based Conversion Rate Optimization Analysis
 """
 
 import os
+import json
 import asyncio
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from dotenv import load_dotenv
 
 from app.database import init_db
-from app.models import CROAnalysisRequest, CROAnalysisResponse
+from app.models import CROAnalysisRequest, CROAnalysisResponse, AnalysisJob, BatchAnalysisRequest
+from app.services.batch_service import BatchService, BatchError
 from app.services.cache_service import CacheService
+from app.services.job_service import JobService, JobQueueFullError
+from app.services.metrics import PROMETHEUS_AVAILABLE, JOB_STREAM_DEPTH, render_metrics, mark_process_dead
+from app.services.redis_job_queue import RedisJobQueue
+from app.services.session_service import SessionService
 
 # Import enhanced components directly (no fallback)
 from enhanced_vision_manager import EnhancedVisionManager
@@ -34,11 +41,14 @@ logger = logging.getLogger(__name__)
 analysis_engine = None
 cache_service = None
 vision_manager = None
+job_service = None
+batch_service = None
+session_service = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize enhanced services on startup"""
-    global analysis_engine, cache_service, vision_manager
+    global analysis_engine, cache_service, vision_manager, job_service, batch_service, session_service
     
     logger.info("🚀 Starting Enhanced CRO Analyzer Backend...")
     logger.info("🤖 AI Model: Gemini 2.5 Pro Vision")
@@ -55,6 +65,16 @@ async def lifespan(app: FastAPI):
     # Initialize AI models and framework
     await vision_manager.initialize_models()
     
+    # Background jobs (POST /api/jobs): in-process workers, or enqueue-only with enhanced_worker.py consuming
+    job_service = await create_job_service(analysis_engine)
+    await job_service.start()
+    
+    # Bulk analysis (POST /api/analyze/batch)
+    batch_service = BatchService(analysis_engine)
+    
+    # Multiplexed websocket sessions (/api/session/ws)
+    session_service = SessionService(analysis_engine, job_service)
+    
     enabled_methods = vision_manager.get_enabled_models()
     logger.info("✅ Backend initialized successfully!")
     logger.info(f"📊 Enabled analysis methods: {enabled_methods}")
@@ -63,12 +83,28 @@ async def lifespan(app: FastAPI):
     yield
     
     # Cleanup
+    if job_service:
+        await job_service.close()
     if cache_service:
         await cache_service.close()
     if analysis_engine:
         await analysis_engine.close()
+    mark_process_dead()
     logger.info("👋 Backend shutdown complete")
 
+async def create_job_service(engine):
+    """JOB_BACKEND=redis hands jobs to standalone workers; falls back to in-process workers without Redis"""
+    if os.getenv("JOB_BACKEND", "local").lower() == "redis":
+        queue = RedisJobQueue()
+        try:
+            await queue.initialize()
+            logger.info("📮 Jobs are enqueued for enhanced_worker.py processes")
+            return queue
+        except Exception as e:
+            logger.warning(f"⚠️  Redis job queue not available, running jobs in-process: {e}")
+            await queue.close()
+    return JobService(engine)
+
 # Create FastAPI app
 app = FastAPI(
     title="Enhanced CRO Analyzer API",
@@ -117,10 +153,32 @@ async def enhanced_health_check():
         "models": models_status,
         "database": "sqlite",
         "cache": "redis" if cache_service and cache_service.is_connected() else "memory",
+        "memory_cache": cache_service.memory_cache.get_status() if cache_service else None,
         "framework_enabled": True,
+        "jobs": await job_service.get_status() if job_service else None,
+        "batches": batch_service.get_status() if batch_service else None,
+        "sessions": session_service.get_status() if session_service else None,
         "total_analysis_methods": len(vision_manager.get_enabled_models()) if vision_manager else 0
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    if not PROMETHEUS_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="prometheus_client is not installed"
+        )
+    
+    if job_service:
+        # The stream is shared by every API node, so read its depth at scrape time
+        job_status = await job_service.get_status()
+        if job_status.get("backend") == "redis" and job_status.get("queued") is not None:
+            JOB_STREAM_DEPTH.set(job_status["queued"])
+    
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
 @app.get("/api/models")
 async def get_enabled_models():
     """Get detailed list of enabled analysis methods"""
@@ -158,7 +216,9 @@ async def analyze_website_enhanced(request: CROAnalysisRequest):
         # Run analysis
         result = await analysis_engine.analyze_website(
             url=url_str,
-            client_name=request.client_name
+            client_name=request.client_name,
+            categories=request.categories,
+            force=request.force
         )
         
         logger.info(f"✅ Analysis completed for {url_str}")
@@ -171,6 +231,78 @@ async def analyze_website_enhanced(request: CROAnalysisRequest):
         logger.error(f"❌ Analysis failed for {str(request.url)}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+@app.post("/api/analyze/batch")
+async def analyze_batch(request: BatchAnalysisRequest):
+    """Analyze a URL list and/or sitemap, streaming one NDJSON line per URL as it finishes"""
+    if not batch_service:
+        raise HTTPException(status_code=500, detail="Batch service not initialized")
+    
+    try:
+        urls = await batch_service.resolve_urls(
+            [str(url) for url in request.urls],
+            str(request.sitemap_url) if request.sitemap_url else None
+        )
+    except BatchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def stream_results():
+        async for result in batch_service.run(urls, request.client_name, request.categories, request.force):
+            yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@app.post("/api/jobs", response_model=AnalysisJob, status_code=status.HTTP_202_ACCEPTED)
+async def create_analysis_job(request: CROAnalysisRequest):
+    """Queue an analysis and return its job id immediately"""
+    if not job_service:
+        raise HTTPException(status_code=500, detail="Job service not initialized")
+    
+    try:
+        return await job_service.submit(request)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@app.get("/api/jobs/{job_id}", response_model=AnalysisJob)
+async def get_analysis_job(job_id: str):
+    """Job status, partial results while running and the report once completed"""
+    job = await job_service.get_job(job_id) if job_service else None
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/api/jobs/{job_id}/cancel", response_model=AnalysisJob)
+async def cancel_analysis_job(job_id: str):
+    """Cancel a queued or running job"""
+    job = await job_service.cancel(job_id) if job_service else None
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.websocket("/api/session/ws")
+async def analysis_session(websocket: WebSocket):
+    """Many analyses and job subscriptions over one connection, tagged by request_id
+    
+    Query parameters: encoding=json (default) or msgpack for binary frames,
+    compress=zlib to zlib-compress every frame. Clients that negotiate
+    permessage-deflate get transport compression without either option.
+    """
+    if not session_service:
+        await websocket.accept()
+        await websocket.send_json({"type": "error", "request_id": None, "error": "Service not initialized"})
+        await websocket.close(code=1011)
+        return
+    await session_service.serve(websocket)
+
+# Progress messages for stage events forwarded over /api/analyze/ws
+STAGE_MESSAGES = {
+    "initialize": "Initializing CRO analysis with Gemini AI...",
+    "collection": "Capturing screenshots and extracting HTML elements...",
+    "visual_layout": "Measuring layout, colors and CTA contrast...",
+    "vision": "Running Gemini Pro Vision analysis...",
+    "report": "Combining Framework + AI insights...",
+    "store": "Saving analysis..."
+}
+
 @app.websocket("/api/analyze/ws")
 async def analyze_website_realtime(websocket: WebSocket):
     """Real-time website analysis with detailed progress"""
@@ -179,64 +311,39 @@ async def analyze_website_realtime(websocket: WebSocket):
     try:
         # Get URL from query params
         url = websocket.query_params.get("url")
+        force = websocket.query_params.get("force", "").lower() == "true"
         if not url:
             await websocket.send_json({"error": "URL parameter required"})
             return
         
         logger.info(f"🔄 Starting real-time analysis for: {url}")
         
-        # Progress updates
         await websocket.send_json({
             "status": "started",
             "message": "Initializing CRO analysis with Gemini AI...",
-            "progress": 5,
+            "progress": 0,
             "current_step": "initialization"
         })
         
-        await websocket.send_json({
-            "status": "framework_setup",
-            "message": "Setting up 5-Point CRO framework analysis...",
-            "progress": 15,
-            "current_step": "framework"
-        })
-        
-        await websocket.send_json({
-            "status": "capturing",
-            "message": "Capturing website screenshots...",
-            "progress": 25,
-            "current_step": "screenshots"
-        })
+        # Forward stage events and partial results (screenshots, category scores,
+        # Lighthouse, AI findings) as the pipeline produces them
+        current_step = {"stage": "initialization"}
         
-        await websocket.send_json({
-            "status": "scraping",
-            "message": "Extracting HTML elements...",
-            "progress": 45,
-            "current_step": "scraping"
-        })
-        
-        await websocket.send_json({
-            "status": "framework_analysis",
-            "message": "Analyzing navigation, display, information, technical, and psychological factors...",
-            "progress": 65,
-            "current_step": "framework_analysis"
-        })
-        
-        await websocket.send_json({
-            "status": "ai_analysis",
-            "message": "Running Gemini Pro Vision analysis...",
-            "progress": 80,
-            "current_step": "ai_analysis"
-        })
-        
-        await websocket.send_json({
-            "status": "combining",
-            "message": "Combining Framework + AI insights...",
-            "progress": 90,
-            "current_step": "combining"
-        })
+        async def forward_event(event: dict):
+            if event.get("kind") == "stage":
+                if event["state"] == "started":
+                    current_step["stage"] = event["stage"]
+                message = {
+                    "status": "progress",
+                    "current_step": event["stage"],
+                    "message": STAGE_MESSAGES.get(event["stage"], event["stage"]) if event["state"] == "started" else None
+                }
+            else:
+                message = {"status": "partial", "current_step": current_step["stage"]}
+            await websocket.send_json({**message, **event})
         
         # Run actual analysis
-        result = await analysis_engine.analyze_website(url)
+        result = await analysis_engine.analyze_website(url, on_partial=forward_event, force=force)
         
         await websocket.send_json({
             "status": "complete",
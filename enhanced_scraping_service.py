@@ -3,26 +3,73 @@
 import asyncio
 import logging
 import re
-from typing import List, Tuple
+from typing import List, Tuple, Dict, Any, Optional
 from playwright.async_api import async_playwright
 from bs4 import BeautifulSoup
 
 from app.models import CROData, CROElement, TrustSignal, CTAButton, ElementPosition, AIInsights
 from enhanced_cro_framework import EnhancedCROFramework
+from app.services.deadline import Deadline
+from app.services.snapshot_service import PageSnapshot
+from app.services.tracing import span
+from app.services.metrics import track_browser
+from app.services.browser_contexts import DomainContextMixin
 
 logger = logging.getLogger(__name__)
 
-class EnhancedScrapingService:
+SCRAPE_RESERVE_SECONDS = 5.0  # Collection budget kept for extraction and framework checks after navigation
+
+# Expanded button selectors (shared by the soup pass and the in-browser box lookup)
+BUTTON_SELECTORS = [
+    'button', '.btn', '.cta', '.call-to-action',
+    'input[type="submit"]', 'input[type="button"]',
+    '.add-to-cart', '.buy-now', '.purchase', '.order-now',
+    '.get-started', '.sign-up', '.subscribe', '.download',
+    '[class*="button"]', '[class*="btn"]', '[role="button"]',
+    'a[class*="cta"]', 'a[class*="button"]'
+]
+
+# Document-coordinate boxes and computed background of CTA candidates,
+# measured at the desktop screenshot viewport so they line up with the capture
+CTA_BOXES_SCRIPT = """
+(selectors) => {
+    const seen = new Set();
+    const boxes = [];
+    for (const selector of selectors) {
+        for (const el of document.querySelectorAll(selector)) {
+            if (seen.has(el)) continue;
+            seen.add(el);
+            const rect = el.getBoundingClientRect();
+            if (rect.width < 1 || rect.height < 1) continue;
+            boxes.push({
+                text: (el.innerText || el.value || '').trim(),
+                x: Math.round(rect.left + window.scrollX),
+                y: Math.round(rect.top + window.scrollY),
+                width: Math.round(rect.width),
+                height: Math.round(rect.height),
+                background: getComputedStyle(el).backgroundColor
+            });
+        }
+    }
+    return boxes;
+}
+"""
+
+class EnhancedScrapingService(DomainContextMixin):
     def __init__(self):
         self.playwright = None
         self.browser = None
+        self.domain_contexts = {}  # domain -> {"context": Future[BrowserContext], "refs": int}
         self.framework = EnhancedCROFramework()
     
     async def initialize(self):
-        """Initialize Playwright browser"""
+        """Initialize Playwright browser (once - later calls reuse the running browser)"""
+        if self.browser and self.browser.is_connected():
+            return
+        
         try:
             self.playwright = await async_playwright().start()
-            self.browser = await self.playwright.chromium.launch(
+            self.browser = track_browser(await self.playwright.chromium.launch(
                 headless=True,
                 args=[
                     '--no-sandbox', 
@@ -30,43 +77,70 @@ class EnhancedScrapingService:
                     '--disable-blink-features=AutomationControlled',
                     '--disable-features=VizDisplayCompositor'
                 ]
-            )
+            ))
             logger.info("✅ Enhanced scraping service initialized")
         except Exception as e:
             logger.error(f"❌ Failed to initialize enhanced scraping service: {e}")
             raise
     
-    async def extract_cro_elements_with_framework(self, url: str) -> Tuple[CROData, AIInsights]:
-        """Extract CRO elements and run framework analysis"""
+    async def extract_cro_elements_with_framework(
+        self,
+        url: str,
+        deadline: Optional[Deadline] = None,
+        snapshot: Optional[PageSnapshot] = None
+    ) -> Tuple[CROData, AIInsights]:
+        """Extract CRO elements and run framework analysis (navigation and Lighthouse fit the deadline)
+        
+        snapshot, when given, captures the page's region hashes so cached
+        stages (extracted elements, framework categories, Lighthouse) are
+        reused for unchanged regions.
+        """
         if not self.browser:
             await self.initialize()
         
         try:
-            page = await self.browser.new_page()
-            
-            # Set a real user agent
-            await page.set_extra_http_headers({
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36'
-            })
-            
-            # Navigate to page
-            await page.goto(url, wait_until="domcontentloaded", timeout=60000)
-            await page.wait_for_timeout(3000)  # Wait for dynamic content
-            
-            # Get page content
-            html_content = await page.content()
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Extract traditional CRO elements
-            cro_data = await self._extract_traditional_elements(soup)
-            
-            # Run framework analysis
-            framework_results = await self.framework.analyze_page_framework(page, soup, url)
-            
-            # Convert framework results to insights
-            framework_insights = self.framework.get_framework_insights(framework_results)
-            
-            await page.close()
+            async with self.open_page(url) as page:
+                # Set a real user agent
+                await page.set_extra_http_headers({
+                    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36'
+                })
+                
+                # Match the desktop screenshot viewport so CTA boxes map onto the capture
+                await page.set_viewport_size({"width": 1920, "height": 1080})
+                
+                # Navigate to page, leaving part of the collection budget for the framework checks
+                with span("goto"):
+                    await page.goto(url, wait_until="domcontentloaded", timeout=self._timeout_ms(deadline, 60000))
+                with span("settle"):
+                    await page.wait_for_timeout(self._timeout_ms(deadline, 3000))  # Wait for dynamic content
+                
+                # Get page content
+                with span("parse_html"):
+                    html_content = await page.content()
+                    soup = BeautifulSoup(html_content, 'html.parser')
+                if snapshot:
+                    with span("snapshot"):
+                        snapshot.capture(soup)
+                
+                # Extract traditional CRO elements (cached while no region of the page changed)
+                cro_key = snapshot.region_key() if snapshot else None
+                cached_elements = snapshot.cached_stage("cro_data", cro_key) if snapshot else None
+                if cached_elements:
+                    cro_data = CROData(**cached_elements)
+                else:
+                    with span("cta_boxes"):
+                        cta_boxes = await self._collect_cta_boxes(page)
+                    with span("extract_elements"):
+                        cro_data = await self._extract_traditional_elements(soup, cta_boxes)
+                    if snapshot and snapshot.regions:
+                        snapshot.store("cro_data", cro_key, cro_data.model_dump(mode="json"))
+                
+                # Run framework analysis
+                with span("framework"):
+                    framework_results = await self.framework.analyze_page_framework(page, soup, url, deadline, snapshot)
+                    
+                    # Convert framework results to insights
+                    framework_insights = self.framework.get_framework_insights(framework_results)
             
             logger.info(f"🔍 Enhanced analysis completed for {url}")
             logger.info(f"📊 Framework score: {framework_insights.overall_score}")
@@ -78,7 +152,20 @@ class EnhancedScrapingService:
             logger.error(f"Enhanced scraping failed for {url}: {e}")
             return CROData(), AIInsights()
     
-    async def _extract_traditional_elements(self, soup: BeautifulSoup) -> CROData:
+    async def _collect_cta_boxes(self, page) -> Dict[str, List[Dict[str, Any]]]:
+        """Rendered CTA boxes grouped by button text (in document order)"""
+        try:
+            boxes = await page.evaluate(CTA_BOXES_SCRIPT, BUTTON_SELECTORS)
+        except Exception as e:
+            logger.warning(f"CTA box lookup failed: {e}")
+            return {}
+        
+        boxes_by_text = {}
+        for box in boxes:
+            boxes_by_text.setdefault(" ".join(box["text"].split()), []).append(box)
+        return boxes_by_text
+    
+    async def _extract_traditional_elements(self, soup: BeautifulSoup, cta_boxes: Dict[str, List[Dict[str, Any]]] = None) -> CROData:
         """Extract traditional CRO elements (existing functionality)"""
         cro_data = CROData()
         
@@ -86,7 +173,7 @@ class EnhancedScrapingService:
         cro_data.trust_signals = await self._extract_trust_signals(soup)
         
         # CTA buttons  
-        cro_data.cta_buttons = await self._extract_cta_buttons(soup)
+        cro_data.cta_buttons = await self._extract_cta_buttons(soup, cta_boxes or {})
         
         # Forms
         cro_data.forms = await self._extract_forms(soup)
@@ -159,31 +246,29 @@ class EnhancedScrapingService:
         return trust_signals
     
     # Enhanced CTA button analysis
-    async def _extract_cta_buttons(self, soup: BeautifulSoup) -> List[CTAButton]:
+    async def _extract_cta_buttons(self, soup: BeautifulSoup, cta_boxes: Dict[str, List[Dict[str, Any]]] = None) -> List[CTAButton]:
         """Extract CTA buttons with enhanced persuasiveness analysis"""
         cta_buttons = []
+        cta_boxes = cta_boxes or {}
         
-        # Expanded button selectors
-        button_selectors = [
-            'button', '.btn', '.cta', '.call-to-action',
-            'input[type="submit"]', 'input[type="button"]',
-            '.add-to-cart', '.buy-now', '.purchase', '.order-now',
-            '.get-started', '.sign-up', '.subscribe', '.download',
-            '[class*="button"]', '[class*="btn"]', '[role="button"]',
-            'a[class*="cta"]', 'a[class*="button"]'
-        ]
-        
-        for selector in button_selectors:
+        for selector in BUTTON_SELECTORS:
             elements = soup.select(selector)
             for element in elements:
                 button_text = element.get_text(strip=True)
                 if button_text and len(button_text) < 50:  # Valid button text
                     
+                    # Rendered box for this button, if the browser found one with the same text
+                    matches = cta_boxes.get(" ".join(element.get_text(" ", strip=True).split()))
+                    box = matches.pop(0) if matches else None
+                    
                     cta_buttons.append(CTAButton(
                         text=button_text,
-                        color=self._extract_color(element),
+                        color=self._extract_color(element, box),
                         size=self._get_enhanced_button_size(element),
-                        position=ElementPosition(x=0, y=0, width=100, height=40),
+                        position=ElementPosition(
+                            x=box["x"], y=box["y"], width=box["width"], height=box["height"]
+                        ) if box else ElementPosition(x=0, y=0, width=100, height=40),
+                        located=box is not None,
                         prominent=self._is_prominent_button(element),
                         persuasiveness=self._calculate_enhanced_persuasiveness(button_text)
                     ))
@@ -422,11 +507,15 @@ class EnhancedScrapingService:
         style = element.get("style", "")
         return "display:none" not in style and "visibility:hidden" not in style
     
-    def _extract_color(self, element) -> str:
-        """Extract color from element"""
+    def _extract_color(self, element, box: Dict[str, Any] = None) -> str:
+        """Extract color from element (inline style, then computed background)"""
         style = element.get("style", "")
         color_match = re.search(r'(?:background-)?color:\s*([^;]+)', style)
-        return color_match.group(1).strip() if color_match else "default"
+        if color_match:
+            return color_match.group(1).strip()
+        if box and box.get("background") not in (None, "", "rgba(0, 0, 0, 0)", "transparent"):
+            return box["background"]
+        return "default"
     
     def _is_prominent_button(self, element) -> bool:
         """Check if button is prominent"""
@@ -449,6 +538,12 @@ class EnhancedScrapingService:
         # Keep existing implementation
         return []
     
+    def _timeout_ms(self, deadline: Optional[Deadline], cap_ms: int) -> int:
+        """Playwright timeout within the collection budget"""
+        if not deadline:
+            return cap_ms
+        return deadline.timeout_ms("collection", cap_ms, reserve=SCRAPE_RESERVE_SECONDS)
+    
     async def close(self):
         """Close browser and playwright"""
         if self.browser:
@@ -1,22 +1,78 @@
 """Enhanced Vision Manager - Gemini Pro Vision Only"""
 
+import os
+import json
+import time
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Callable, Awaitable
 import asyncio
 
 from app.models import AIInsights, CROData, Recommendation
 
-# Import only Gemini model
 from gemini_vision_model import GeminiVisionModel
+from yolo_vision_model import YOLOVisionModel
+from claude_vision_model import ClaudeVisionModel
+from app.services.hedging_policy import HedgingPolicy
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.model_router import ModelRouter
+from app.services.deadline import Deadline, DeadlineExceeded
+from app.services.metrics import MODEL_CALLS
 
 logger = logging.getLogger(__name__)
 
+def _env_number(name: str, default: Optional[float], cast: Callable[[str], Any] = float) -> Any:
+    """Numeric setting from the environment; a malformed value logs a warning and keeps the default"""
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        logger.warning(f"⚠️  Ignoring invalid {name}={value!r}, using {default}")
+        return default
+
+def _env_budgets(name: str) -> Dict[str, int]:
+    """Per-client call budgets from a JSON object; malformed JSON or counts fall back to no client budgets"""
+    value = os.getenv(name, "{}")
+    try:
+        budgets = json.loads(value)
+        return {str(client): int(calls) for client, calls in budgets.items()}
+    except (ValueError, TypeError, AttributeError):
+        logger.warning(f"⚠️  Ignoring invalid {name}={value!r}, using no client budgets")
+        return {}
+
 # ====================================================================
-# 🎛️ VISION MODEL CONFIGURATION - GEMINI ONLY
+# 🎛️ VISION MODEL CONFIGURATION
 # ====================================================================
 
 ENABLE_GEMINI_VISION = True       # Gemini Pro Vision 2.5
+ENABLE_YOLO_VISION = True         # Local YOLOv8 UI detector (ONNX Runtime, CPU)
 ENABLE_FRAMEWORK_ANALYSIS = True  # CRO Framework Analysis
+ENABLE_MULTI_VIEWPORT = True      # Send desktop + mobile screenshots in one request
+ENABLE_CLAUDE_VISION = True       # Secondary provider for hedged Gemini requests
+ENABLE_HEDGING = True             # Hedge slow Gemini calls with Claude, first valid answer wins
+
+# Hedging: fixed delay in seconds, or unset to hedge at Gemini's observed p90 latency
+HEDGE_DELAY_SECONDS = _env_number("HEDGE_DELAY_SECONDS", None)
+HEDGE_DEFAULT_DELAY_SECONDS = _env_number("HEDGE_DEFAULT_DELAY_SECONDS", 20.0)  # Until enough latency samples
+HEDGE_MAX_FRACTION = _env_number("HEDGE_MAX_FRACTION", 0.15)                    # Share of requests allowed to hedge
+HEDGE_COST_PER_CALL = _env_number("HEDGE_COST_PER_CALL", 0.02)                  # Estimated secondary cost (USD)
+HEDGE_MAX_COST_PER_HOUR = _env_number("HEDGE_MAX_COST_PER_HOUR", 1.0)           # Hourly hedge spend cap (USD)
+
+# Circuit breakers: per-provider timeout plus error-rate / slow-call thresholds
+PROVIDER_TIMEOUT_SECONDS = _env_number("PROVIDER_TIMEOUT_SECONDS", 90.0)
+BREAKER_FAILURE_RATE = _env_number("BREAKER_FAILURE_RATE", 0.5)      # Open at 50% failed calls...
+BREAKER_SLOW_CALL_SECONDS = _env_number("BREAKER_SLOW_CALL_SECONDS", 45.0)
+BREAKER_SLOW_CALL_RATE = _env_number("BREAKER_SLOW_CALL_RATE", 0.8)  # ...or 80% slow calls
+BREAKER_WINDOW_SIZE = _env_number("BREAKER_WINDOW_SIZE", 20, int)
+BREAKER_MIN_CALLS = _env_number("BREAKER_MIN_CALLS", 5, int)
+BREAKER_OPEN_SECONDS = _env_number("BREAKER_OPEN_SECONDS", 30.0)     # Before a half-open probe
+
+# Model routing: skip or reuse paid vision calls when they would not change the report
+ENABLE_MODEL_ROUTING = True
+ROUTING_DECISIVE_SCORE = _env_number("ROUTING_DECISIVE_SCORE", 85, int)  # Framework score that needs no vision pass
+ROUTING_DAILY_BUDGET = _env_number("ROUTING_DAILY_BUDGET", None, int)
+ROUTING_CLIENT_BUDGETS = _env_budgets("ROUTING_CLIENT_BUDGETS")          # {"client": calls per day}
 
 # ====================================================================
 
@@ -26,7 +82,22 @@ class EnhancedVisionManager:
     def __init__(self):
         self.models = []
         self.gemini_model = None
+        self.yolo_model = None
+        self.claude_model = None
         self.framework_enabled = ENABLE_FRAMEWORK_ANALYSIS
+        self.hedging_policy = HedgingPolicy(
+            hedge_delay=HEDGE_DELAY_SECONDS,
+            default_delay=HEDGE_DEFAULT_DELAY_SECONDS,
+            max_hedge_fraction=HEDGE_MAX_FRACTION,
+            secondary_cost_per_call=HEDGE_COST_PER_CALL,
+            max_hedge_cost_per_hour=HEDGE_MAX_COST_PER_HOUR
+        )
+        self.circuit_breakers: Dict[str, CircuitBreaker] = {}
+        self.router = ModelRouter(
+            decisive_score=ROUTING_DECISIVE_SCORE,
+            default_daily_budget=ROUTING_DAILY_BUDGET,
+            client_budgets=ROUTING_CLIENT_BUDGETS
+        )
         
     async def initialize_models(self):
         """Initialize Gemini Pro Vision model"""
@@ -47,6 +118,38 @@ class EnhancedVisionManager:
         else:
             logger.info("🚫 Gemini Pro Vision disabled by configuration")
         
+        # Initialize Claude Vision (hedge target; standalone only when Gemini is unavailable)
+        if ENABLE_CLAUDE_VISION:
+            try:
+                self.claude_model = ClaudeVisionModel()
+                await self.claude_model.initialize()
+                if not self.claude_model.is_enabled():
+                    logger.warning("⚠️  Claude Vision disabled (no API key)")
+                elif self.gemini_model in self.models:
+                    logger.info(f"✅ Claude Vision enabled as hedge provider (hedging {'on' if ENABLE_HEDGING else 'off'})")
+                else:
+                    self.models.append(self.claude_model)
+                    logger.info("✅ Claude Vision enabled as primary provider (Gemini unavailable)")
+            except Exception as e:
+                logger.error(f"❌ Claude Vision failed to initialize: {e}")
+        else:
+            logger.info("🚫 Claude Vision disabled by configuration")
+        
+        # Initialize local YOLO UI detector
+        if ENABLE_YOLO_VISION:
+            try:
+                self.yolo_model = YOLOVisionModel()
+                await self.yolo_model.initialize()
+                if self.yolo_model.is_enabled():
+                    self.models.append(self.yolo_model)
+                    logger.info("✅ YOLO UI detector enabled")
+                else:
+                    logger.warning("⚠️  YOLO UI detector disabled (model or onnxruntime missing)")
+            except Exception as e:
+                logger.error(f"❌ YOLO UI detector failed to initialize: {e}")
+        else:
+            logger.info("🚫 YOLO UI detector disabled by configuration")
+        
         # Framework Analysis
         if ENABLE_FRAMEWORK_ANALYSIS:
             logger.info("✅ CRO Framework Analysis enabled")
@@ -59,34 +162,212 @@ class EnhancedVisionManager:
         self, 
         screenshot: bytes, 
         html_data: CROData, 
-        framework_insights: AIInsights = None
+        framework_insights: AIInsights = None,
+        mobile_screenshot: bytes = None,
+        on_partial: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        url: Optional[str] = None,
+        client_name: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        deadline: Optional[Deadline] = None
     ) -> AIInsights:
-        """Run analysis with Gemini and framework"""
+        """Run analysis with Gemini and framework
+        
+        on_partial receives recommendations and issues from streaming models
+        before the combined result is ready. url, client_name and categories
+        feed the routing policy that decides whether paid models are called.
+        With a deadline, model calls are cut off at the end of the vision
+        budget and the report keeps whatever finished.
+        """
         
         all_insights = []
+        degraded_providers = []
         
         # Add framework insights if available
         if framework_insights and self.framework_enabled:
             all_insights.append(framework_insights)
             logger.info("📊 Framework analysis included")
         
-        # Run Gemini analysis if available
-        if self.models:
-            for model in self.models:
-                try:
-                    result = await model.analyze_screenshot(screenshot, html_data)
-                    if result:
-                        all_insights.append(result)
-                        logger.info(f"🤖 {model.get_model_name()} analysis completed")
-                except Exception as e:
-                    logger.error(f"Model analysis failed: {e}")
+        # Decide whether the paid (remote) models are worth calling for this request
+        models_to_run = list(self.models)
+        remote_models = [model for model in self.models if model is not self.yolo_model]
+        routing_decision = None
+        if ENABLE_MODEL_ROUTING and remote_models:
+            page_hash = self.router.page_hash(html_data, framework_insights)
+            routing_decision = self.router.decide(url, client_name, categories, framework_insights, page_hash)
+            if routing_decision["action"] != "call":
+                models_to_run = [model for model in models_to_run if model not in remote_models]
+            if routing_decision["action"] == "reuse":
+                all_insights.extend(self.router.previous_insights(url))
+        
+        if models_to_run and deadline and deadline.time_left("vision") <= 0:
+            deadline.skip("vision", "no time left in the analysis budget")
+            models_to_run = []
+        
+        # Run all enabled models concurrently (remote Gemini + local YOLO)
+        if models_to_run:
+            results = await asyncio.gather(*[
+                self._analyze_with_model(model, screenshot, mobile_screenshot, html_data, on_partial, deadline)
+                for model in models_to_run
+            ], return_exceptions=True)
+            
+            remote_results = []
+            for model, result in zip(models_to_run, results):
+                if isinstance(result, DeadlineExceeded) or (
+                    deadline and not result and deadline.time_left("vision") <= 0
+                ):
+                    deadline.skip("vision", f"{model.get_model_name()} did not answer within the analysis deadline")
+                elif isinstance(result, CircuitOpenError):
+                    logger.warning(f"⚡ {model.get_model_name()} skipped: {result}")
+                    degraded_providers.append(model.get_model_name())
+                elif isinstance(result, Exception):
+                    logger.error(f"Model analysis failed: {result}")
+                    degraded_providers.append(model.get_model_name())
+                elif not result or self._is_fallback_result(result):
+                    # Mock analyses carry no real findings - leave them out of the report
+                    degraded_providers.append(model.get_model_name())
+                else:
+                    all_insights.append(result)
+                    if model in remote_models:
+                        remote_results.append(result)
+                    logger.info(f"🤖 {model.get_model_name()} analysis completed")
+            
+            # Keep remote results so an unchanged page can reuse them
+            if routing_decision and routing_decision["action"] == "call" and remote_results:
+                self.router.remember(url, page_hash, remote_results)
         
         # If no insights available, return fallback
         if not all_insights:
-            return self._get_enhanced_fallback_analysis(html_data)
+            combined = self._get_enhanced_fallback_analysis(html_data)
+        else:
+            # Combine all insights (framework + Gemini)
+            combined = self._combine_enhanced_insights(all_insights, html_data)
+        
+        if degraded_providers:
+            combined.degraded = True
+            combined.degraded_providers = degraded_providers
+            logger.warning(f"⚠️  Degraded analysis - no result from: {', '.join(degraded_providers)}")
+        
+        combined.routing_decision = routing_decision
+        return combined
+    
+    async def _analyze_with_model(
+        self,
+        model,
+        screenshot: bytes,
+        mobile_screenshot: bytes,
+        html_data: CROData,
+        on_partial: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> AIInsights:
+        """Run one model, hedging Gemini with Claude when it is slower than usual"""
+        if model is self.gemini_model and self._hedging_available():
+            return await self.hedging_policy.run(
+                primary=lambda: self._guarded_call(model, screenshot, mobile_screenshot, html_data, on_partial, deadline),
+                secondary=lambda: self._guarded_call(self.claude_model, screenshot, mobile_screenshot, html_data, deadline=deadline),
+                is_valid=self._is_usable_result
+            )
+        
+        return await self._guarded_call(model, screenshot, mobile_screenshot, html_data, on_partial, deadline)
+    
+    def _get_breaker(self, model) -> CircuitBreaker:
+        """Circuit breaker for a provider (created on first use)"""
+        name = model.get_model_name()
+        if name not in self.circuit_breakers:
+            self.circuit_breakers[name] = CircuitBreaker(
+                name,
+                failure_rate_threshold=BREAKER_FAILURE_RATE,
+                slow_call_seconds=BREAKER_SLOW_CALL_SECONDS,
+                slow_call_rate_threshold=BREAKER_SLOW_CALL_RATE,
+                window_size=BREAKER_WINDOW_SIZE,
+                min_calls=BREAKER_MIN_CALLS,
+                open_seconds=BREAKER_OPEN_SECONDS
+            )
+        return self.circuit_breakers[name]
+    
+    async def _guarded_call(
+        self,
+        model,
+        screenshot: bytes,
+        mobile_screenshot: bytes,
+        html_data: CROData,
+        on_partial: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> AIInsights:
+        """Call a provider through its circuit breaker and timeout (or the analysis deadline, if sooner)"""
+        timeout = PROVIDER_TIMEOUT_SECONDS
+        deadline_bound = deadline is not None and deadline.time_left("vision") < timeout
+        if deadline_bound:
+            timeout = deadline.time_left("vision")
+        
+        provider = model.get_model_name()
+        breaker = self._get_breaker(model)
+        if not breaker.allow_request():
+            MODEL_CALLS.labels(provider=provider, outcome="circuit_open").inc()
+            raise CircuitOpenError(f"circuit open for {provider}")
+        
+        start_time = time.time()
+        try:
+            result = await asyncio.wait_for(
+                self._call_model(model, screenshot, mobile_screenshot, html_data, on_partial),
+                timeout
+            )
+        except asyncio.CancelledError:
+            breaker.record_cancelled()
+            MODEL_CALLS.labels(provider=provider, outcome="cancelled").inc()
+            raise
+        except Exception as e:
+            if deadline_bound and isinstance(e, asyncio.TimeoutError):
+                # Cut short by our own budget - says nothing about the provider's health
+                breaker.record_cancelled()
+                MODEL_CALLS.labels(provider=provider, outcome="deadline").inc()
+                raise DeadlineExceeded(f"{provider} cut off after {timeout:.1f}s by the analysis deadline")
+            # Includes asyncio.TimeoutError
+            breaker.record_failure()
+            MODEL_CALLS.labels(provider=provider, outcome="timeout" if isinstance(e, asyncio.TimeoutError) else "error").inc()
+            raise
+        
+        # Providers swallow their own errors and return a mock analysis
+        if self._is_fallback_result(result):
+            breaker.record_failure()
+            MODEL_CALLS.labels(provider=provider, outcome="fallback").inc()
+        else:
+            breaker.record_success(time.time() - start_time)
+            MODEL_CALLS.labels(provider=provider, outcome="success").inc()
+        
+        return result
+    
+    def _is_fallback_result(self, insights: AIInsights) -> bool:
+        """Mock/fallback analyses are marked with a 'system' recommendation"""
+        return any(rec.category == "system" for rec in insights.recommendations)
+    
+    def _hedging_available(self) -> bool:
+        """Hedging needs a ready secondary provider"""
+        return ENABLE_HEDGING and self.claude_model is not None and self.claude_model.is_enabled()
+    
+    def _is_usable_result(self, insights: Optional[AIInsights]) -> bool:
+        """A parsed provider answer, not a fallback/mock analysis"""
+        if not insights or not insights.category_scores:
+            return False
+        return not self._is_fallback_result(insights)
+    
+    async def _call_model(
+        self,
+        model,
+        screenshot: bytes,
+        mobile_screenshot: bytes,
+        html_data: CROData,
+        on_partial: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+    ) -> AIInsights:
+        """Run one model, using a single multi-viewport request when both captures are available"""
+        kwargs = {}
+        if on_partial and getattr(model, 'supports_partial_results', lambda: False)():
+            kwargs["on_partial"] = on_partial
+        
+        if ENABLE_MULTI_VIEWPORT and screenshot and mobile_screenshot and hasattr(model, 'analyze_multi_viewport'):
+            logger.info(f"📱 Running {model.get_model_name()} on desktop + mobile screenshots")
+            return await model.analyze_multi_viewport(screenshot, mobile_screenshot, html_data, **kwargs)
         
-        # Combine all insights (framework + Gemini)
-        return self._combine_enhanced_insights(all_insights, html_data)
+        return await model.analyze_screenshot(screenshot, html_data, **kwargs)
     
     def _combine_enhanced_insights(self, insights_list: List[AIInsights], html_data: CROData) -> AIInsights:
         """Enhanced insight combination with framework priority"""
@@ -141,6 +422,10 @@ class EnhancedVisionManager:
                 elif rec.priority == "high":  # Keep high-priority AI recommendations
                     framework_insights.recommendations.append(rec)
         
+            # Keep computer vision detections
+            if ai_insight.yolo_analysis and not framework_insights.yolo_analysis:
+                framework_insights.yolo_analysis = ai_insight.yolo_analysis
+        
         # Remove duplicates
         framework_insights.visual_issues = list(set(framework_insights.visual_issues))
         framework_insights.mobile_issues = list(set(framework_insights.mobile_issues))
@@ -156,11 +441,12 @@ class EnhancedVisionManager:
         # Traditional AI combining logic
         combined = AIInsights()
         
-        # Average the scores
+        # Average the scores (detectors like YOLO report elements, not scores)
+        scored_insights = [insights for insights in ai_insights if insights.category_scores] or ai_insights
         score_totals = {}
         score_counts = {}
         
-        for insights in ai_insights:
+        for insights in scored_insights:
             combined.overall_score += insights.overall_score
             
             for category, score in insights.category_scores.items():
@@ -171,7 +457,7 @@ class EnhancedVisionManager:
                 score_counts[category] += 1
         
         # Calculate averages
-        combined.overall_score = combined.overall_score // len(ai_insights)
+        combined.overall_score = combined.overall_score // len(scored_insights)
         for category, total in score_totals.items():
             combined.category_scores[category] = total // score_counts[category]
         
@@ -191,6 +477,9 @@ class EnhancedVisionManager:
         combined.mobile_issues = list(set([
             issue for insights in ai_insights for issue in insights.mobile_issues
         ]))
+        combined.yolo_analysis = next(
+            (insights.yolo_analysis for insights in ai_insights if insights.yolo_analysis), None
+        )
         
         return combined
     
@@ -290,6 +579,12 @@ class EnhancedVisionManager:
         
         return methods
     
+    def _breaker_status(self, model) -> Optional[Dict[str, Any]]:
+        """Circuit breaker state for a provider, if it has been called"""
+        if not model or model.get_model_name() not in self.circuit_breakers:
+            return None
+        return self.circuit_breakers[model.get_model_name()].get_status()
+    
     async def get_models_status(self) -> Dict[str, Any]:
         """Get detailed status of all analysis methods"""
         status = {
@@ -298,8 +593,41 @@ class EnhancedVisionManager:
                 "initialized": self.gemini_model is not None,
                 "ready": self.gemini_model.is_enabled() if self.gemini_model else False,
                 "model": "Gemini 2.5 Pro Vision",
+                "circuit_breaker": self._breaker_status(self.gemini_model),
                 "description": "AI-powered CRO analysis and UI element detection"
             },
+            "yolo_vision": {
+                "enabled": ENABLE_YOLO_VISION,
+                "initialized": self.yolo_model is not None,
+                "ready": self.yolo_model.is_enabled() if self.yolo_model else False,
+                "model": self.yolo_model.model_path if self.yolo_model else None,
+                "batch_scheduler": self.yolo_model.scheduler.get_status() if self.yolo_model and self.yolo_model.scheduler else None,
+                "circuit_breaker": self._breaker_status(self.yolo_model),
+                "description": "Local UI element detection (ONNX Runtime CPU)"
+            },
+            "claude_vision": {
+                "enabled": ENABLE_CLAUDE_VISION,
+                "initialized": self.claude_model is not None,
+                "ready": self.claude_model.is_enabled() if self.claude_model else False,
+                "role": "primary" if self.claude_model in self.models else "hedge",
+                "circuit_breaker": self._breaker_status(self.claude_model),
+                "description": "Secondary vision provider for hedged requests"
+            },
+            "hedging": {
+                "enabled": ENABLE_HEDGING,
+                "active": self._hedging_available() and self.gemini_model in self.models,
+                **self.hedging_policy.get_status(),
+                "description": "Backup request to Claude when Gemini exceeds its usual latency"
+            },
+            "model_routing": {
+                "enabled": ENABLE_MODEL_ROUTING,
+                **self.router.get_status(),
+                "description": "Skips or reuses paid vision calls based on categories, page changes, framework confidence and client budgets"
+            },
+            "multi_viewport": {
+                "enabled": ENABLE_MULTI_VIEWPORT,
+                "description": "Desktop and mobile screenshots analyzed in one request"
+            },
             "framework_analysis": {
                 "enabled": ENABLE_FRAMEWORK_ANALYSIS,
                 "initialized": True,
@@ -315,4 +643,8 @@ class EnhancedVisionManager:
         """Close all models"""
         for model in self.models:
             if hasattr(model, 'close'):
-                await model.close()
\ No newline at end of file
+                await model.close()
+        
+        # Hedge-only provider is not in self.models
+        if self.claude_model and self.claude_model not in self.models:
+            await self.claude_model.close()
\ No newline at end of file
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Enhanced CRO Analyzer - Job Worker
+Consumes analysis jobs from the Redis stream that the API enqueues with JOB_BACKEND=redis.
+Run several per node and on as many nodes as browser capacity requires:
+
+    python enhanced_worker.py --concurrency 4
+"""
+
+import os
+import signal
+import socket
+import asyncio
+import argparse
+import logging
+from dotenv import load_dotenv
+
+from app.database import init_db
+from app.services.cache_service import CacheService
+from app.services.redis_job_queue import RedisJobQueue
+
+from enhanced_vision_manager import EnhancedVisionManager
+from enhanced_analysis_engine import EnhancedCROAnalysisEngine
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))  # Jobs analysed at once per process
+
+async def run_worker(concurrency: int):
+    """Start the analysis services and consume jobs until SIGINT/SIGTERM"""
+    logger.info(f"🚀 Starting CRO job worker with {concurrency} consumers...")
+    
+    await init_db()
+    
+    cache_service = CacheService()
+    vision_manager = EnhancedVisionManager()
+    analysis_engine = EnhancedCROAnalysisEngine(cache_service, vision_manager)
+    await vision_manager.initialize_models()
+    
+    job_queue = RedisJobQueue()
+    await job_queue.initialize()
+    
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    
+    # Consumer names must be unique within the group and stable for the life of the process
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    job_queue.consumers = [
+        asyncio.create_task(job_queue.consume(f"{prefix}-{i}", analysis_engine))
+        for i in range(concurrency)
+    ]
+    logger.info(f"✅ Worker {prefix} ready")
+    
+    await stop.wait()
+    logger.info("🛑 Shutting down worker, requeueing running jobs...")
+    
+    await job_queue.close()
+    await analysis_engine.close()
+    logger.info("👋 Worker shutdown complete")
+
+def main():
+    parser = argparse.ArgumentParser(description="CRO analysis job worker")
+    parser.add_argument(
+        "--concurrency", type=int, default=WORKER_CONCURRENCY,
+        help="Jobs processed concurrently by this process (default: WORKER_CONCURRENCY or 2)"
+    )
+    args = parser.parse_args()
+    asyncio.run(run_worker(max(1, args.concurrency)))
+
+if __name__ == "__main__":
+    main()
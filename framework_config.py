@@ -15,10 +15,18 @@ class FrameworkConfig:
     ENABLE_PSYCHOLOGICAL_ANALYSIS: bool = True
     
     # Performance settings
-    MAX_ANALYSIS_TIME: int = 30  # seconds
+    MAX_ANALYSIS_TIME: int = 120  # seconds, enforced per analysis by the pipeline deadline (fits Lighthouse and a slow Gemini call)
     CONCURRENT_ANALYSIS: bool = True
     SAVE_SCREENSHOTS: bool = True
     
+    # Share of MAX_ANALYSIS_TIME by which each pipeline stage must finish (in order, cumulative)
+    STAGE_BUDGET_SHARES = {
+        "collection": 0.45,     # Screenshots + scraping/framework/Lighthouse, in parallel (54s of 120s)
+        "visual_layout": 0.05,  # Pixel metrics from the screenshots
+        "vision": 0.45,         # Vision model calls (Gemini takes 20-40s, so ~50-60s left at 120s)
+        "report": 0.05          # Report assembly, cache and database writes
+    }
+    
     # Scoring thresholds
     NAVIGATION_THRESHOLDS = {
         "max_nav_links": 15,
@@ -178,13 +186,13 @@ def load_config_from_env():
 # Development presets
 def load_development_config():
     """Load development-friendly configuration"""
-    config.MAX_ANALYSIS_TIME = 15  # Faster for development
+    config.MAX_ANALYSIS_TIME = 90  # Faster for development (Lighthouse and vision still fit)
     config.SAVE_SCREENSHOTS = True  # Help with debugging
     config.CONCURRENT_ANALYSIS = True
 
 def load_production_config():
     """Load production-optimized configuration"""
-    config.MAX_ANALYSIS_TIME = 30
+    config.MAX_ANALYSIS_TIME = 120
     config.SAVE_SCREENSHOTS = False  # Save disk space
     config.CONCURRENT_ANALYSIS = True
 
@@ -195,7 +203,7 @@ def load_minimal_config():
     config.ENABLE_INFORMATION_ANALYSIS = True
     config.ENABLE_TECHNICAL_ANALYSIS = False
     config.ENABLE_PSYCHOLOGICAL_ANALYSIS = True
-    config.MAX_ANALYSIS_TIME = 10
+    config.MAX_ANALYSIS_TIME = 60  # No Lighthouse, but the vision call still needs its window
 
 # Initialize configuration
 load_config_from_env()
\ No newline at end of file
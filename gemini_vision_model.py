@@ -5,9 +5,9 @@ import time
 import logging
 import asyncio
 import base64
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable, Awaitable, Tuple
 import json
-import re
+import io
 
 try:
     import google.generativeai as genai
@@ -16,10 +16,257 @@ except ImportError:
     GEMINI_AVAILABLE = False
     logging.warning("google-generativeai not installed. Run: pip install google-generativeai")
 
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    logging.warning("Pillow not installed - screenshots will be sent to Gemini at full size. Run: pip install Pillow")
+
 from app.models import AIInsights, CROData, Recommendation, ElementPosition
+from app.services.tracing import span
 
 logger = logging.getLogger(__name__)
 
+# Downscaling limits for multi-viewport requests (width, max height) in pixels.
+# Full-page captures can be 10k+ pixels tall; Gemini resizes them anyway, so
+# shrinking locally keeps the upload small and the two images in one request.
+DESKTOP_IMAGE_LIMITS = (1024, 3072)
+MOBILE_IMAGE_LIMITS = (375, 2400)
+DOWNSCALED_JPEG_QUALITY = 80
+
+_SCORE = {"type": "integer"}
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+_CATEGORY_SCORES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "navigation": _SCORE,
+        "display": _SCORE,
+        "information": _SCORE,
+        "technical": _SCORE,
+        "psychological": _SCORE
+    },
+    "required": ["navigation", "display", "information", "technical", "psychological"]
+}
+
+_UI_ELEMENTS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "total_elements": _SCORE,
+        "cta_buttons": _SCORE,
+        "trust_signals": _SCORE,
+        "navigation_items": _SCORE,
+        "forms": _SCORE,
+        "product_images": _SCORE
+    }
+}
+
+_RECOMMENDATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "category": {"type": "string"},
+        "priority": {"type": "string", "enum": ["high", "medium", "low"]},
+        "issue": {"type": "string"},
+        "solution": {"type": "string"},
+        "impact": {"type": "string"}
+    },
+    "required": ["category", "priority", "issue", "solution", "impact"]
+}
+
+# Schema-constrained output for the single screenshot prompt
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "overall_score": _SCORE,
+        "category_scores": _CATEGORY_SCORES_SCHEMA,
+        "ui_elements_detected": _UI_ELEMENTS_SCHEMA,
+        "recommendations": {"type": "array", "items": _RECOMMENDATION_SCHEMA},
+        "visual_issues": _STRING_LIST,
+        "mobile_issues": _STRING_LIST
+    },
+    "required": ["overall_score", "category_scores", "recommendations", "visual_issues", "mobile_issues"]
+}
+
+# Schema-constrained output for the desktop + mobile prompt
+_VIEWPORT_FINDINGS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": _SCORE,
+        "issues": _STRING_LIST
+    },
+    "required": ["score", "issues"]
+}
+
+MULTI_VIEWPORT_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "overall_score": _SCORE,
+        "category_scores": _CATEGORY_SCORES_SCHEMA,
+        "ui_elements_detected": _UI_ELEMENTS_SCHEMA,
+        "desktop_findings": _VIEWPORT_FINDINGS_SCHEMA,
+        "mobile_findings": _VIEWPORT_FINDINGS_SCHEMA,
+        "recommendations": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    **_RECOMMENDATION_SCHEMA["properties"],
+                    "viewport": {"type": "string", "enum": ["desktop", "mobile", "both"]}
+                },
+                "required": _RECOMMENDATION_SCHEMA["required"]
+            }
+        }
+    },
+    "required": ["overall_score", "category_scores", "desktop_findings", "mobile_findings", "recommendations"]
+}
+
+# Arrays whose items are surfaced as soon as they are complete in the stream
+STREAMED_ARRAY_PATHS = (
+    "recommendations",
+    "visual_issues",
+    "mobile_issues",
+    "desktop_findings.issues",
+    "mobile_findings.issues"
+)
+
+def prepare_screenshot(screenshot: bytes, limits: tuple) -> Tuple[str, str]:
+    """Downscale a full-page PNG capture to a JPEG within the given (width, height) limits
+
+    Returns (media type, base64 data); the original PNG is sent when Pillow
+    is missing or the image cannot be decoded. Shared by all vision providers.
+    """
+    if not PIL_AVAILABLE:
+        return "image/png", base64.b64encode(screenshot).decode('utf-8')
+    
+    max_width, max_height = limits
+    
+    try:
+        image = Image.open(io.BytesIO(screenshot)).convert("RGB")
+        
+        # Scale to target width first, then crop the (usually very long) page height
+        if image.width > max_width:
+            ratio = max_width / image.width
+            image = image.resize((max_width, max(1, int(image.height * ratio))), Image.LANCZOS)
+        if image.height > max_height:
+            image = image.crop((0, 0, image.width, max_height))
+        
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=DOWNSCALED_JPEG_QUALITY, optimize=True)
+        
+        return "image/jpeg", base64.b64encode(buffer.getvalue()).decode('utf-8')
+        
+    except Exception as e:
+        logger.warning(f"Screenshot downscaling failed, sending original: {e}")
+        return "image/png", base64.b64encode(screenshot).decode('utf-8')
+
+class StreamingJSONParser:
+    """Incremental scanner for a streamed JSON document.
+    
+    Each character is scanned once as chunks arrive. Completed items of the
+    tracked arrays are returned from feed() as (path, value) pairs, and
+    result() decodes the finished document.
+    """
+    
+    def __init__(self, tracked_paths=STREAMED_ARRAY_PATHS):
+        self.tracked_paths = set(tracked_paths)
+        self.text = ""
+        self.pos = 0
+        # Each frame: [bracket, path, pending_key, expecting_key]
+        self.stack: List[list] = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = 0
+        self.item_start = None
+        self.item_depth = 0
+    
+    def feed(self, chunk: str) -> List[tuple]:
+        """Consume a chunk and return newly completed (path, item) pairs"""
+        self.text += chunk
+        text = self.text
+        items = []
+        
+        for i in range(self.pos, len(text)):
+            ch = text[i]
+            
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    self._end_string(i, items)
+                continue
+            
+            if ch == '"':
+                self._begin_value(i)
+                self.in_string = True
+                self.string_start = i
+            elif ch in '{[':
+                self._begin_value(i)
+                self.stack.append([ch, self._child_path(), None, ch == '{'])
+            elif ch in '}]':
+                self._end_scalar(i, items)
+                if self.stack:
+                    self.stack.pop()
+                self._end_value(i + 1, items)
+            elif ch == ',':
+                self._end_scalar(i, items)
+                if self.stack and self.stack[-1][0] == '{':
+                    self.stack[-1][3] = True
+            elif ch == ':':
+                if self.stack and self.stack[-1][0] == '{':
+                    self.stack[-1][3] = False
+            elif not ch.isspace():
+                self._begin_value(i)
+        
+        self.pos = len(text)
+        return items
+    
+    def result(self) -> Dict[str, Any]:
+        """Decode the complete document"""
+        return json.loads(self.text)
+    
+    def _child_path(self) -> str:
+        if not self.stack:
+            return ""
+        bracket, path, pending_key, _ = self.stack[-1]
+        child = pending_key if bracket == '{' else "*"
+        return f"{path}.{child}" if path else child
+    
+    def _begin_value(self, index: int):
+        if self.item_start is not None or not self.stack:
+            return
+        bracket, path, _, _ = self.stack[-1]
+        if bracket == '[' and path in self.tracked_paths:
+            self.item_start = index
+            self.item_depth = len(self.stack)
+    
+    def _end_string(self, index: int, items: list):
+        frame = self.stack[-1] if self.stack else None
+        if frame and frame[0] == '{' and frame[3]:
+            frame[2] = json.loads(self.text[self.string_start:index + 1])
+            return
+        self._end_value(index + 1, items)
+    
+    def _end_value(self, end: int, items: list):
+        if self.item_start is not None and len(self.stack) == self.item_depth:
+            self._emit(self.text[self.item_start:end], items)
+    
+    def _end_scalar(self, index: int, items: list):
+        if (self.item_start is not None and len(self.stack) == self.item_depth
+                and self.text[self.item_start] not in '"{['):
+            self._emit(self.text[self.item_start:index], items)
+    
+    def _emit(self, raw: str, items: list):
+        path = self.stack[-1][1]
+        self.item_start = None
+        try:
+            items.append((path, json.loads(raw)))
+        except ValueError:
+            logger.debug(f"Skipping malformed streamed item in {path}")
+
 class GeminiResults:
     """Results from Gemini Vision analysis"""
     def __init__(self):
@@ -79,54 +326,119 @@ class GeminiVisionModel:
         except Exception as e:
             raise Exception(f"Gemini model test failed: {e}")
     
-    async def analyze_screenshot(self, screenshot: bytes, html_data: CROData) -> AIInsights:
+    async def analyze_screenshot(
+        self,
+        screenshot: bytes,
+        html_data: CROData,
+        on_partial: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+    ) -> AIInsights:
         """Analyze screenshot using Gemini Pro Vision for CRO insights"""
         if not self.enabled:
             return self._get_mock_analysis()
         
+        # Convert screenshot to base64 for Gemini
+        screenshot_b64 = base64.b64encode(screenshot).decode('utf-8')
+        
+        # Generate comprehensive CRO analysis prompt
+        prompt = self._generate_cro_analysis_prompt(html_data)
+        
+        # Prepare image data for Gemini
+        image_data = {
+            "mime_type": "image/png",
+            "data": screenshot_b64
+        }
+        
+        return await self._run_analysis([prompt, image_data], html_data, RESPONSE_SCHEMA, on_partial)
+    
+    async def analyze_multi_viewport(
+        self,
+        desktop_screenshot: bytes,
+        mobile_screenshot: bytes,
+        html_data: CROData,
+        on_partial: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+    ) -> AIInsights:
+        """Analyze desktop and mobile screenshots together in a single Gemini request"""
+        if not self.enabled:
+            return self._get_mock_analysis()
+        
+        # Downscale both captures so they fit comfortably in one request
+        with span("gemini.prepare_images"):
+            desktop_image = self._prepare_image(desktop_screenshot, DESKTOP_IMAGE_LIMITS)
+            mobile_image = self._prepare_image(mobile_screenshot, MOBILE_IMAGE_LIMITS)
+        
+        prompt = self._generate_multi_viewport_prompt(html_data)
+        
+        return await self._run_analysis(
+            [prompt, "Desktop screenshot (1920px viewport):", desktop_image,
+             "Mobile screenshot (375px viewport):", mobile_image],
+            html_data,
+            MULTI_VIEWPORT_RESPONSE_SCHEMA,
+            on_partial
+        )
+    
+    async def _run_analysis(
+        self,
+        contents: list,
+        html_data: CROData,
+        response_schema: Dict[str, Any],
+        on_partial: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+    ) -> AIInsights:
+        """Stream a schema-constrained Gemini response and convert it into AIInsights
+        
+        When on_partial is given, each recommendation and issue is forwarded
+        as soon as it is complete in the stream.
+        """
         start_time = time.time()
         
         try:
-            # Convert screenshot to base64 for Gemini
-            screenshot_b64 = base64.b64encode(screenshot).decode('utf-8')
-            
-            # Generate comprehensive CRO analysis prompt
-            prompt = self._generate_cro_analysis_prompt(html_data)
+            generation_config = genai.GenerationConfig(
+                response_mime_type="application/json",
+                response_schema=response_schema
+            )
             
-            # Prepare image data for Gemini
-            image_data = {
-                "mime_type": "image/png",
-                "data": screenshot_b64
-            }
+            # Stream the response so parsing runs while Gemini is still generating
+            parser = StreamingJSONParser()
+            with span("gemini.request"):
+                response = await self.model.generate_content_async(
+                    contents,
+                    generation_config=generation_config,
+                    stream=True
+                )
+            with span("gemini.stream") as stream_span:
+                async for chunk in response:
+                    items = parser.feed(self._chunk_text(chunk))
+                    if on_partial:
+                        for path, item in items:
+                            await self._forward_partial(on_partial, path, item)
+                stream_span.set_attribute("response_chars", len(parser.text))
             
-            # Call Gemini API asynchronously
-            response = await asyncio.to_thread(
-                self.model.generate_content,
-                [prompt, image_data]
-            )
+            processing_time = time.time() - start_time
             
-            # Parse the response
-            insights = await self._parse_gemini_response(response.text, html_data)
+            # Single parse feeds both the insights and the metrics
+            with span("gemini.parse"):
+                try:
+                    data = parser.result()
+                except ValueError as e:
+                    logger.error(f"Failed to parse Gemini response: {e}")
+                    logger.debug(f"Raw response: {parser.text[:500]}...")
+                    return self._get_fallback_analysis_from_text(parser.text)
+                
+                insights = self._parse_gemini_response(data, html_data)
             
             # Add Gemini-specific analysis results to visual_issues for reporting
-            processing_time = time.time() - start_time
             gemini_info = f"🚀 Gemini Pro Vision analysis completed in {processing_time:.2f}s"
             insights.visual_issues.insert(0, gemini_info)
             
             # Extract metrics for logging
             gemini_results = GeminiResults()
             gemini_results.processing_time = processing_time
-            gemini_results.raw_analysis = response.text
-            gemini_results = self._extract_gemini_metrics(response.text, gemini_results)
+            gemini_results.raw_analysis = parser.text
+            gemini_results = self._extract_gemini_metrics(data, gemini_results)
             
             # Log Gemini metrics (don't add to insights object to avoid field errors)
             logger.info(f"🤖 Gemini detected {gemini_results.ui_elements_detected} UI elements")
             logger.info(f"🎯 Found {gemini_results.cta_buttons_found} CTA buttons, {gemini_results.trust_signals_found} trust signals")
             
-            # Mark recommendations as from Gemini
-            for rec in insights.recommendations:
-                rec.source = "gemini"
-            
             logger.info(f"🤖 Gemini analyzed UI in {processing_time:.2f}s")
             
             return insights
@@ -135,10 +447,37 @@ class GeminiVisionModel:
             logger.error(f"Gemini analysis failed: {e}")
             return self._get_mock_analysis()
     
-    def _generate_cro_analysis_prompt(self, html_data: CROData) -> str:
-        """Generate comprehensive CRO analysis prompt for Gemini"""
+    async def _forward_partial(self, on_partial, path: str, item: Any):
+        """Send one streamed item to the partial-results callback"""
+        if path == "recommendations":
+            event = {"kind": "recommendation", "data": self._build_recommendation(item).model_dump()}
+        elif path in ("mobile_issues", "mobile_findings.issues"):
+            event = {"kind": "mobile_issue", "data": item}
+        else:
+            event = {"kind": "visual_issue", "data": item}
+        event["source"] = "gemini"
         
-        html_context = f"""
+        try:
+            await on_partial(event)
+        except Exception as e:
+            # A slow or closed consumer must not break the analysis itself
+            logger.warning(f"Partial result delivery failed: {e}")
+    
+    def _chunk_text(self, chunk) -> str:
+        """Text of a streamed chunk (empty for chunks without text parts)"""
+        try:
+            return chunk.text
+        except ValueError:
+            return ""
+    
+    def _prepare_image(self, screenshot: bytes, limits: tuple) -> Dict[str, str]:
+        """Inline image part for a screenshot downscaled to the given limits"""
+        mime_type, data = prepare_screenshot(screenshot, limits)
+        return {"mime_type": mime_type, "data": data}
+    
+    def _build_html_context(self, html_data: CROData) -> str:
+        """Summarize scraped HTML elements for the prompt"""
+        return f"""
 HTML Analysis Context:
 - CTA Buttons detected: {len(html_data.cta_buttons)}
 - Trust Signals found: {len(html_data.trust_signals)}
@@ -147,6 +486,11 @@ HTML Analysis Context:
 - Coupon Fields: {len(html_data.coupon_fields)}
 - Delivery Info: {len(html_data.delivery_info)}
 """
+    
+    def _generate_cro_analysis_prompt(self, html_data: CROData) -> str:
+        """Generate comprehensive CRO analysis prompt for Gemini"""
+        
+        html_context = self._build_html_context(html_data)
         
         prompt = f"""You are a Conversion Rate Optimization expert analyzing this website screenshot. 
 
@@ -240,44 +584,118 @@ Return only the JSON response, no additional text."""
 
         return prompt
     
-    async def _parse_gemini_response(self, response_text: str, html_data: CROData) -> AIInsights:
-        """Parse Gemini's JSON response into AIInsights"""
-        try:
-            # Extract JSON from response (Gemini might include extra text)
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if not json_match:
-                raise ValueError("No JSON found in Gemini response")
-            
-            json_str = json_match.group(0)
-            data = json.loads(json_str)
-            
-            # Convert recommendations
-            recommendations = []
-            for rec_data in data.get('recommendations', []):
-                recommendations.append(Recommendation(
-                    category=rec_data.get('category', 'general'),
-                    priority=rec_data.get('priority', 'medium'),
-                    issue=rec_data.get('issue', ''),
-                    solution=rec_data.get('solution', ''),
-                    impact=rec_data.get('impact', ''),
-                    source="gemini"
-                ))
-            
-            # Create AIInsights object
-            insights = AIInsights(
-                overall_score=data.get('overall_score', 75),
-                category_scores=data.get('category_scores', {}),
-                recommendations=recommendations,
-                visual_issues=data.get('visual_issues', []),
-                mobile_issues=data.get('mobile_issues', [])
-            )
-            
-            return insights
-            
-        except Exception as e:
-            logger.error(f"Failed to parse Gemini response: {e}")
-            logger.debug(f"Raw response: {response_text[:500]}...")
-            return self._get_fallback_analysis_from_text(response_text)
+    def _generate_multi_viewport_prompt(self, html_data: CROData) -> str:
+        """Generate CRO prompt covering both the desktop and mobile screenshots"""
+        
+        html_context = self._build_html_context(html_data)
+        
+        prompt = f"""You are a Conversion Rate Optimization expert. You are given two screenshots of the same page:
+the first is the DESKTOP layout (1920px viewport), the second is the MOBILE layout (375px viewport).
+
+{html_context}
+
+Analyze both layouts for conversion optimization and provide your analysis in the following JSON format:
+
+{{
+  "overall_score": 82,
+  "category_scores": {{
+    "navigation": 78,
+    "display": 85,
+    "information": 80,
+    "technical": 76,
+    "psychological": 87
+  }},
+  "ui_elements_detected": {{
+    "total_elements": 25,
+    "cta_buttons": 4,
+    "trust_signals": 2,
+    "navigation_items": 8,
+    "forms": 1,
+    "product_images": 6
+  }},
+  "desktop_findings": {{
+    "score": 84,
+    "issues": [
+      "Primary CTA button lacks visual prominence",
+      "Trust badges are not visible above the fold"
+    ]
+  }},
+  "mobile_findings": {{
+    "score": 71,
+    "issues": [
+      "Add to cart button is below the first screen",
+      "Touch targets in the header menu are smaller than 44px"
+    ]
+  }},
+  "recommendations": [
+    {{
+      "category": "technical",
+      "viewport": "mobile",
+      "priority": "high",
+      "issue": "Primary CTA not visible on first mobile screen",
+      "solution": "Move the add to cart button above the product gallery on small screens",
+      "impact": "Could increase mobile conversions by 8-12%"
+    }}
+  ]
+}}
+
+Score the same 5 key areas (navigation, display/visual design, information architecture,
+technical/mobile, psychological/trust) across both layouts.
+
+Report desktop and mobile findings separately:
+- "desktop_findings" covers only what you see in the DESKTOP screenshot.
+- "mobile_findings" covers only what you see in the MOBILE screenshot: CTA visibility on the first
+  screen, touch target sizes, text readability, hidden or collapsed navigation, horizontal overflow,
+  intrusive overlays, and content that differs from or is missing compared to desktop.
+- Set "viewport" on each recommendation to "desktop", "mobile" or "both".
+
+Provide specific, actionable recommendations with priority levels (high/medium/low) and estimated impact.
+Focus on what you can actually see in the screenshots.
+
+Return only the JSON response, no additional text."""
+
+        return prompt
+    
+    def _parse_gemini_response(self, data: Dict[str, Any], html_data: CROData) -> AIInsights:
+        """Convert Gemini's parsed JSON response into AIInsights"""
+        # Convert recommendations
+        recommendations = [self._build_recommendation(rec_data) for rec_data in data.get('recommendations', [])]
+        
+        category_scores = data.get('category_scores', {})
+        visual_issues = data.get('visual_issues', [])
+        mobile_issues = data.get('mobile_issues', [])
+        
+        # Multi-viewport responses report desktop and mobile findings separately
+        desktop_findings = data.get('desktop_findings') or {}
+        mobile_findings = data.get('mobile_findings') or {}
+        visual_issues = visual_issues + desktop_findings.get('issues', [])
+        mobile_issues = mobile_issues + mobile_findings.get('issues', [])
+        if 'score' in mobile_findings:
+            category_scores['mobile'] = mobile_findings['score']
+        
+        # Create AIInsights object
+        return AIInsights(
+            overall_score=data.get('overall_score', 75),
+            category_scores=category_scores,
+            recommendations=recommendations,
+            visual_issues=visual_issues,
+            mobile_issues=mobile_issues
+        )
+    
+    def _build_recommendation(self, rec_data: Dict[str, Any]) -> Recommendation:
+        """Convert one recommendation object from the response"""
+        issue = rec_data.get('issue', '')
+        if rec_data.get('viewport') == 'mobile':
+            issue = f"Mobile: {issue}"
+        
+        return Recommendation(
+            category=rec_data.get('category', 'general'),
+            priority=rec_data.get('priority', 'medium'),
+            issue=issue,
+            solution=rec_data.get('solution', ''),
+            impact=rec_data.get('impact', ''),
+            source="gemini"
+        )
     
     def _get_fallback_analysis_from_text(self, response_text: str) -> AIInsights:
         """Extract insights from text response when JSON parsing fails"""
@@ -327,26 +745,14 @@ Return only the JSON response, no additional text."""
             mobile_issues=mobile_issues[:3]
         )
     
-    def _extract_gemini_metrics(self, response_text: str, gemini_results: GeminiResults) -> GeminiResults:
-        """Extract metrics from Gemini response for reporting"""
-        try:
-            # Try to parse JSON for metrics
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                data = json.loads(json_match.group(0))
-                ui_elements = data.get('ui_elements_detected', {})
-                
-                gemini_results.ui_elements_detected = ui_elements.get('total_elements', 0)
-                gemini_results.cta_buttons_found = ui_elements.get('cta_buttons', 0)
-                gemini_results.trust_signals_found = ui_elements.get('trust_signals', 0)
-                gemini_results.confidence_score = data.get('overall_score', 0) / 100.0
-                
-        except Exception:
-            # Fallback to text analysis
-            gemini_results.ui_elements_detected = len(re.findall(r'button|element|form', response_text, re.IGNORECASE))
-            gemini_results.cta_buttons_found = len(re.findall(r'cta|call.to.action|button', response_text, re.IGNORECASE))
-            gemini_results.trust_signals_found = len(re.findall(r'trust|badge|security|testimonial', response_text, re.IGNORECASE))
-            gemini_results.confidence_score = 0.75  # Default confidence
+    def _extract_gemini_metrics(self, data: Dict[str, Any], gemini_results: GeminiResults) -> GeminiResults:
+        """Extract metrics from the parsed Gemini response for reporting"""
+        ui_elements = data.get('ui_elements_detected') or {}
+        
+        gemini_results.ui_elements_detected = ui_elements.get('total_elements', 0)
+        gemini_results.cta_buttons_found = ui_elements.get('cta_buttons', 0)
+        gemini_results.trust_signals_found = ui_elements.get('trust_signals', 0)
+        gemini_results.confidence_score = data.get('overall_score', 0) / 100.0
         
         return gemini_results
     
@@ -381,4 +787,8 @@ Return only the JSON response, no additional text."""
     
     def get_model_name(self) -> str:
         """Get model name"""
-        return "Gemini Pro Vision"
\ No newline at end of file
+        return "Gemini Pro Vision"
+    
+    def supports_partial_results(self) -> bool:
+        """Gemini streams its output and can report partial results"""
+        return True
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""Cross-node single-flight: Redis analysis lease and ready channel (fakeredis)"""
+
+import asyncio
+from datetime import datetime
+
+import fakeredis
+
+from app.models import AIInsights, CategoryScores, CROAnalysisResponse, CROData
+from app.services.cache_service import CacheService
+
+URL = "https://shop.example.com/product"
+FLIGHT_KEY = f"{URL}|default"
+
+def make_nodes(count: int, lease_ttl_ms: int = 120000, ready_wait_seconds: float = 5.0):
+    """CacheServices that share one fake Redis server, like API nodes sharing Redis"""
+    server = fakeredis.FakeServer()
+    nodes = []
+    for _ in range(count):
+        node = CacheService()
+        node.redis = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        node.lease_ttl_ms = lease_ttl_ms
+        node.ready_wait_seconds = ready_wait_seconds
+        nodes.append(node)
+    return nodes
+
+def make_report() -> CROAnalysisResponse:
+    return CROAnalysisResponse(
+        id="report-1",
+        url=URL,
+        overall_score=72,
+        category_scores=CategoryScores(),
+        visual_analysis=AIInsights(),
+        element_analysis=CROData(),
+        recommendations=[],
+        models_used=["gemini"],
+        analysis_date=datetime(2026, 1, 1)
+    )
+
+def test_one_node_runs_and_the_others_read_its_report():
+    async def scenario():
+        owner, second, third = make_nodes(3)
+        token = await owner.acquire_analysis_lease(FLIGHT_KEY)
+        assert token
+        assert await second.acquire_analysis_lease(FLIGHT_KEY) is None
+        assert await third.acquire_analysis_lease(FLIGHT_KEY) is None
+        
+        waiters = [asyncio.create_task(node.wait_for_analysis(URL, FLIGHT_KEY)) for node in (second, third)]
+        await asyncio.sleep(0.1)  # Let both waiters subscribe
+        await owner.cache_analysis(URL, make_report())
+        await owner.release_analysis_lease(FLIGHT_KEY, token, succeeded=True)
+        return await asyncio.gather(*waiters)
+    
+    results = asyncio.run(scenario())
+    assert [result.id for result in results] == ["report-1", "report-1"]
+
+def test_waiter_takes_over_when_the_owner_fails():
+    async def scenario():
+        owner, waiter, _ = make_nodes(3)
+        token = await owner.acquire_analysis_lease(FLIGHT_KEY)
+        
+        waiting = asyncio.create_task(waiter.wait_for_analysis(URL, FLIGHT_KEY))
+        await asyncio.sleep(0.1)
+        await owner.release_analysis_lease(FLIGHT_KEY, token, succeeded=False)
+        result = await waiting
+        return result, await waiter.acquire_analysis_lease(FLIGHT_KEY)
+    
+    result, takeover = asyncio.run(scenario())
+    assert result is None
+    assert takeover
+
+def test_expired_lease_releases_the_waiters():
+    async def scenario():
+        owner, waiter, _ = make_nodes(3, lease_ttl_ms=300)
+        assert await owner.acquire_analysis_lease(FLIGHT_KEY)  # Owner crashes without releasing
+        
+        started = asyncio.get_running_loop().time()
+        result = await waiter.wait_for_analysis(URL, FLIGHT_KEY)
+        return result, asyncio.get_running_loop().time() - started, await waiter.acquire_analysis_lease(FLIGHT_KEY)
+    
+    result, waited, takeover = asyncio.run(scenario())
+    assert result is None
+    assert waited < 5.0  # Released by the expiry, not the ready-wait timeout
+    assert takeover
+
+def test_expired_lease_with_a_cached_report_returns_it():
+    async def scenario():
+        owner, waiter, _ = make_nodes(3, lease_ttl_ms=300)
+        assert await owner.acquire_analysis_lease(FLIGHT_KEY)
+        
+        waiting = asyncio.create_task(waiter.wait_for_analysis(URL, FLIGHT_KEY))
+        await asyncio.sleep(0.1)
+        await owner.cache_analysis(URL, make_report())  # Cached, then crashed before publishing
+        return await waiting
+    
+    result = asyncio.run(scenario())
+    assert result is not None and result.id == "report-1"
+
+def test_only_the_owner_can_renew_or_release_the_lease():
+    async def scenario():
+        owner, other, _ = make_nodes(3)
+        token = await owner.acquire_analysis_lease(FLIGHT_KEY)
+        
+        assert not await other.renew_analysis_lease(FLIGHT_KEY, "not-the-owner")
+        await other.release_analysis_lease(FLIGHT_KEY, "not-the-owner", succeeded=True)
+        assert await other.acquire_analysis_lease(FLIGHT_KEY) is None
+        
+        assert await owner.renew_analysis_lease(FLIGHT_KEY, token)
+        await owner.release_analysis_lease(FLIGHT_KEY, token, succeeded=True)
+        return await other.acquire_analysis_lease(FLIGHT_KEY)
+    
+    assert asyncio.run(scenario())
+
+def test_without_redis_every_node_runs_locally():
+    async def scenario():
+        node = CacheService()
+        return await node.acquire_analysis_lease(FLIGHT_KEY), await node.wait_for_analysis(URL, FLIGHT_KEY)
+    
+    token, result = asyncio.run(scenario())
+    assert token == "local"
+    assert result is None
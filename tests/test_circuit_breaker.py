@@ -0,0 +1,100 @@
+"""Provider circuit breaker: closed -> open -> half-open -> closed/open, with a fake clock"""
+
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+def make_breaker(**options):
+    clock = FakeClock()
+    settings = {"min_calls": 4, "window_size": 10, "open_seconds": 30.0, "slow_call_seconds": 5.0, **options}
+    return CircuitBreaker("gemini", clock=clock, **settings), clock
+
+def trip(breaker: CircuitBreaker):
+    for _ in range(breaker.min_calls):
+        breaker.record_failure()
+
+def test_stays_closed_below_min_calls_and_thresholds():
+    breaker, _ = make_breaker()
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == CLOSED  # Fewer than min_calls recorded
+    
+    breaker, _ = make_breaker(failure_rate_threshold=0.5)
+    breaker.record_failure()
+    for _ in range(4):
+        breaker.record_success(1.0)
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+
+def test_failure_rate_opens_and_rejects_calls():
+    breaker, _ = make_breaker()
+    trip(breaker)
+    
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert not breaker.allow_request()
+    status = breaker.get_status()
+    assert (status["rejected_calls"], status["times_opened"]) == (2, 1)
+    assert status["retry_in_seconds"] == 30.0
+
+def test_slow_call_rate_opens():
+    breaker, _ = make_breaker(slow_call_rate_threshold=0.75)
+    for _ in range(4):
+        breaker.record_success(latency=6.0)
+    assert breaker.state == OPEN
+
+def test_half_open_after_the_cooldown_allows_one_probe():
+    breaker, clock = make_breaker()
+    trip(breaker)
+    
+    clock.now += 29.9
+    assert not breaker.allow_request()
+    clock.now += 0.1
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()  # Only half_open_max_calls probes at a time
+
+def test_successful_probe_closes():
+    breaker, clock = make_breaker()
+    trip(breaker)
+    clock.now += 30
+    breaker.allow_request()
+    
+    breaker.record_success(latency=1.0)
+    assert breaker.state == CLOSED
+    assert breaker.get_status()["calls_in_window"] == 0
+    assert breaker.allow_request()
+
+def test_failed_or_slow_probe_reopens_with_a_new_cooldown():
+    for outcome in ("failure", "slow"):
+        breaker, clock = make_breaker()
+        trip(breaker)
+        clock.now += 30
+        breaker.allow_request()
+        
+        if outcome == "failure":
+            breaker.record_failure()
+        else:
+            breaker.record_success(latency=6.0)
+        assert breaker.state == OPEN
+        assert breaker.times_opened == 2
+        
+        clock.now += 29
+        assert not breaker.allow_request()  # The cooldown restarted at the probe
+        clock.now += 1
+        assert breaker.allow_request()
+
+def test_cancelled_probe_frees_its_slot():
+    breaker, clock = make_breaker()
+    trip(breaker)
+    clock.now += 30
+    assert breaker.allow_request()
+    
+    breaker.record_cancelled()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
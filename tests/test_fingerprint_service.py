@@ -0,0 +1,157 @@
+"""Change detection: conditional GET, normalized content hash and rel=canonical (local server, in-memory SQLite)"""
+
+import asyncio
+import itertools
+from datetime import datetime
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import AIInsights, CategoryScores, CROAnalysisResponse, CROData
+from app.services import fingerprint_service
+from app.services.fingerprint_service import FingerprintService
+
+KEY = "analysis-key"
+
+def make_report(url: str) -> CROAnalysisResponse:
+    return CROAnalysisResponse(
+        id="report-1",
+        url=url,
+        overall_score=72,
+        category_scores=CategoryScores(),
+        visual_analysis=AIInsights(),
+        element_analysis=CROData(),
+        recommendations=[],
+        models_used=["gemini"],
+        analysis_date=datetime(2026, 1, 1)
+    )
+
+class Site:
+    """Local pages: one with an ETag, one that only differs per request by volatile markup"""
+    
+    def __init__(self):
+        self.requests = itertools.count()
+        self.body = "<html><body><h1>Product</h1></body></html>"
+        self.conditional_requests = 0
+    
+    async def validated(self, request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            self.conditional_requests += 1
+            return web.Response(status=304)
+        return web.Response(text=self.body, content_type="text/html", headers={"ETag": '"v1"'})
+    
+    async def noisy(self, request):
+        count = next(self.requests)
+        html = (
+            f'<html><head><script>window.token = "{count}";</script></head>'
+            f'<body><!-- rendered {count} --><form><input type="hidden" name="csrf" value="{count}"></form>'
+            f'{self.body}</body></html>'
+        )
+        return web.Response(text=html, content_type="text/html")
+    
+    async def canonical(self, request):
+        html = '<html><head><link rel="canonical" href="/product/1"></head><body></body></html>'
+        return web.Response(text=html, content_type="text/html")
+    
+    async def large(self, request):
+        return web.Response(text="a" * 1000, content_type="text/html")
+    
+    async def broken(self, request):
+        return web.Response(status=500)
+
+@pytest.fixture
+def run(monkeypatch):
+    """Run a scenario against a fresh local site and an in-memory fingerprint table"""
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    monkeypatch.setattr(fingerprint_service, "async_session", async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+    
+    def runner(scenario):
+        async def main():
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            
+            site = Site()
+            app = web.Application()
+            for path in ("validated", "noisy", "canonical", "large", "broken"):
+                app.router.add_get(f"/{path}", getattr(site, path))
+            server = TestServer(app, host="127.0.0.1")
+            await server.start_server()
+            try:
+                return await scenario(FingerprintService(), site, lambda path: str(server.make_url(path)))
+            finally:
+                await server.close()
+                await engine.dispose()
+        return asyncio.run(main())
+    return runner
+
+def test_not_modified_response_returns_the_stored_report(run):
+    async def scenario(service, site, url):
+        first = await service.check(KEY, url("/validated"))
+        assert first["prior_report"] is None
+        assert first["fingerprint"]["etag"] == '"v1"'
+        await service.record(KEY, url("/validated"), first["fingerprint"], make_report(url("/validated")))
+        
+        second = await service.check(KEY, url("/validated"))
+        return second, site.conditional_requests
+    
+    second, conditional_requests = run(scenario)
+    assert conditional_requests == 1
+    assert second["fingerprint"]["not_modified"]
+    assert second["prior_report"].id == "report-1"
+
+def test_volatile_markup_does_not_change_the_hash(run):
+    async def scenario(service, site, url):
+        first = await service.check(KEY, url("/noisy"))
+        await service.record(KEY, url("/noisy"), first["fingerprint"], make_report(url("/noisy")))
+        unchanged = await service.check(KEY, url("/noisy"))
+        
+        site.body = "<html><body><h1>Product - now on sale</h1></body></html>"
+        changed = await service.check(KEY, url("/noisy"))
+        return first, unchanged, changed
+    
+    first, unchanged, changed = run(scenario)
+    assert first["fingerprint"]["etag"] is None
+    assert unchanged["prior_report"].id == "report-1"
+    assert not unchanged["fingerprint"]["not_modified"]
+    assert changed["prior_report"] is None
+    assert changed["reason"] == "changed"
+
+def test_force_never_reuses_a_report(run):
+    async def scenario(service, site, url):
+        first = await service.check(KEY, url("/validated"))
+        await service.record(KEY, url("/validated"), first["fingerprint"], make_report(url("/validated")))
+        return await service.check(KEY, url("/validated"), force=True)
+    
+    forced = run(scenario)
+    assert forced["prior_report"] is None
+    assert forced["fingerprint"]["content_hash"]  # Still fetched, to record after the analysis
+
+def test_canonical_link_is_extracted(run):
+    async def scenario(service, site, url):
+        return await service.check(KEY, url("/canonical")), url("/product/1")
+    
+    result, expected = run(scenario)
+    assert result["fingerprint"]["canonical"] == expected
+
+def test_body_is_capped_at_the_size_limit(run, monkeypatch):
+    monkeypatch.setattr(fingerprint_service, "FINGERPRINT_MAX_BYTES", 100)
+    
+    async def scenario(service, site, url):
+        return await service.check(KEY, url("/large")), service
+    
+    result, service = run(scenario)
+    assert result["fingerprint"]["content_hash"] == service.content_hash("a" * 100)
+
+def test_failed_pre_check_records_nothing(run):
+    async def scenario(service, site, url):
+        result = await service.check(KEY, url("/broken"))
+        await service.record(KEY, url("/broken"), result["fingerprint"], make_report(url("/broken")))
+        return result, await service._load(KEY)
+    
+    result, stored = run(scenario)
+    assert result["fingerprint"] is None
+    assert stored is None
@@ -0,0 +1,91 @@
+"""Hedged vision requests: delay trigger, first valid result wins, cost caps (stub providers)"""
+
+import asyncio
+
+from app.services.hedging_policy import HedgingPolicy
+
+class StubProvider:
+    """Answers after a delay and records whether it was cancelled"""
+    
+    def __init__(self, result, delay: float = 0.0):
+        self.result = result
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = False
+    
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return self.result
+
+def is_valid(result) -> bool:
+    return bool(result) and result != "fallback"
+
+def run(policy: HedgingPolicy, primary: StubProvider, secondary: StubProvider):
+    return asyncio.run(policy.run(primary, secondary, is_valid))
+
+def test_fast_primary_does_not_hedge():
+    policy = HedgingPolicy(hedge_delay=0.2)
+    primary, secondary = StubProvider("primary", 0.01), StubProvider("secondary")
+    
+    assert run(policy, primary, secondary) == "primary"
+    assert secondary.calls == 0
+    assert policy.hedges == 0
+    assert len(policy.latencies) == 1
+
+def test_slow_primary_loses_to_the_secondary_and_is_cancelled():
+    policy = HedgingPolicy(hedge_delay=0.05)
+    primary, secondary = StubProvider("primary", 1.0), StubProvider("secondary", 0.01)
+    
+    assert run(policy, primary, secondary) == "secondary"
+    assert primary.cancelled
+    assert (policy.hedges, policy.secondary_wins) == (1, 1)
+    assert policy.censored_samples == 1  # The cut-off primary still leaves a lower-bound sample
+
+def test_invalid_primary_result_falls_through_to_the_secondary():
+    policy = HedgingPolicy(hedge_delay=0.5)
+    primary, secondary = StubProvider("fallback", 0.01), StubProvider("secondary", 0.01)
+    
+    assert run(policy, primary, secondary) == "secondary"
+    assert secondary.calls == 1
+    assert len(policy.latencies) == 0  # Fallback answers are not latency samples
+
+def test_neither_valid_returns_the_primary_fallback():
+    policy = HedgingPolicy(hedge_delay=0.5)
+    primary, secondary = StubProvider("fallback", 0.01), StubProvider(None, 0.01)
+    
+    assert run(policy, primary, secondary) == "fallback"
+
+def test_hedge_fraction_cap_stops_hedging():
+    policy = HedgingPolicy(hedge_delay=0.01, max_hedge_fraction=0.0)
+    policy.hedges = 1  # The one hedge of headroom is used up
+    primary, secondary = StubProvider("primary", 0.05), StubProvider("secondary")
+    
+    assert run(policy, primary, secondary) == "primary"
+    assert secondary.calls == 0
+    assert policy.skipped_hedges == 1
+
+def test_hourly_cost_cap_stops_hedging():
+    policy = HedgingPolicy(hedge_delay=0.01, max_hedge_fraction=1.0, secondary_cost_per_call=0.02, max_hedge_cost_per_hour=0.03)
+    
+    async def scenario():
+        results = []
+        for _ in range(3):
+            primary, secondary = StubProvider("primary", 0.05), StubProvider("secondary")
+            results.append((await policy.run(primary, secondary, is_valid), secondary.calls))
+        return results
+    
+    assert asyncio.run(scenario()) == [("secondary", 1), ("primary", 0), ("primary", 0)]
+    assert (policy.hedges, policy.skipped_hedges) == (1, 2)
+
+def test_delay_follows_the_observed_percentile():
+    policy = HedgingPolicy(default_delay=20.0, percentile=0.9, min_samples=10)
+    assert policy.current_delay() == 20.0
+    
+    policy.latencies.extend(float(seconds) for seconds in range(1, 11))
+    assert policy.current_delay() == 10.0
+    assert policy.get_status()["delay_source"] == "p90"
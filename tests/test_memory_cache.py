@@ -0,0 +1,112 @@
+"""In-process cache tier: byte budget, LRU eviction and per-entry expiry"""
+
+from app.services.memory_cache import ENTRY_OVERHEAD_BYTES, MemoryCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+def entry_size(key: str, value: bytes) -> int:
+    return len(key) + len(value) + ENTRY_OVERHEAD_BYTES
+
+def make_cache(entries: int = 3, value_bytes: int = 36):
+    """Cache that holds exactly `entries` entries of keys "k0".."k9" and value_bytes values"""
+    clock = FakeClock()
+    size = entry_size("k0", b"x" * value_bytes)
+    return MemoryCache(size * entries, max_entry_bytes=size, clock=clock), clock
+
+def test_get_returns_the_stored_bytes():
+    cache, _ = make_cache()
+    assert cache.set("k0", b"a" * 36, ttl=60)
+    assert cache.get("k0") == b"a" * 36
+    assert "k0" in cache and len(cache) == 1
+    assert cache.get("k1") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_entries_expire_after_their_ttl():
+    cache, clock = make_cache()
+    cache.set("k0", b"a" * 36, ttl=10)
+    clock.now += 9.9
+    assert cache.get("k0") == b"a" * 36
+    clock.now += 0.1
+    assert "k0" not in cache
+    assert cache.get("k0") is None
+    assert cache.expirations == 1
+    assert cache.size_bytes == 0
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache, _ = make_cache(entries=3)
+    for key in ("k0", "k1", "k2"):
+        cache.set(key, b"a" * 36, ttl=60)
+    cache.get("k0")  # k1 is now the least recently used
+    
+    cache.set("k3", b"b" * 36, ttl=60)
+    assert "k1" not in cache
+    assert all(key in cache for key in ("k0", "k2", "k3"))
+    assert cache.evictions == 1
+
+def test_expired_entries_at_the_eviction_end_count_as_expirations():
+    cache, clock = make_cache(entries=2)
+    cache.set("k0", b"a" * 36, ttl=5)
+    cache.set("k1", b"a" * 36, ttl=60)
+    clock.now += 10
+    
+    cache.set("k2", b"b" * 36, ttl=60)
+    assert (cache.expirations, cache.evictions) == (1, 0)
+    assert "k1" in cache and "k2" in cache
+
+def test_byte_budget_is_never_exceeded():
+    cache, _ = make_cache(entries=4)
+    for index in range(10):
+        cache.set(f"k{index}", b"a" * (index % 3 * 10 + 6), ttl=60)
+        assert cache.size_bytes <= cache.max_bytes
+    assert cache.size_bytes == sum(entry_size(key, value) for key, (value, _) in cache.entries.items())
+
+def test_oversized_entry_is_rejected_and_removes_the_old_value():
+    cache, _ = make_cache()
+    cache.set("k0", b"a" * 36, ttl=60)
+    
+    assert not cache.set("k0", b"b" * 37, ttl=60)
+    assert cache.get("k0") is None
+    assert cache.rejected == 1
+    assert cache.size_bytes == 0
+
+def test_default_entry_limit_is_a_quarter_of_the_budget():
+    cache = MemoryCache(1000)
+    assert cache.max_entry_bytes == 250
+    assert not cache.set("k", b"a" * 200, ttl=60)
+    assert cache.set("k", b"a" * 100, ttl=60)
+
+def test_non_positive_ttl_is_rejected():
+    cache, _ = make_cache()
+    assert not cache.set("k0", b"a", ttl=0)
+    assert "k0" not in cache
+
+def test_overwrite_replaces_the_size():
+    cache, _ = make_cache()
+    cache.set("k0", b"a" * 36, ttl=60)
+    cache.set("k0", b"b" * 10, ttl=60)
+    assert cache.size_bytes == entry_size("k0", b"b" * 10)
+    assert cache.get("k0") == b"b" * 10
+
+def test_delete_is_a_no_op_for_missing_keys():
+    cache, _ = make_cache()
+    cache.delete("missing")
+    cache.set("k0", b"a", ttl=60)
+    cache.delete("k0")
+    assert len(cache) == 0 and cache.size_bytes == 0
+
+def test_status_reports_hit_rate_and_counters():
+    cache, _ = make_cache()
+    assert cache.get_status()["hit_rate"] is None
+    
+    cache.set("k0", b"a", ttl=60)
+    cache.get("k0")
+    cache.get("k1")
+    status = cache.get_status()
+    assert status["hit_rate"] == 0.5
+    assert status["entries"] == 1
+    assert status["bytes"] == entry_size("k0", b"a")
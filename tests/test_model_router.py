@@ -0,0 +1,88 @@
+"""Vision model routing: call, reuse or skip, and per-client daily budgets"""
+
+import importlib
+
+from app.models import AIInsights, CROData
+from app.services.model_router import ModelRouter
+
+URL = "https://shop.example.com/product"
+ALL_SCORES = {"navigation": 90, "display": 90, "information": 90, "technical": 90, "psychological": 90}
+
+def framework(overall: int = 90, **scores) -> AIInsights:
+    return AIInsights(overall_score=overall, category_scores={**ALL_SCORES, **scores})
+
+def test_incomplete_framework_calls_the_models():
+    router = ModelRouter()
+    insights = AIInsights(overall_score=95, category_scores={"navigation": 95, "display": 95})
+    
+    decision = router.decide(URL, None, None, insights, "hash-1")
+    assert decision["action"] == "call"
+    assert "40%" in decision["reason"]
+
+def test_categories_without_vision_are_skipped():
+    decision = ModelRouter().decide(URL, None, ["technical"], framework(40), "hash-1")
+    assert decision["action"] == "skip"
+
+def test_decisive_framework_result_is_skipped():
+    router = ModelRouter(decisive_score=85)
+    assert router.decide(URL, None, None, framework(90), "hash-1")["action"] == "skip"
+    
+    # One requested category below the bar still needs the models
+    assert router.decide(URL, None, ["display"], framework(90, display=60), "hash-1")["action"] == "call"
+    assert router.decide(URL, None, ["navigation"], framework(90, display=60), "hash-1")["action"] == "skip"
+
+def test_unchanged_page_reuses_the_last_model_run():
+    router = ModelRouter()
+    router.remember(URL, "hash-1", [AIInsights(overall_score=70)])
+    
+    assert router.decide(URL, None, None, framework(60), "hash-1")["action"] == "reuse"
+    assert router.previous_insights(URL)[0].overall_score == 70
+    assert router.decide(URL, None, None, framework(60), "hash-2")["action"] == "call"
+
+def test_reuse_expires_after_the_ttl():
+    router = ModelRouter(reuse_ttl_seconds=60)
+    router.remember(URL, "hash-1", [AIInsights(overall_score=70)])
+    router.last_runs[URL]["timestamp"] -= 120
+    
+    assert router.decide(URL, None, None, framework(60), "hash-1")["action"] == "call"
+
+def test_exhausted_client_budget_skips_and_is_not_cacheable():
+    router = ModelRouter(default_daily_budget=5, client_budgets={"acme": 2})
+    
+    actions = [router.decide(URL, "acme", None, framework(60), f"hash-{i}")["action"] for i in range(3)]
+    assert actions == ["call", "call", "skip"]
+    
+    decision = router.decide(URL, "acme", None, framework(60), "hash-9")
+    assert decision["cacheable"] is False
+    assert router.decide(URL, "other", None, framework(60), "hash-9")["action"] == "call"  # Default budget
+    assert router.get_status()["usage_today"] == {"acme": 2, "other": 1}
+
+def test_only_calls_are_charged():
+    router = ModelRouter(default_daily_budget=1)
+    router.remember(URL, "hash-1", [AIInsights()])
+    
+    router.decide(URL, None, None, framework(60), "hash-1")  # Reuse
+    router.decide(URL, None, None, framework(95), "hash-2")  # Decisive skip
+    assert router.decide(URL, None, None, framework(60), "hash-3")["action"] == "call"
+    assert router.get_status()["decisions"] == {"call": 1, "reuse": 1, "skip": 1}
+
+def test_page_hash_follows_elements_and_framework_scores():
+    router = ModelRouter()
+    base = router.page_hash(CROData(), framework(60))
+    assert base == router.page_hash(CROData(), framework(60))
+    assert base != router.page_hash(CROData(), framework(60, display=61))
+
+def test_malformed_routing_settings_fall_back_to_defaults(monkeypatch):
+    import enhanced_vision_manager
+    
+    monkeypatch.setenv("ROUTING_DAILY_BUDGET", "lots")
+    monkeypatch.setenv("ROUTING_CLIENT_BUDGETS", "{not json")
+    monkeypatch.setenv("HEDGE_DELAY_SECONDS", "soon")
+    try:
+        module = importlib.reload(enhanced_vision_manager)
+        assert module.ROUTING_DAILY_BUDGET is None
+        assert module.ROUTING_CLIENT_BUDGETS == {}
+        assert module.HEDGE_DELAY_SECONDS is None
+    finally:
+        monkeypatch.undo()
+        importlib.reload(enhanced_vision_manager)
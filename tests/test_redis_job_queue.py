@@ -0,0 +1,94 @@
+"""Redis stream job queue: worker outcome vs. cancellation (fakeredis)"""
+
+import asyncio
+from datetime import datetime
+
+import fakeredis
+
+from app.models import AIInsights, CategoryScores, CROAnalysisRequest, CROAnalysisResponse, CROData
+from app.services.redis_job_queue import JOB_GROUP, JOB_STREAM, RedisJobQueue
+
+URL = "https://shop.example.com/product"
+
+def make_report() -> CROAnalysisResponse:
+    return CROAnalysisResponse(
+        id="report-1",
+        url=URL,
+        overall_score=72,
+        category_scores=CategoryScores(),
+        visual_analysis=AIInsights(),
+        element_analysis=CROData(),
+        recommendations=[],
+        models_used=["gemini"],
+        analysis_date=datetime(2026, 1, 1)
+    )
+
+class StubEngine:
+    """Returns a report after an optional hook (e.g. a cancel arriving mid-run)"""
+    
+    def __init__(self, during=None, delay: float = 0.0):
+        self.during = during
+        self.delay = delay
+    
+    async def analyze_website(self, url, client_name=None, on_partial=None, categories=None, force=False):
+        if self.during:
+            await self.during()
+        await asyncio.sleep(self.delay)
+        return make_report()
+
+async def make_queue() -> RedisJobQueue:
+    queue = RedisJobQueue()
+    queue.redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    await queue.redis.xgroup_create(JOB_STREAM, JOB_GROUP, id="0", mkstream=True)
+    return queue
+
+async def process_next(queue: RedisJobQueue, engine: StubEngine):
+    """What one consume() iteration does with the next stream entry"""
+    response = await queue.redis.xreadgroup(JOB_GROUP, "worker-1", {JOB_STREAM: ">"}, count=1)
+    entry_id, fields = response[0][1][0]
+    await queue._process("worker-1", entry_id, fields["job_id"], engine)
+
+def test_finished_job_is_completed_with_its_report():
+    async def scenario():
+        queue = await make_queue()
+        job = await queue.submit(CROAnalysisRequest(url=URL))
+        await process_next(queue, StubEngine())
+        return await queue.get_job(job.id), await queue.redis.xlen(JOB_STREAM)
+    
+    job, backlog = asyncio.run(scenario())
+    assert job.status == "completed"
+    assert job.result.id == "report-1"
+    assert backlog == 0
+
+def test_cancel_before_the_next_poll_is_not_overwritten_by_completed():
+    async def scenario():
+        queue = await make_queue()
+        job = await queue.submit(CROAnalysisRequest(url=URL))
+        
+        # The cancel lands while the engine runs, and the engine finishes before the cancel poll
+        await process_next(queue, StubEngine(during=lambda: queue.cancel(job.id)))
+        return await queue.get_job(job.id)
+    
+    job = asyncio.run(scenario())
+    assert job.status == "cancelled"
+    assert job.result is None
+
+def test_cancel_during_a_long_run_stops_the_engine():
+    async def scenario():
+        queue = await make_queue()
+        job = await queue.submit(CROAnalysisRequest(url=URL))
+        
+        async def cancel_soon():
+            await asyncio.sleep(0.1)
+            await queue.cancel(job.id)
+        
+        canceller = asyncio.create_task(cancel_soon())
+        started = asyncio.get_running_loop().time()
+        await process_next(queue, StubEngine(delay=30.0))
+        await canceller
+        return await queue.get_job(job.id), asyncio.get_running_loop().time() - started
+    
+    job, elapsed = asyncio.run(scenario())
+    assert job.status == "cancelled"
+    assert job.result is None
+    assert elapsed < 5.0
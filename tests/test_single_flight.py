@@ -0,0 +1,117 @@
+"""In-process single-flight: concurrent callers for one canonical page share a pipeline run"""
+
+import asyncio
+from datetime import datetime
+
+from app.models import AIInsights, CategoryScores, CROAnalysisResponse, CROData
+from app.services.cache_service import CacheService
+from enhanced_analysis_engine import EnhancedCROAnalysisEngine
+
+URL = "https://shop.example.com/product"
+
+class StubPipeline:
+    """Stands in for _run_pipeline: counts runs and holds them until released"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+    
+    async def __call__(self, url, page_url, client_name, categories, channel, analysis_key, force=False):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return CROAnalysisResponse(
+            id=f"report-{self.calls}",
+            url=page_url,
+            overall_score=72,
+            category_scores=CategoryScores(),
+            visual_analysis=AIInsights(),
+            element_analysis=CROData(),
+            recommendations=[],
+            models_used=["gemini"],
+            analysis_date=datetime(2026, 1, 1)
+        )
+
+def make_engine():
+    """Engine with the in-memory cache and a stubbed pipeline (no browser, models or database)"""
+    engine = EnhancedCROAnalysisEngine.__new__(EnhancedCROAnalysisEngine)
+    engine.cache_service = CacheService()
+    engine.in_flight = {}
+    engine._run_pipeline = StubPipeline()
+    return engine, engine._run_pipeline
+
+def test_concurrent_callers_for_one_page_share_a_run():
+    async def scenario():
+        engine, pipeline = make_engine()
+        spellings = [URL, f"{URL}/?utm_source=mail", "HTTPS://SHOP.example.com/product#reviews"]
+        callers = [asyncio.create_task(engine.analyze_website(url)) for url in spellings]
+        await asyncio.sleep(0.05)
+        assert len(engine.in_flight) == 1
+        
+        pipeline.release.set()
+        reports = await asyncio.gather(*callers)
+        return reports, pipeline, engine
+    
+    reports, pipeline, engine = asyncio.run(scenario())
+    assert pipeline.calls == 1
+    assert {report.id for report in reports} == {"report-1"}
+    assert engine.in_flight == {}
+
+def test_different_options_run_separately():
+    async def scenario():
+        engine, pipeline = make_engine()
+        callers = [
+            asyncio.create_task(engine.analyze_website(URL)),
+            asyncio.create_task(engine.analyze_website(URL, client_name="acme")),
+            asyncio.create_task(engine.analyze_website(URL, categories=["display"]))
+        ]
+        await asyncio.sleep(0.05)
+        pipeline.release.set()
+        await asyncio.gather(*callers)
+        return pipeline
+    
+    assert asyncio.run(scenario()).calls == 3
+
+def test_cancelling_one_waiter_leaves_the_run_for_the_others():
+    async def scenario():
+        engine, pipeline = make_engine()
+        leaving = asyncio.create_task(engine.analyze_website(URL))
+        staying = asyncio.create_task(engine.analyze_website(URL))
+        await asyncio.sleep(0.05)
+        
+        leaving.cancel()
+        await asyncio.gather(leaving, return_exceptions=True)
+        assert len(engine.in_flight) == 1  # Still running for the remaining caller
+        
+        pipeline.release.set()
+        return await staying, leaving, pipeline
+    
+    report, leaving, pipeline = asyncio.run(scenario())
+    assert leaving.cancelled()
+    assert report.id == "report-1"
+    assert (pipeline.calls, pipeline.cancelled) == (1, 0)
+
+def test_cancelling_the_last_waiter_stops_the_run():
+    async def scenario():
+        engine, pipeline = make_engine()
+        callers = [asyncio.create_task(engine.analyze_website(URL)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        
+        # A new caller starts a fresh run instead of joining the abandoned one
+        pipeline.release.set()
+        report = await engine.analyze_website(URL)
+        return report, pipeline, engine
+    
+    report, pipeline, engine = asyncio.run(scenario())
+    assert pipeline.cancelled == 1
+    assert pipeline.calls == 2
+    assert report.id == "report-2"
+    assert engine.in_flight == {}
@@ -0,0 +1,409 @@
+"""YOLOv8 UI Element Detector on ONNX Runtime (CPU)"""
+
+import os
+import ast
+import time
+import logging
+import asyncio
+import io
+from typing import List, Optional, Tuple
+
+try:
+    import numpy as np
+    from PIL import Image
+    import onnxruntime as ort
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+    logging.warning("onnxruntime not installed. Run: pip install onnxruntime numpy Pillow")
+
+from app.models import AIInsights, CROData, YOLOResults, YOLODetection, ElementPosition, Recommendation
+from app.services.inference_scheduler import MicroBatchScheduler
+
+logger = logging.getLogger(__name__)
+
+# ====================================================================
+# 🎛️ YOLO DETECTOR CONFIGURATION
+# ====================================================================
+
+# Export with: yolo export model=yolov8n-ui.pt format=onnx dynamic=True
+YOLO_MODEL_PATH = os.getenv("YOLO_MODEL_PATH", "models/yolov8n-ui.onnx")
+# Optional int8 model, see quantize_model() below
+YOLO_INT8_MODEL_PATH = os.getenv("YOLO_INT8_MODEL_PATH", "models/yolov8n-ui.int8.onnx")
+USE_INT8_MODEL = os.getenv("YOLO_USE_INT8", "true").lower() == "true"
+
+INPUT_SIZE = 640            # Model input (square, letterboxed)
+TILE_OVERLAP = 64           # Overlap between vertical tiles so edge elements are not cut
+MAX_TILES = 8               # Above-the-fold content matters most; bound CPU time per page
+CONFIDENCE_THRESHOLD = 0.3  # Lower confidence for UI elements
+IOU_THRESHOLD = 0.45
+INTRA_OP_THREADS = int(os.getenv("YOLO_THREADS", "0"))  # 0 = onnxruntime default
+
+# Micro-batching: tiles from concurrent analyses share one inference call in a worker process
+USE_BATCH_SCHEDULER = os.getenv("YOLO_BATCH_SCHEDULER", "true").lower() == "true"
+MAX_BATCH_SIZE = int(os.getenv("YOLO_MAX_BATCH_SIZE", "16"))
+MAX_BATCH_WAIT_MS = float(os.getenv("YOLO_MAX_BATCH_WAIT_MS", "5"))
+
+# Fallback class names when the model carries no metadata
+DEFAULT_CLASS_NAMES = ["button", "text", "image", "input", "icon", "link", "form", "navigation"]
+
+# ====================================================================
+
+def quantize_model(source_path: str = YOLO_MODEL_PATH, target_path: str = YOLO_INT8_MODEL_PATH) -> str:
+    """Create a dynamically int8-quantized copy of the ONNX model"""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    
+    quantize_dynamic(source_path, target_path, weight_type=QuantType.QUInt8)
+    logger.info(f"✅ Quantized YOLO model written to {target_path}")
+    return target_path
+
+def create_session(model_path: str) -> "ort.InferenceSession":
+    """Create a CPU inference session"""
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if INTRA_OP_THREADS:
+        options.intra_op_num_threads = INTRA_OP_THREADS
+    return ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+def run_tiles(session: "ort.InferenceSession", tiles: List["np.ndarray"]) -> "np.ndarray":
+    """Run uint8 HWC tiles through the model, batched when the export allows it"""
+    model_input = session.get_inputs()[0]
+    batch = np.stack(tiles).transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+    
+    # Static exports have batch dimension 1; dynamic exports accept all tiles at once
+    if isinstance(model_input.shape[0], int) and model_input.shape[0] == 1:
+        return np.concatenate([session.run(None, {model_input.name: tile[None]})[0] for tile in batch])
+    return session.run(None, {model_input.name: batch})[0]
+
+# Worker process state for the micro-batch scheduler
+_worker_session = None
+
+def init_inference_worker(model_path: str):
+    """Load the model once inside the scheduler's worker process"""
+    global _worker_session
+    _worker_session = create_session(model_path)
+
+def run_tile_batch(tiles: List["np.ndarray"]) -> List["np.ndarray"]:
+    """Scheduler batch function: one output per tile"""
+    return list(run_tiles(_worker_session, tiles))
+
+def letterbox(image: "np.ndarray", size: int = INPUT_SIZE) -> Tuple["np.ndarray", float, Tuple[int, int]]:
+    """Resize keeping aspect ratio and pad to a size x size square (ultralytics style)"""
+    height, width = image.shape[:2]
+    ratio = min(size / height, size / width)
+    new_width, new_height = int(round(width * ratio)), int(round(height * ratio))
+    
+    if (new_width, new_height) != (width, height):
+        image = np.asarray(Image.fromarray(image).resize((new_width, new_height), Image.BILINEAR))
+    
+    pad_x = (size - new_width) // 2
+    pad_y = (size - new_height) // 2
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    canvas[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = image
+    
+    return canvas, ratio, (pad_x, pad_y)
+
+def non_max_suppression(boxes: "np.ndarray", scores: "np.ndarray", iou_threshold: float = IOU_THRESHOLD) -> List[int]:
+    """Greedy NMS over xyxy boxes, returns kept indices"""
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    
+    while order.size > 0:
+        i = order[0]
+        keep.append(int(i))
+        xx1 = np.maximum(x1[i], x1[order[1:]])
+        yy1 = np.maximum(y1[i], y1[order[1:]])
+        xx2 = np.minimum(x2[i], x2[order[1:]])
+        yy2 = np.minimum(y2[i], y2[order[1:]])
+        intersection = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = intersection / (areas[i] + areas[order[1:]] - intersection + 1e-9)
+        order = order[1:][iou <= iou_threshold]
+    
+    return keep
+
+class YOLOVisionModel:
+    """YOLOv8 UI element detector running on ONNX Runtime without torch"""
+    
+    def __init__(self):
+        self.session = None
+        self.class_names: List[str] = DEFAULT_CLASS_NAMES
+        self.scheduler: Optional[MicroBatchScheduler] = None
+        self.model_path = None
+        self.enabled = False
+    
+    async def initialize(self):
+        """Load the ONNX model and warm it up"""
+        if not ONNX_AVAILABLE:
+            logger.error("❌ ONNX Runtime not available. Install with: pip install onnxruntime")
+            self.enabled = False
+            return
+        
+        self.model_path = self._select_model_path()
+        if not self.model_path:
+            logger.warning(f"⚠️  YOLO ONNX model not found at {YOLO_MODEL_PATH}")
+            self.enabled = False
+            return
+        
+        try:
+            self.session = await asyncio.to_thread(create_session, self.model_path)
+            self.class_names = self._load_class_names()
+            
+            # Warm up the model
+            dummy = np.zeros((INPUT_SIZE, INPUT_SIZE, 3), dtype=np.uint8)
+            await asyncio.to_thread(run_tiles, self.session, [dummy])
+            
+            if USE_BATCH_SCHEDULER:
+                self.scheduler = MicroBatchScheduler(
+                    run_tile_batch,
+                    max_batch_size=MAX_BATCH_SIZE,
+                    max_wait_ms=MAX_BATCH_WAIT_MS,
+                    initializer=init_inference_worker,
+                    initargs=(self.model_path,),
+                    name="YOLO"
+                )
+                await self.scheduler.start()
+            
+            self.enabled = True
+            logger.info(f"🔥 YOLO ONNX detector ready ({os.path.basename(self.model_path)}, {len(self.class_names)} classes)")
+        
+        except Exception as e:
+            logger.error(f"❌ Failed to initialize YOLO ONNX detector: {e}")
+            self.enabled = False
+    
+    def _select_model_path(self) -> Optional[str]:
+        """Prefer the int8 model when enabled and present"""
+        if USE_INT8_MODEL and os.path.exists(YOLO_INT8_MODEL_PATH):
+            return YOLO_INT8_MODEL_PATH
+        if os.path.exists(YOLO_MODEL_PATH):
+            return YOLO_MODEL_PATH
+        return None
+    
+    def _load_class_names(self) -> List[str]:
+        """Read class names from ultralytics export metadata"""
+        try:
+            names = self.session.get_modelmeta().custom_metadata_map.get("names")
+            if names:
+                parsed = ast.literal_eval(names)
+                return [parsed[i] for i in sorted(parsed)]
+        except Exception as e:
+            logger.warning(f"Could not read YOLO class names from model metadata: {e}")
+        return DEFAULT_CLASS_NAMES
+    
+    async def analyze_screenshot(self, screenshot: bytes, html_data: CROData) -> AIInsights:
+        """Detect UI elements in a screenshot"""
+        if not self.enabled:
+            return self._get_mock_analysis()
+        if not screenshot:
+            return AIInsights(yolo_analysis=YOLOResults())
+        
+        start_time = time.time()
+        
+        try:
+            if self.scheduler:
+                # Decode/tile here, batch inference with other requests in the worker process
+                tiles, offsets, scale = await asyncio.to_thread(self._prepare_page, screenshot)
+                outputs = await self.scheduler.submit_many(tiles)
+                detections = self.postprocess(np.stack(outputs), offsets, scale)
+            else:
+                detections = await asyncio.to_thread(self.detect, screenshot)
+            insights = self._convert_to_cro_insights(detections, html_data)
+            
+            insights.yolo_analysis = YOLOResults(
+                detections=detections,
+                total_elements=len(detections),
+                button_count=self._count_elements_by_class(detections, ['button']),
+                form_count=self._count_elements_by_class(detections, ['input', 'textbox', 'form']),
+                image_count=self._count_elements_by_class(detections, ['image', 'picture']),
+                text_count=self._count_elements_by_class(detections, ['text', 'label']),
+                processing_time=time.time() - start_time
+            )
+            
+            logger.info(f"🎯 YOLO detected {len(detections)} elements in {insights.yolo_analysis.processing_time:.2f}s")
+            return insights
+        
+        except Exception as e:
+            logger.error(f"YOLO analysis failed: {e}")
+            return self._get_mock_analysis()
+    
+    def detect(self, screenshot: bytes) -> List[YOLODetection]:
+        """Run tiled detection on a full-page screenshot in-process (blocking)"""
+        tiles, offsets, scale = self._prepare_page(screenshot)
+        return self.postprocess(run_tiles(self.session, tiles), offsets, scale)
+    
+    def _prepare_page(self, screenshot: bytes):
+        """Decode a PNG screenshot and cut it into tiles"""
+        image = np.asarray(Image.open(io.BytesIO(screenshot)).convert("RGB"))
+        return self.prepare_tiles(image)
+    
+    def prepare_tiles(self, image: "np.ndarray") -> Tuple[List["np.ndarray"], List[Tuple[float, Tuple[int, int], int]], float]:
+        """Scale the page to INPUT_SIZE width and cut letterboxed vertical tiles
+
+        Returns uint8 HWC tiles, per-tile (ratio, padding, y offset) and the page scale.
+        """
+        height, width = image.shape[:2]
+        scale = min(1.0, INPUT_SIZE / width)
+        if scale < 1.0:
+            image = np.asarray(Image.fromarray(image).resize(
+                (INPUT_SIZE, max(1, int(round(height * scale)))), Image.BILINEAR
+            ))
+        
+        tiles, offsets = [], []
+        step = INPUT_SIZE - TILE_OVERLAP
+        for top in range(0, max(1, image.shape[0] - TILE_OVERLAP), step):
+            if len(tiles) >= MAX_TILES:
+                break
+            tile, ratio, padding = letterbox(image[top:top + INPUT_SIZE])
+            tiles.append(tile)
+            offsets.append((ratio, padding, top))
+        
+        return tiles, offsets, scale
+    
+    def postprocess(self, outputs: "np.ndarray", offsets: list, scale: float) -> List[YOLODetection]:
+        """Decode YOLOv8 outputs (N, 4 + classes, anchors) into page-space detections"""
+        all_boxes, all_scores, all_classes = [], [], []
+        
+        for prediction, (ratio, (pad_x, pad_y), top) in zip(outputs, offsets):
+            prediction = prediction.T  # (anchors, 4 + classes)
+            class_scores = prediction[:, 4:]
+            class_ids = class_scores.argmax(axis=1)
+            scores = class_scores[np.arange(len(class_ids)), class_ids]
+            mask = scores >= CONFIDENCE_THRESHOLD
+            if not mask.any():
+                continue
+            
+            cx, cy, w, h = prediction[mask, :4].T
+            # Undo letterboxing, shift by tile offset, then undo the page scale
+            x1 = (cx - w / 2 - pad_x) / ratio
+            y1 = (cy - h / 2 - pad_y) / ratio + top
+            x2 = (cx + w / 2 - pad_x) / ratio
+            y2 = (cy + h / 2 - pad_y) / ratio + top
+            all_boxes.append(np.stack([x1, y1, x2, y2], axis=1) / scale)
+            all_scores.append(scores[mask])
+            all_classes.append(class_ids[mask])
+        
+        if not all_boxes:
+            return []
+        
+        boxes = np.concatenate(all_boxes)
+        scores = np.concatenate(all_scores)
+        class_ids = np.concatenate(all_classes)
+        
+        # Class-aware NMS across tiles (offset boxes per class so classes never suppress each other)
+        class_offsets = class_ids[:, None] * (boxes.max() + 1)
+        keep = non_max_suppression(boxes + class_offsets, scores)
+        
+        detections = []
+        for i in keep:
+            x1, y1, x2, y2 = boxes[i]
+            class_name = self._class_name(int(class_ids[i]))
+            detections.append(YOLODetection(
+                class_name=class_name,
+                confidence=float(scores[i]),
+                bounding_box=ElementPosition(
+                    x=int(x1),
+                    y=int(y1),
+                    width=int(x2 - x1),
+                    height=int(y2 - y1)
+                ),
+                label=f"{class_name} ({scores[i]:.2f})"
+            ))
+        
+        return detections
+    
+    def _class_name(self, class_id: int) -> str:
+        if 0 <= class_id < len(self.class_names):
+            return self.class_names[class_id]
+        return "ui_element"
+    
+    def _convert_to_cro_insights(self, detections: List[YOLODetection], html_data: CROData) -> AIInsights:
+        """Convert YOLO detections to CRO insights"""
+        insights = AIInsights()
+        
+        button_count = self._count_elements_by_class(detections, ['button'])
+        form_count = self._count_elements_by_class(detections, ['input', 'textbox', 'form'])
+        image_count = self._count_elements_by_class(detections, ['image', 'picture'])
+        
+        recommendations = []
+        
+        if button_count < 3:
+            recommendations.append(Recommendation(
+                category="information",
+                priority="high",
+                issue=f"Only {button_count} buttons detected by computer vision",
+                solution="Add more prominent call-to-action buttons",
+                impact="Could increase conversions by 10-15%",
+                source="yolo"
+            ))
+        
+        if form_count == 0 and html_data.forms:
+            recommendations.append(Recommendation(
+                category="display",
+                priority="medium",
+                issue="Forms exist in the HTML but are not visually detectable",
+                solution="Ensure contact/signup forms are visually prominent",
+                impact="Could improve lead generation by 5-10%",
+                source="yolo"
+            ))
+        
+        if image_count < 2:
+            recommendations.append(Recommendation(
+                category="information",
+                priority="medium",
+                issue="Limited product images detected",
+                solution="Add more product images and visual content",
+                impact="Could improve engagement by 8-12%",
+                source="yolo"
+            ))
+        
+        insights.recommendations = recommendations
+        
+        # Analyze layout distribution
+        self._analyze_layout_distribution(detections, insights)
+        
+        return insights
+    
+    def _count_elements_by_class(self, detections: List[YOLODetection], classes: List[str]) -> int:
+        """Count elements by class type"""
+        return sum(1 for detection in detections if any(cls in detection.class_name.lower() for cls in classes))
+    
+    def _analyze_layout_distribution(self, detections: List[YOLODetection], insights: AIInsights):
+        """Check whether buttons appear above the desktop fold"""
+        buttons = [d for d in detections if 'button' in d.class_name.lower()]
+        if not buttons:
+            return
+        
+        above_fold = [d for d in buttons if d.bounding_box.y < 1080]
+        if not above_fold:
+            insights.visual_issues.append("No buttons detected above the fold")
+    
+    def _get_mock_analysis(self) -> AIInsights:
+        """Empty analysis when the detector is not available"""
+        return AIInsights(
+            recommendations=[
+                Recommendation(
+                    category="system",
+                    priority="low",
+                    issue="YOLO detector not available",
+                    solution=f"Install onnxruntime and place an exported model at {YOLO_MODEL_PATH}",
+                    impact="Would provide local UI element detection",
+                    source="yolo"
+                )
+            ],
+            yolo_analysis=YOLOResults()
+        )
+    
+    def is_enabled(self) -> bool:
+        """Check if the detector is enabled"""
+        return self.enabled
+    
+    def get_model_name(self) -> str:
+        """Get model name"""
+        return "YOLOv8 UI Detector (ONNX)"
+    
+    async def close(self):
+        """Stop the batch scheduler worker"""
+        if self.scheduler:
+            await self.scheduler.close()
+            self.scheduler = None